@@ -0,0 +1,107 @@
+# analytics.py
+# Агрегаты по записям: сводка по клиентам для вкладки "Клиенты"
+# и снимок статистики для вкладки "Аналитика"
+
+from datetime import date as date_cls, timedelta
+
+import pandas as pd
+
+# Колонки, которые нужны для сводки по клиентам (одна выборка на всю таблицу)
+CLIENT_SUMMARY_COLUMNS = 'client_name, client_phone, client_email, client_telegram, phone_hash, status, booking_date'
+
+# Порядок колонок, который ожидает вкладка "Клиенты"
+CLIENT_SUMMARY_OUTPUT = [
+    'phone_hash', 'client_name', 'client_phone', 'client_email', 'client_telegram',
+    'total_bookings', 'upcoming_bookings', 'completed_bookings', 'cancelled_bookings',
+    'first_booking', 'last_booking'
+]
+
+
+def summarize_clients(rows: list) -> pd.DataFrame:
+    """Сводка по клиентам за один проход groupby/agg"""
+    if not rows:
+        return pd.DataFrame()
+
+    df = pd.DataFrame(rows)
+    for column in ('client_name', 'client_phone', 'client_email', 'client_telegram', 'status', 'booking_date'):
+        if column not in df.columns:
+            df[column] = None
+
+    status = df['status']
+    df = df.assign(
+        _confirmed=status.eq('confirmed'),
+        _completed=status.eq('completed'),
+        _cancelled=status.eq('cancelled'),
+    )
+
+    summary = df.groupby('phone_hash').agg(
+        client_name=('client_name', 'first'),
+        client_phone=('client_phone', 'first'),
+        client_email=('client_email', 'first'),
+        client_telegram=('client_telegram', 'first'),
+        total_bookings=('phone_hash', 'size'),
+        upcoming_bookings=('_confirmed', 'sum'),
+        completed_bookings=('_completed', 'sum'),
+        cancelled_bookings=('_cancelled', 'sum'),
+        first_booking=('booking_date', 'min'),
+        last_booking=('booking_date', 'max'),
+    ).reset_index()
+
+    return summary[CLIENT_SUMMARY_OUTPUT]
+
+
+def load_client_summary(db) -> pd.DataFrame:
+    """Загрузка сводки по клиентам одним запросом к таблице bookings"""
+    response = db.table('bookings').select(CLIENT_SUMMARY_COLUMNS).execute()
+    return summarize_clients(response.data)
+
+
+# ============================================================================
+# СТАТИСТИКА ПО ЗАПИСЯМ
+# ============================================================================
+
+# Для всех счетчиков достаточно статуса и даты записи
+STATS_COLUMNS = 'status, booking_date'
+
+
+def compute_stats(rows: list, today: date_cls = None) -> dict:
+    """Все счетчики аналитики за один проход по кадру записей"""
+    today = today or date_cls.today()
+    month_start = today.replace(day=1)
+    next_month = (month_start + timedelta(days=32)).replace(day=1)
+    month_end = next_month - timedelta(days=1)
+    week_ago = today - timedelta(days=7)
+
+    if not rows:
+        df = pd.DataFrame(columns=['status', 'booking_date'])
+    else:
+        df = pd.DataFrame(rows)
+
+    # ISO-даты сравниваются как строки, поэтому маски векторные и без парсинга
+    dates = df['booking_date'].astype(str).str[:10]
+    status = df['status']
+
+    is_future = dates >= today.isoformat()
+    is_confirmed = status.eq('confirmed')
+    in_month = (dates >= month_start.isoformat()) & (dates <= month_end.isoformat())
+
+    total = len(df)
+    cancelled = int(status.eq('cancelled').sum())
+
+    return {
+        'total': total,
+        'upcoming': int((is_confirmed & is_future).sum()),
+        'this_month': int(in_month.sum()),
+        'this_week': int((dates >= week_ago.isoformat()).sum()),
+        'today': int((dates == today.isoformat()).sum()),
+        'confirmed': int(is_confirmed.sum()),
+        'completed': int(status.eq('completed').sum()),
+        'cancelled': cancelled,
+        'cancel_rate': cancelled / total * 100 if total else 0.0,
+    }
+
+
+def load_stats(db, today: date_cls = None) -> dict:
+    """Снимок статистики одним запросом к таблице bookings"""
+    response = db.table('bookings').select(STATS_COLUMNS).execute()
+    return compute_stats(response.data, today)
@@ -0,0 +1,422 @@
+# availability.py
+# Расчет свободных слотов сразу для диапазона дат и кэш состояния дней.
+#
+# Занятость дня хранится как интервалы в минутах от начала суток: запись
+# занимает [начало, начало + ее длительность), блокировка слота — интервал
+# текущей длительности сессии. Слот свободен, если его интервал не пересекает
+# ни один занятый; проверка — бинарный поиск по слитым интервалам, поэтому
+# запись, сделанная при другой длительности или сетке, корректно закрывает
+# все пересекающиеся слоты.
+
+import threading
+from bisect import bisect_left
+import time
+from collections import OrderedDict
+from datetime import date as date_cls, datetime, timedelta
+from typing import NamedTuple
+
+from booking_events import CANCELLED, CREATED, DELETED, RESCHEDULED, RESTORED
+
+
+class DayState(NamedTuple):
+    """Состояние дня: заблокирован целиком и занятость (начало, длительность или None)"""
+    blocked: bool
+    busy: tuple
+
+
+EMPTY_DAY = DayState(False, ())
+
+
+def _to_minutes(time_str: str) -> int:
+    """'HH:MM' -> минуты от начала суток"""
+    hours, minutes = time_str[:5].split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def _to_time_str(minutes: int) -> str:
+    """Минуты от начала суток -> 'HH:MM'"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def iter_dates(date_from: str, date_to: str):
+    """Даты диапазона включительно в формате ISO"""
+    current = date_cls.fromisoformat(date_from)
+    last = date_cls.fromisoformat(date_to)
+    while current <= last:
+        yield current.isoformat()
+        current += timedelta(days=1)
+
+
+def merge_intervals(intervals) -> list:
+    """Слияние пересекающихся интервалов [начало, конец) в отсортированный список"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def day_intervals(state: DayState, default_duration: int) -> list:
+    """Слитые занятые интервалы дня; без сохраненной длительности — текущая"""
+    return merge_intervals(
+        (start, start + (duration or default_duration))
+        for start, duration in state.busy
+    )
+
+
+def free_starts(busy: list, work_start: int, work_end: int, step: int, duration: int,
+                not_before: int = 0) -> list:
+    """Начала свободных слотов длиной duration на сетке work_start + k*step"""
+    if step <= 0:
+        return []
+
+    starts = [interval[0] for interval in busy]
+    result = []
+    for start in range(work_start, work_end, step):
+        if start < not_before:
+            continue
+        # Последний интервал, начинающийся раньше конца слота, — единственный кандидат на пересечение
+        idx = bisect_left(starts, start + duration) - 1
+        if idx < 0 or busy[idx][1] <= start:
+            result.append(start)
+    return result
+
+
+def build_day_states(date_from: str, date_to: str, booked_rows: list, blocked_rows: list) -> dict:
+    """Состояние каждого дня диапазона из уже загруженных записей и блокировок"""
+    busy = {}
+    blocked_days = set()
+
+    for row in booked_rows:
+        busy.setdefault(row['booking_date'], []).append(
+            (_to_minutes(row['booking_time']), row.get('session_duration'))
+        )
+
+    for row in blocked_rows:
+        if row.get('block_time') is None:
+            blocked_days.add(row['block_date'])
+        else:
+            busy.setdefault(row['block_date'], []).append((_to_minutes(row['block_time']), None))
+
+    return {
+        day: DayState(day in blocked_days, tuple(sorted(busy.get(day, ()))))
+        for day in iter_dates(date_from, date_to)
+    }
+
+
+def free_slots_by_date(states: dict, settings: dict, now: datetime, min_advance_hours: int) -> dict:
+    """Свободные слоты по датам с учетом минимального времени до записи"""
+    work_start = _to_minutes(settings['work_start'])
+    work_end = _to_minutes(settings['work_end'])
+    duration = int(settings['session_duration'])
+
+    # Граница "не раньше чем через MIN_ADVANCE_HOURS" считается один раз на диапазон
+    cutoff = now + timedelta(hours=min_advance_hours)
+    cutoff_date = cutoff.date().isoformat()
+    cutoff_minutes = cutoff.hour * 60 + cutoff.minute + (1 if cutoff.second or cutoff.microsecond else 0)
+
+    result = {}
+    for day in sorted(states):
+        state = states[day]
+        if state.blocked or day < cutoff_date:
+            result[day] = []
+            continue
+
+        not_before = cutoff_minutes if day == cutoff_date else 0
+        starts = free_starts(day_intervals(state, duration), work_start, work_end, duration, duration, not_before)
+        result[day] = [_to_time_str(start) for start in starts]
+
+    return result
+
+
+def fetch_day_states(db, date_from: str, date_to: str, with_duration: bool = True) -> dict:
+    """Состояние дней диапазона: один запрос к bookings и один к blocked_slots.
+    with_duration=False — база без bookings.session_duration (длительность из настроек)"""
+    booked_response = db.table('bookings')\
+        .select('booking_date, booking_time, session_duration' if with_duration else 'booking_date, booking_time')\
+        .gte('booking_date', date_from)\
+        .lte('booking_date', date_to)\
+        .neq('status', 'cancelled')\
+        .execute()
+
+    blocked_response = db.table('blocked_slots')\
+        .select('block_date, block_time')\
+        .gte('block_date', date_from)\
+        .lte('block_date', date_to)\
+        .execute()
+
+    return build_day_states(date_from, date_to, booked_response.data or [], blocked_response.data or [])
+
+
+def fetch_availability(db, date_from: str, date_to: str, settings: dict,
+                       min_advance_hours: int, now: datetime = None, cache=None,
+                       with_duration: bool = True) -> dict:
+    """Свободные слоты по датам; при наличии кэша в базу идут только недостающие дни"""
+    dates = list(iter_dates(date_from, date_to))
+
+    if cache is None:
+        states = fetch_day_states(db, date_from, date_to, with_duration)
+    else:
+        states, missing = cache.get_many(dates)
+        if missing:
+            # Поколения до запроса: дни, сброшенные чужой записью во время чтения, в кэш не попадут
+            generations = cache.generations(missing)
+            fetched = fetch_day_states(db, missing[0], missing[-1], with_duration)
+            cache.put_many(fetched, generations)
+            states.update({day: fetched.get(day, EMPTY_DAY) for day in missing})
+
+    return free_slots_by_date(states, settings, now or datetime.now(), min_advance_hours)
+
+
+class AvailabilityCache:
+    """LRU-кэш состояния дней с ограничением по времени жизни записи"""
+
+    def __init__(self, maxsize: int = 128, ttl: float = 60, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._items = OrderedDict()
+        self._generations = {}  # дата -> число сбросов; меняется в invalidate()
+        self._epoch = 0  # число полных сбросов (clear)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, dates: list) -> tuple:
+        """Возвращает (найденные состояния, список отсутствующих/устаревших дат)"""
+        found = {}
+        missing = []
+        now = self._clock()
+
+        with self._lock:
+            for day in dates:
+                item = self._items.get(day)
+                if item is not None and item[0] > now:
+                    self._items.move_to_end(day)
+                    found[day] = item[1]
+                else:
+                    if item is not None:
+                        del self._items[day]
+                    missing.append(day)
+
+            self.hits += len(found)
+            self.misses += len(missing)
+
+        return found, missing
+
+    def generations(self, dates: list) -> tuple:
+        """Снимок поколений дат перед чтением из базы (для put_many)"""
+        with self._lock:
+            return self._epoch, {day: self._generations.get(day, 0) for day in dates}
+
+    def put_many(self, states: dict, generations: tuple = None):
+        """Сохранение состояний дней с вытеснением самых старых.
+        generations — снимок до чтения: сброшенные после него даты не сохраняются"""
+        expires_at = self._clock() + self.ttl
+
+        with self._lock:
+            if generations is not None and generations[0] != self._epoch:
+                return
+            for day, state in states.items():
+                if generations is not None and self._generations.get(day, 0) != generations[1].get(day, 0):
+                    continue  # прочитано до чужой записи — устарело
+                self._items[day] = (expires_at, state)
+                self._items.move_to_end(day)
+
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def invalidate(self, *dates):
+        """Сброс только затронутых дат"""
+        with self._lock:
+            for day in dates:
+                if day:
+                    day = str(day)[:10]
+                    self._items.pop(day, None)
+                    self._generations[day] = self._generations.get(day, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._generations.clear()
+            self._epoch += 1
+
+    def __len__(self):
+        return len(self._items)
+
+
+class CalendarIndex:
+    """Битовая карта занятости слотов по дням горизонта записи.
+
+    Бит i дня — слот work_start + i*duration; 1 — занят. Индекс строится
+    одной выборкой на весь горизонт и дальше обновляется локально при
+    создании/отмене записей и блокировках; полная перезагрузка — по TTL.
+    """
+
+    def __init__(self, ttl: float = 300, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._busy = {}
+        self._blocked = set()
+        self._bitmaps = {}
+        self._grid = None
+        self._horizon = None
+        self._expires_at = 0.0
+
+    # ---- загрузка ----
+
+    def covers(self, date_from: str, date_to: str) -> bool:
+        """Индекс загружен, не устарел и покрывает диапазон"""
+        with self._lock:
+            return (self._horizon is not None and self._clock() < self._expires_at
+                    and self._horizon[0] <= date_from and date_to <= self._horizon[1])
+
+    def load(self, states: dict, date_from: str, date_to: str):
+        """Полная загрузка из состояний дней (см. fetch_day_states)"""
+        with self._lock:
+            self._busy = {day: list(state.busy) for day, state in states.items()}
+            self._blocked = {day for day, state in states.items() if state.blocked}
+            self._horizon = (date_from, date_to)
+            self._expires_at = self._clock() + self.ttl
+            self._rebuild()
+
+    def invalidate(self):
+        with self._lock:
+            self._expires_at = 0.0
+
+    def ensure_grid(self, settings: dict):
+        """Пересчет битовых карт при изменении рабочего времени или длительности"""
+        grid = (_to_minutes(settings['work_start']), _to_minutes(settings['work_end']),
+                int(settings['session_duration']))
+        with self._lock:
+            if grid != self._grid:
+                self._grid = grid
+                self._rebuild()
+
+    def _rebuild(self):
+        self._bitmaps = {}
+        if self._grid is not None:
+            for day in self._busy:
+                self._rebuild_day(day)
+
+    def _full_mask(self) -> int:
+        work_start, work_end, step = self._grid
+        if step <= 0 or work_end <= work_start:
+            return 0
+        return (1 << -(-(work_end - work_start) // step)) - 1
+
+    def _rebuild_day(self, day: str):
+        if self._grid is None:
+            return
+        full = self._full_mask()
+        if day in self._blocked:
+            self._bitmaps[day] = full
+            return
+
+        work_start, work_end, step = self._grid
+        state = DayState(False, tuple(self._busy.get(day, ())))
+        free = 0
+        for start in free_starts(day_intervals(state, step), work_start, work_end, step, step):
+            free |= 1 << ((start - work_start) // step)
+        self._bitmaps[day] = full & ~free
+
+    # ---- инкрементальные обновления ----
+
+    def _in_horizon(self, day: str) -> bool:
+        return self._horizon is not None and self._horizon[0] <= day <= self._horizon[1]
+
+    def add(self, day: str, time_str: str, duration: int = None):
+        """Запись или блокировка слота заняла время"""
+        day = str(day)[:10]
+        with self._lock:
+            if self._in_horizon(day):
+                self._busy.setdefault(day, []).append((_to_minutes(time_str), duration))
+                self._rebuild_day(day)
+
+    def remove(self, day: str, time_str: str, duration: int = None):
+        """Запись отменена/удалена или слот разблокирован.
+
+        Удаляется интервал с тем же началом и той же длительностью: блокировка
+        (длительность None) и запись на то же время не затирают друг друга.
+        Если такого интервала нет, индекс помечается устаревшим.
+        """
+        day = str(day)[:10]
+        item = (_to_minutes(time_str), duration)
+        with self._lock:
+            if not self._in_horizon(day):
+                return
+            busy = self._busy.get(day, [])
+            if item in busy:
+                busy.remove(item)
+                self._rebuild_day(day)
+            else:
+                self._expires_at = 0.0
+
+    def load_day(self, day: str, state: DayState):
+        """Замена одного дня свежим состоянием из базы (см. fetch_day_states)"""
+        day = str(day)[:10]
+        with self._lock:
+            if not self._in_horizon(day):
+                return
+            self._busy[day] = list(state.busy)
+            if state.blocked:
+                self._blocked.add(day)
+            else:
+                self._blocked.discard(day)
+            self._rebuild_day(day)
+
+    def set_day_blocked(self, day: str, blocked: bool):
+        """Блокировка/разблокировка дня целиком"""
+        day = str(day)[:10]
+        with self._lock:
+            if not self._in_horizon(day):
+                return
+            if blocked:
+                self._blocked.add(day)
+            else:
+                self._blocked.discard(day)
+            self._busy.setdefault(day, [])
+            self._rebuild_day(day)
+
+    def on_booking_event(self, event):
+        """Обновление по событию записи (завершенная запись слот не освобождает)"""
+        if event.kind in (CREATED, RESTORED):
+            self.add(event.booking_date, event.booking_time, event.session_duration)
+        elif event.kind == RESCHEDULED and event.was_active:
+            self.remove(event.old_date, event.old_time, event.session_duration)
+            self.add(event.booking_date, event.booking_time, event.session_duration)
+        elif event.kind in (CANCELLED, DELETED) and event.was_active:
+            self.remove(event.booking_date, event.booking_time, event.session_duration)
+
+    # ---- поиск ----
+
+    def next_available(self, after: datetime, n: int = 5) -> list:
+        """Ближайшие n свободных слотов не раньше after: [(дата ISO, 'HH:MM'), ...]"""
+        with self._lock:
+            if self._grid is None:
+                return []
+            work_start, work_end, step = self._grid
+            full = self._full_mask()
+            first_day = after.date().isoformat()
+            after_minutes = after.hour * 60 + after.minute + (1 if after.second or after.microsecond else 0)
+
+            result = []
+            for day in sorted(self._bitmaps):
+                if day < first_day:
+                    continue
+                free = full & ~self._bitmaps[day]
+                if day == first_day:
+                    skip = max(0, -(-(after_minutes - work_start) // step))
+                    free &= ~((1 << skip) - 1)
+                while free and len(result) < n:
+                    lowest = free & -free
+                    index = lowest.bit_length() - 1
+                    result.append((day, _to_time_str(work_start + index * step)))
+                    free ^= lowest
+                if len(result) >= n:
+                    break
+            return result
@@ -0,0 +1,62 @@
+# benchmarks/bench_admin_tabs.py
+# Стоимость прогона админ-панели по разделам. st.tabs выполнял тела всех
+# шести вкладок на каждом прогоне (клиенты, настройки, блокировки, графики
+# аналитики, outbox); теперь выполняется только выбранный раздел ADMIN_TABS.
+#
+# Приложение запускается через streamlit.testing (AppTest) на SQLite с
+# DEBUG_QUERIES=true; запросы и время берутся из строки сайдбара.
+#
+#   python benchmarks/bench_admin_tabs.py
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_fragments import APP, PAGE_RE, ROOT, seed  # noqa: E402
+
+RERUNS = 5
+
+
+def page_timing(at):
+    for caption in at.caption:
+        match = PAGE_RE.search(caption.value)
+        if match:
+            return int(match.group(1)), int(match.group(2))
+    raise AssertionError("нет строки DEBUG_QUERIES в сайдбаре")
+
+
+def main():
+    from streamlit.testing.v1 import AppTest
+
+    path = os.path.join(tempfile.mkdtemp(), 'bookings.db')
+    total = seed(path)
+    os.environ.update(STORAGE_BACKEND='sqlite', SQLITE_PATH=path, DEBUG_QUERIES='true',
+                      TELEGRAM_BOT_TOKEN='', TELEGRAM_ADMIN_CHAT_ID='', TELEGRAM_RECEIVE_UPDATES='false')
+    os.chdir(ROOT)
+
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.session_state['admin_logged_in'] = True
+    at.run()
+    tabs = at.radio(key='admin_tab').options
+
+    print(f"{total} записей, SQLite; медиана {RERUNS} прогонов на раздел")
+    print(f"{'раздел':<16} | {'запросов':>8} | {'скрипт, мс':>10}")
+    costs = []
+    for tab in tabs:
+        at.radio(key='admin_tab').set_value(tab).run()
+        samples = []
+        for _ in range(RERUNS):
+            at.run()
+            assert not at.exception, [e.value for e in at.exception]
+            samples.append(page_timing(at))
+        queries = max(sample[0] for sample in samples)
+        elapsed = sorted(sample[1] for sample in samples)[RERUNS // 2]
+        costs.append(elapsed)
+        print(f"{tab:<16} | {queries:>8} | {elapsed:>10.0f}")
+    print(f"{'все разделы':<16} | {'':>8} | {sum(costs):>10.0f}  (примерно столько стоил прогон с st.tabs)")
+
+
+if __name__ == '__main__':
+    main()
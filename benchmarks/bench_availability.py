@@ -0,0 +1,96 @@
+# benchmarks/bench_availability.py
+# Доступность на горизонт MAX_DAYS_AHEAD: по дню (3 запроса на дату)
+# против пакетной выборки на весь диапазон.
+#
+#   python benchmarks/bench_availability.py
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from availability import AvailabilityCache, fetch_availability, iter_dates  # noqa: E402
+from benchmarks.dataset import make_bookings  # noqa: E402
+from benchmarks.fake_supabase import FakeSupabase  # noqa: E402
+
+LATENCY = 0.002
+MAX_DAYS_AHEAD = 30
+MIN_ADVANCE_HOURS = 1
+SETTINGS = {'work_start': '09:00', 'work_end': '18:00', 'session_duration': 60}
+
+
+def legacy_get_available_slots(client, date, now):
+    """Старая реализация get_available_slots для одной даты"""
+    if client.table('blocked_slots').select('id').eq('block_date', date).is_('block_time', None).execute().data:
+        return []
+    booked = [r['booking_time'] for r in client.table('bookings').select('booking_time')
+              .eq('booking_date', date).neq('status', 'cancelled').execute().data]
+    blocked = [r['block_time'] for r in client.table('blocked_slots').select('block_time')
+               .eq('block_date', date).not_.is_('block_time', None).execute().data]
+
+    work_start = datetime.strptime(SETTINGS['work_start'], '%H:%M').time()
+    work_end = datetime.strptime(SETTINGS['work_end'], '%H:%M').time()
+    slots = []
+    current = datetime.combine(datetime.today(), work_start)
+    end = datetime.combine(datetime.today(), work_end)
+    while current < end:
+        slot = current.strftime('%H:%M')
+        diff = (datetime.strptime(f"{date} {slot}", "%Y-%m-%d %H:%M") - now).total_seconds()
+        if slot not in booked and slot not in blocked and diff >= MIN_ADVANCE_HOURS * 3600:
+            slots.append(slot)
+        current += timedelta(minutes=SETTINGS['session_duration'])
+    return slots
+
+
+def main():
+    now = datetime.now()
+    date_from = now.date().isoformat()
+    date_to = (now.date() + timedelta(days=MAX_DAYS_AHEAD)).isoformat()
+
+    bookings = make_bookings(150, per_client=2, days=60, start=now - timedelta(days=10))
+    blocked = [
+        {'id': 1, 'block_date': (now.date() + timedelta(days=3)).isoformat(), 'block_time': None, 'reason': 'Выходной'},
+        {'id': 2, 'block_date': (now.date() + timedelta(days=5)).isoformat(), 'block_time': '10:00', 'reason': 'Тех'},
+    ]
+    client = FakeSupabase({'bookings': bookings, 'blocked_slots': blocked}, latency=LATENCY)
+
+    started = time.perf_counter()
+    legacy = {day: legacy_get_available_slots(client, day, now) for day in iter_dates(date_from, date_to)}
+    legacy_time, legacy_queries = time.perf_counter() - started, client.queries
+
+    client.reset_counters()
+    started = time.perf_counter()
+    batched = fetch_availability(client, date_from, date_to, SETTINGS, MIN_ADVANCE_HOURS, now=now)
+    batched_time, batched_queries = time.perf_counter() - started, client.queries
+
+    assert legacy == batched, "результаты расходятся"
+
+    # Повторные rerun'ы с кэшем: первый заполняет, остальные без запросов
+    cache = AvailabilityCache(maxsize=120, ttl=60)
+    fetch_availability(client, date_from, date_to, SETTINGS, MIN_ADVANCE_HOURS, now=now, cache=cache)
+    client.reset_counters()
+    started = time.perf_counter()
+    for _ in range(100):
+        cached = fetch_availability(client, date_from, date_to, SETTINGS, MIN_ADVANCE_HOURS, now=now, cache=cache)
+    cached_time, cached_queries = (time.perf_counter() - started) / 100, client.queries
+    assert cached == batched
+
+    # Запись через приложение сбрасывает только свою дату
+    day = next(d for d, slots in cached.items() if slots)
+    client.table('bookings').insert({'booking_date': day, 'booking_time': cached[day][0], 'status': 'confirmed'}).execute()
+    cache.invalidate(day)
+    client.reset_counters()
+    after_write = fetch_availability(client, date_from, date_to, SETTINGS, MIN_ADVANCE_HOURS, now=now, cache=cache)
+    assert cached[day][0] not in after_write[day]
+
+    print(f"RTT={LATENCY * 1000:.0f} мс, дней: {len(batched)}")
+    print(f"по дням:  {legacy_queries:>3} запросов, {legacy_time:.3f} с")
+    print(f"диапазон: {batched_queries:>3} запросов, {batched_time:.3f} с")
+    print(f"кэш:      {cached_queries:>3} запросов, {cached_time:.6f} с на rerun")
+    print(f"после записи: {client.queries} запросов (дозагрузка одной даты)")
+
+
+if __name__ == '__main__':
+    main()
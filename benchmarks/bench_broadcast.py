@@ -0,0 +1,82 @@
+# benchmarks/bench_broadcast.py
+# Рассылка по клиентам на фейке Bot API с flood control (429 + retry_after):
+# отправка "в лоб" пулом потоков против Broadcaster с token bucket.
+#
+#   python benchmarks/bench_broadcast.py
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_telegram import FakeTelegramServer  # noqa: E402
+from broadcast import FAILED, SENT, Broadcaster  # noqa: E402
+from telegram_transport import TelegramTransport  # noqa: E402
+
+TOKEN = '123:TEST'
+RTT = 0.02
+CHATS = 150
+BLOCKED = {'1007', '1042'}
+LIMIT = 30  # сообщений в секунду на бота
+TEMPLATE = "Здравствуйте, {name}! {date} прием не проводится."
+
+
+def blast(transport, chat_ids):
+    """Все сообщения сразу, без учета лимитов"""
+    with ThreadPoolExecutor(16) as pool:
+        responses = list(pool.map(lambda chat_id: transport.send_message(chat_id, TEMPLATE), chat_ids))
+    return sum(1 for response in responses if response.status_code == 200)
+
+
+def run_broadcast(server, transport, chat_ids, global_rate):
+    server.reset_counters()
+    broadcaster = Broadcaster(lambda chat_id, text: transport.send_message(chat_id, text),
+                              global_rate=global_rate, workers=8)
+    progress = []
+    report = broadcaster.broadcast(
+        chat_ids, TEMPLATE, {'date': '10.01.2030'},
+        chat_context={chat_id: {'name': f"Клиент {chat_id}"} for chat_id in chat_ids},
+        on_progress=lambda done, total: progress.append(done),
+    )
+    assert progress == sorted(progress) and progress[-1] == len(chat_ids)
+    return report
+
+
+def main():
+    chat_ids = [str(1000 + n) for n in range(CHATS)]
+    with FakeTelegramServer(latency=RTT, global_limit=LIMIT, chat_limit=1, retry_after=1,
+                            blocked_chats=BLOCKED) as server:
+        transport = TelegramTransport(TOKEN, api_url=server.url, pool_size=16, retry_rate_limited=False)
+
+        started = time.perf_counter()
+        delivered = blast(transport, chat_ids)
+        blast_time = time.perf_counter() - started
+        blast_rejected = server.rejected
+        time.sleep(1.5)
+
+        paced = run_broadcast(server, transport, chat_ids, LIMIT * 0.9)
+        paced_rejected = server.rejected
+
+        # Лимит в настройках завышен: выручает только retry_after
+        aggressive = run_broadcast(server, transport, chat_ids, LIMIT * 3)
+        aggressive_rejected = server.rejected
+        transport.close()
+
+    for report in (paced, aggressive):
+        assert report.sent == CHATS - len(BLOCKED), report.sent
+        assert {chat for chat, result in report.results.items() if result['status'] == FAILED} == BLOCKED
+        assert all(result['status'] in (SENT, FAILED) for result in report.results.values())
+
+    print(f"{CHATS} чатов, лимит фейка {LIMIT}/с на бота и 1/с на чат, заблокировали бота: {len(BLOCKED)}")
+    print(f"без учета лимитов:     доставлено {delivered:>3}, 429: {blast_rejected:>3}, {blast_time:5.2f} с")
+    print(f"Broadcaster {LIMIT * 0.9:.0f}/с:      доставлено {paced.sent:>3}, 429: {paced_rejected:>3}, "
+          f"{paced.elapsed:5.2f} с")
+    print(f"Broadcaster {LIMIT * 3}/с:      доставлено {aggressive.sent:>3}, 429: {aggressive_rejected:>3}, "
+          f"{aggressive.elapsed:5.2f} с (пауз по retry_after: {aggressive.rate_limited})")
+    print(f"пример ошибки: {aggressive.results['1007']}")
+
+
+if __name__ == '__main__':
+    main()
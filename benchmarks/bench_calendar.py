@@ -0,0 +1,83 @@
+# benchmarks/bench_calendar.py
+# Поиск ближайших свободных слотов: перебор дат по одной против битовой карты.
+#
+#   python benchmarks/bench_calendar.py
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from availability import CalendarIndex, fetch_availability, fetch_day_states  # noqa: E402
+from benchmarks.fake_supabase import FakeSupabase  # noqa: E402
+
+LATENCY = 0.002
+MAX_DAYS_AHEAD = 30
+FULL_DAYS = 10
+SETTINGS = {'work_start': '09:00', 'work_end': '18:00', 'session_duration': 60}
+
+
+def make_full_calendar(today):
+    """Первые FULL_DAYS дней заняты полностью"""
+    rows = []
+    for day in range(FULL_DAYS + 1):
+        date = (today + timedelta(days=day)).isoformat()
+        for hour in range(9, 18):
+            rows.append({'id': len(rows) + 1, 'booking_date': date, 'booking_time': f"{hour:02d}:00",
+                         'status': 'confirmed'})
+    return rows
+
+
+def first_free_by_clicking(db, today, after):
+    """Как сейчас: клиент открывает даты по одной, каждая — отдельный запрос"""
+    for day in range(MAX_DAYS_AHEAD + 1):
+        date = (today + timedelta(days=day)).isoformat()
+        slots = fetch_availability(db, date, date, SETTINGS, 1, now=after - timedelta(hours=1))[date]
+        if slots:
+            return date, slots[0]
+    return None
+
+
+def main():
+    now = datetime.now().replace(hour=8, minute=0, second=0, microsecond=0)
+    today = now.date()
+    horizon_end = (today + timedelta(days=MAX_DAYS_AHEAD)).isoformat()
+    db = FakeSupabase({'bookings': make_full_calendar(today), 'blocked_slots': []}, latency=LATENCY)
+    after = now + timedelta(hours=1)
+
+    started = time.perf_counter()
+    clicked = first_free_by_clicking(db, today, after)
+    click_time, click_queries = time.perf_counter() - started, db.queries
+
+    db.reset_counters()
+    started = time.perf_counter()
+    index = CalendarIndex(ttl=300)
+    index.load(fetch_day_states(db, today.isoformat(), horizon_end), today.isoformat(), horizon_end)
+    index.ensure_grid(SETTINGS)
+    build_time, build_queries = time.perf_counter() - started, db.queries
+
+    started = time.perf_counter()
+    for _ in range(1000):
+        nearest = index.next_available(after, 5)
+    lookup_time = (time.perf_counter() - started) / 1000
+
+    assert nearest[0] == clicked, (nearest[0], clicked)
+
+    # Инкрементальное обновление: запись на первый свободный слот и ее отмена
+    started = time.perf_counter()
+    for _ in range(1000):
+        index.add(*nearest[0], 60)
+        index.remove(*nearest[0])
+    update_time = (time.perf_counter() - started) / 2000
+
+    print(f"RTT={LATENCY * 1000:.0f} мс, занято дней подряд: {FULL_DAYS + 1}")
+    print(f"перебор дат:    {click_queries:>3} запросов, {click_time:.3f} с до первого слота {clicked}")
+    print(f"построение:     {build_queries:>3} запросов, {build_time:.3f} с на горизонт {MAX_DAYS_AHEAD} дней")
+    print(f"next_available: {lookup_time * 1e6:.1f} мкс -> {nearest}")
+    print(f"обновление дня: {update_time * 1e6:.1f} мкс")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+# benchmarks/bench_client_profile.py
+# Личный кабинет: вход и переключения вкладок. Раньше каждая вкладка заново
+# хешировала телефон и запрашивала bookings (информация, ближайшая запись,
+# история, chat_id); теперь профиль загружается одним запросом при входе.
+#
+#   python benchmarks/bench_client_profile.py
+
+import os
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.dataset import make_bookings  # noqa: E402
+from benchmarks.fake_supabase import FakeSupabase  # noqa: E402
+from client_profile import ClientProfile  # noqa: E402
+from contacts import ContactDirectory  # noqa: E402
+from projections import CLIENT_HISTORY  # noqa: E402
+
+LATENCY = 0.002  # искусственный RTT до Supabase, секунд
+CLIENTS = 300
+SWITCHES = 40  # переключений вкладок за сессию
+TABS = ('current', 'profile', 'notifications', 'new', 'history')
+
+
+class LegacyCabinet:
+    """Чтения кабинета как были: отдельный запрос на каждый блок каждой вкладки"""
+
+    def __init__(self, db, contacts, phone_hash):
+        self.db = db
+        self.contacts = contacts
+        self.phone_hash = phone_hash
+
+    def login(self):
+        self.db.table('bookings').select('client_name').eq('phone_hash', self.phone_hash)\
+            .order('created_at', desc=True).limit(1).execute()
+
+    def info(self):
+        response = self.db.table('bookings').select('client_name, client_email, client_telegram')\
+            .eq('phone_hash', self.phone_hash).order('created_at', desc=True).limit(1).execute()
+        return response.data[0]['client_name']
+
+    def upcoming(self):
+        response = self.db.table('bookings').select(CLIENT_HISTORY.select)\
+            .eq('phone_hash', self.phone_hash).eq('status', 'confirmed')\
+            .gte('booking_date', datetime.now().date().isoformat())\
+            .order('booking_date').order('booking_time').limit(1).execute()
+        return response.data[0] if response.data else None
+
+    def has_active(self):
+        response = self.db.table('bookings').select('id', count='exact')\
+            .eq('phone_hash', self.phone_hash).eq('status', 'confirmed')\
+            .gte('booking_date', datetime.now().date().isoformat()).execute()
+        return response.count > 0
+
+    def history(self):
+        response = self.db.table('bookings').select(CLIENT_HISTORY.select)\
+            .eq('phone_hash', self.phone_hash)\
+            .order('booking_date', desc=True).order('booking_time', desc=True).execute()
+        return pd.DataFrame(response.data)
+
+    def render(self, tab):
+        self.contacts.get(self.phone_hash)  # сайдбар: статус уведомлений
+        self.info()                          # заголовок кабинета
+        if tab == 'current':
+            return self.upcoming()
+        if tab == 'new':
+            return self.has_active()
+        if tab == 'history':
+            return self.history()
+
+
+class ProfileCabinet:
+    """Те же вкладки из профиля сессии"""
+
+    def __init__(self, db, contacts, phone_hash):
+        self.db = db
+        self.contacts = contacts
+        self.phone_hash = phone_hash
+        self.profile = None
+
+    def login(self):
+        self.profile = ClientProfile.load(self.db, self.contacts, '', self.phone_hash)
+
+    def render(self, tab):
+        profile = self.profile
+        if tab == 'current':
+            return profile.upcoming
+        if tab == 'new':
+            return profile.has_active_booking
+        if tab == 'history':
+            return pd.DataFrame(list(profile.history))
+
+
+def session(db, cabinet):
+    db.reset_counters()
+    started = time.perf_counter()
+    cabinet.login()
+    for n in range(SWITCHES):
+        cabinet.render(TABS[n % len(TABS)])
+    return db.queries, time.perf_counter() - started
+
+
+def main():
+    rows = make_bookings(CLIENTS, per_client=8, days=365)
+    today = datetime.now().date().isoformat()
+    phone_hash = next(row['phone_hash'] for row in rows
+                      if row['status'] == 'confirmed' and row['booking_date'] >= today)
+
+    db = FakeSupabase({'bookings': rows}, latency=LATENCY)
+    legacy = LegacyCabinet(db, ContactDirectory(db), phone_hash)
+    cabinet = ProfileCabinet(db, ContactDirectory(db), phone_hash)
+
+    # Из профиля видно то же, что показывали отдельные запросы
+    cabinet.login()
+    assert cabinet.profile.upcoming == legacy.upcoming()
+    assert cabinet.profile.has_active_booking == legacy.has_active()
+    assert cabinet.profile.name == legacy.info()
+    history = legacy.history()
+    assert cabinet.render('history').equals(history.head(len(cabinet.profile.history)))
+
+    legacy_queries, legacy_time = session(db, legacy)
+    queries, elapsed = session(db, ProfileCabinet(db, ContactDirectory(db), phone_hash))
+
+    print(f"{len(rows)} записей, RTT {LATENCY * 1000:.0f} мс; вход + {SWITCHES} переключений вкладок")
+    print(f"  запросы на вкладку: {legacy_queries} запросов, {legacy_time * 1000:.0f} мс")
+    print(f"  профиль сессии:     {queries} запросов, {elapsed * 1000:.1f} мс")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/bench_clients.py
+# Сравнение старого N+1 обхода клиентов и сводки одним запросом.
+#
+#   python benchmarks/bench_clients.py
+
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import load_client_summary  # noqa: E402
+from benchmarks.dataset import make_bookings  # noqa: E402
+from benchmarks.fake_supabase import FakeSupabase  # noqa: E402
+
+LATENCY = 0.002  # искусственный RTT до Supabase, секунд
+
+
+def legacy_get_all_clients(client):
+    """Старая реализация: отдельный запрос на каждого клиента"""
+    response = client.table('bookings')\
+        .select('client_name, client_phone, client_email, client_telegram, phone_hash')\
+        .execute()
+    df = pd.DataFrame(response.data)
+    clients_df = df.groupby('phone_hash').first().reset_index()
+
+    clients_data = []
+    for phone_hash in clients_df['phone_hash'].unique():
+        client_row = clients_df[clients_df['phone_hash'] == phone_hash].iloc[0]
+        bookings_df = pd.DataFrame(
+            client.table('bookings').select('id, status, booking_date').eq('phone_hash', phone_hash).execute().data
+        )
+        clients_data.append({
+            'phone_hash': phone_hash,
+            'client_name': client_row['client_name'],
+            'client_phone': client_row['client_phone'],
+            'client_email': client_row['client_email'],
+            'client_telegram': client_row['client_telegram'],
+            'total_bookings': len(bookings_df),
+            'upcoming_bookings': int((bookings_df['status'] == 'confirmed').sum()),
+            'completed_bookings': int((bookings_df['status'] == 'completed').sum()),
+            'cancelled_bookings': int((bookings_df['status'] == 'cancelled').sum()),
+            'first_booking': bookings_df['booking_date'].min(),
+            'last_booking': bookings_df['booking_date'].max(),
+        })
+    return pd.DataFrame(clients_data)
+
+
+def measure(func, client):
+    client.reset_counters()
+    started = time.perf_counter()
+    result = func(client)
+    return result, client.queries, time.perf_counter() - started
+
+
+def main():
+    print(f"RTT={LATENCY * 1000:.0f} мс")
+    print(f"{'клиентов':>9} | {'N+1 запросов':>12} | {'N+1, с':>8} | {'сводка запросов':>15} | {'сводка, с':>9}")
+    for clients in (10, 100, 500, 2000):
+        client = FakeSupabase({'bookings': make_bookings(clients, per_client=2, days=400)}, latency=LATENCY)
+
+        legacy, legacy_queries, legacy_time = measure(legacy_get_all_clients, client)
+        summary, summary_queries, summary_time = measure(load_client_summary, client)
+
+        pd.testing.assert_frame_equal(
+            legacy.reset_index(drop=True), summary.reset_index(drop=True), check_dtype=False
+        )
+        print(f"{clients:>9} | {legacy_queries:>12} | {legacy_time:>8.3f} | {summary_queries:>15} | {summary_time:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
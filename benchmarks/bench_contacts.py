@@ -0,0 +1,92 @@
+# benchmarks/bench_contacts.py
+# Поиск chat_id клиента: запрос к bookings на каждом перерисовывании кабинета
+# и обновление всех записей клиента при подключении против client_contacts
+# с TTL-кэшем (contacts.ContactDirectory).
+#
+#   python benchmarks/bench_contacts.py
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.dataset import make_bookings  # noqa: E402
+from benchmarks.fake_supabase import FakeSupabase  # noqa: E402
+from contacts import ContactDirectory  # noqa: E402
+
+LATENCY = 0.002  # искусственный RTT до Supabase, секунд
+CLIENTS = 500
+PER_CLIENT = 8
+RERUNS = 200
+
+
+def legacy_get_chat_id(client, phone_hash):
+    """Как было в get_client_telegram_chat_id"""
+    response = client.table('bookings')\
+        .select('telegram_chat_id')\
+        .eq('phone_hash', phone_hash)\
+        .not_.is_('telegram_chat_id', None)\
+        .limit(1)\
+        .execute()
+    if response.data and response.data[0]['telegram_chat_id']:
+        return response.data[0]['telegram_chat_id']
+    return None
+
+
+def legacy_connect(client, phone_hash, chat_id):
+    """Как было в save_telegram_chat_id: обновление всех записей клиента"""
+    response = client.table('bookings')\
+        .update({'telegram_chat_id': chat_id})\
+        .eq('phone_hash', phone_hash)\
+        .execute()
+    return len(response.data)
+
+
+def measure(client, fn):
+    client.reset_counters()
+    started = time.perf_counter()
+    result = fn()
+    return result, client.queries, time.perf_counter() - started
+
+
+def main():
+    rows = make_bookings(CLIENTS, per_client=PER_CLIENT, days=365)
+    phone_hashes = list(dict.fromkeys(row['phone_hash'] for row in rows))
+    phone_hash = phone_hashes[1]  # клиент с уже подключенным Telegram
+
+    legacy = FakeSupabase({'bookings': rows}, latency=LATENCY)
+    client = FakeSupabase({'bookings': rows}, latency=LATENCY)
+    contacts = ContactDirectory(client)
+
+    # Кабинет клиента: поиск chat_id на каждом перерисовывании
+    _, legacy_queries, legacy_time = measure(
+        legacy, lambda: [legacy_get_chat_id(legacy, phone_hash) for _ in range(RERUNS)])
+    _, new_queries, new_time = measure(
+        client, lambda: [contacts.get(phone_hash) for _ in range(RERUNS)])
+    hits = contacts.hits
+
+    # Подключение Telegram новым клиентом
+    new_client = phone_hashes[2]
+    written, legacy_connect_queries, _ = measure(legacy, lambda: legacy_connect(legacy, new_client, '777'))
+    _, connect_queries, _ = measure(client, lambda: contacts.connect(new_client, '777'))
+    assert contacts.get(new_client) == '777' and legacy_get_chat_id(legacy, new_client) == '777'
+
+    # Все клиенты находятся так же, как раньше (chat_id из bookings переносится при первом чтении)
+    expected = {h: legacy_get_chat_id(legacy, h) for h in phone_hashes}
+    fresh = ContactDirectory(client)
+    found, batch_queries, _ = measure(client, lambda: fresh.get_many(phone_hashes))
+    assert found == {h: chat_id for h, chat_id in expected.items() if chat_id}, "chat_id расходятся"
+    assert len(client.tables['client_contacts']) == len(found)
+
+    print(f"{CLIENTS} клиентов × {PER_CLIENT} записей, RTT {LATENCY * 1000:.0f} мс")
+    print(f"{RERUNS} перерисовок кабинета: {legacy_queries} запросов, {legacy_time * 1000:.0f} мс -> "
+          f"{new_queries} запросов, {new_time * 1000:.1f} мс (попаданий в кэш: {hits})")
+    print(f"подключение Telegram: {written} строк bookings за {legacy_connect_queries} запрос -> "
+          f"1 строка client_contacts за {connect_queries} запрос")
+    print(f"все {len(phone_hashes)} клиентов одним вызовом get_many: {batch_queries} запросов "
+          f"(найдено {len(found)} chat_id, старые перенесены в client_contacts)")
+
+
+if __name__ == '__main__':
+    main()
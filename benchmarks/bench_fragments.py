@@ -0,0 +1,121 @@
+# benchmarks/bench_fragments.py
+# Время скрипта на одно действие: полный прогон habit_tracker.py (как было —
+# клик по слоту, удаление записи или разблокировка перезапускали весь скрипт:
+# стили, сайдбар со статистикой, все вкладки) против прогона одного фрагмента.
+#
+# Приложение запускается через streamlit.testing (AppTest) на SQLite с
+# DEBUG_QUERIES=true. AppTest всегда выполняет скрипт целиком, поэтому
+# "полный прогон" — строка сайдбара "Запросов за прогон", а "фрагмент" —
+# строка, которую фрагмент пишет о своем собственном выполнении: ровно
+# эту часть сервер перезапускает при клике внутри st.fragment.
+#
+#   python benchmarks/bench_fragments.py
+
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.dataset import make_bookings  # noqa: E402
+from storage import SQLiteStorage  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, 'habit_tracker.py')
+
+CLIENTS = 200
+PER_CLIENT = 5
+BLOCKED_SLOTS = 30
+
+PAGE_RE = re.compile(r'Запросов за прогон: (\d+) .* (\d+) мс')
+FRAGMENT_RE = re.compile(r'Фрагмент (\w+): (\d+) запросов · (\d+) мс')
+
+
+def seed(path):
+    db = SQLiteStorage(path)
+    rows = make_bookings(CLIENTS, per_client=PER_CLIENT, days=120)
+    db.table('bookings').insert([
+        {key: value for key, value in row.items() if key not in ('id', 'telegram_chat_id')} for row in rows
+    ]).execute()
+    today = datetime.now().date()
+    db.table('blocked_slots').insert([
+        {'block_date': (today + timedelta(days=n + 1)).isoformat(), 'block_time': '12:30', 'reason': f"Блокировка {n}"}
+        for n in range(BLOCKED_SLOTS)
+    ] + [
+        {'block_date': (today + timedelta(days=n + 1)).isoformat(), 'block_time': None, 'reason': 'Выходной'}
+        for n in range(BLOCKED_SLOTS, BLOCKED_SLOTS + 5)
+    ]).execute()
+    db.close()
+    return len(rows)
+
+
+def timings(at):
+    """(запросы, мс) полного прогона и {фрагмент: (запросы, мс)}"""
+    page = None
+    fragments = {}
+    for caption in at.caption:
+        match = PAGE_RE.search(caption.value)
+        if match:
+            page = int(match.group(1)), int(match.group(2))
+        match = FRAGMENT_RE.search(caption.value)
+        if match:
+            fragments[match.group(1)] = int(match.group(2)), int(match.group(3))
+    return page, fragments
+
+
+def open_admin_tab(at, tab):
+    """Раздел админ-панели: рисуется только выбранный (ADMIN_TABS)"""
+    at.radio(key='admin_tab').set_value(tab).run()
+    assert not at.exception, [e.value for e in at.exception]
+
+
+def interaction(at, title, fragment, find_button):
+    button = find_button(at)
+    button.click().run()
+    assert not at.exception, [e.value for e in at.exception]
+    page, fragments = timings(at)
+    own = fragments[fragment]
+    print(f"{title:<28} | {page[0]:>5} запр. {page[1]:>5} мс | {own[0]:>5} запр. {own[1]:>5} мс | {fragment}")
+
+
+def main():
+    from streamlit.testing.v1 import AppTest
+
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, 'bookings.db')
+    total = seed(path)
+    os.environ.update(STORAGE_BACKEND='sqlite', SQLITE_PATH=path, DEBUG_QUERIES='true',
+                      TELEGRAM_BOT_TOKEN='', TELEGRAM_ADMIN_CHAT_ID='', TELEGRAM_RECEIVE_UPDATES='false')
+    os.chdir(ROOT)
+
+    print(f"{total} записей, {BLOCKED_SLOTS} заблокированных слотов, SQLite")
+    print(f"{'действие':<28} | {'полный прогон':>20} | {'фрагмент':>20} |")
+
+    guest = AppTest.from_file(APP, default_timeout=60)
+    guest.run()
+    interaction(guest, 'выбор слота (гость)', 'render_guest_booking',
+                lambda at: next(b for b in at.button if b.label.startswith('🕐')))
+    interaction(guest, 'другой слот', 'render_guest_booking',
+                lambda at: [b for b in at.button if b.label.startswith('🕐')][-1])
+
+    admin = AppTest.from_file(APP, default_timeout=60)
+    admin.session_state['admin_logged_in'] = True
+    admin.run()
+    assert not admin.exception, [e.value for e in admin.exception]
+    open_admin_tab(admin, '📋 Записи')
+    interaction(admin, 'следующая страница записей', 'render_bookings_admin',
+                lambda at: next(b for b in at.button if b.label == 'Далее ➡️'))
+    interaction(admin, 'удаление записи', 'render_bookings_admin',
+                lambda at: next(b for b in at.button if b.key and b.key.startswith('delete_')))
+    open_admin_tab(admin, '🚫 Блокировки')
+    interaction(admin, 'разблокировка слота', 'render_blocked_slots',
+                lambda at: next(b for b in at.button if b.key and b.key.startswith('unblock_slot_')))
+    interaction(admin, 'разблокировка дня', 'render_blocked_dates',
+                lambda at: next(b for b in at.button if b.key and b.key.startswith('unblock_')
+                                and not b.key.startswith('unblock_slot_')))
+
+
+if __name__ == '__main__':
+    main()
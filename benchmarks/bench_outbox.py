@@ -0,0 +1,112 @@
+# benchmarks/bench_outbox.py
+# Outbox уведомлений (notifications.NotificationOutbox) против отправки в потоке
+# записи: время "отправки формы" при медленном Telegram и поведение при сбое API —
+# раньше неудачное сообщение терялось, теперь ждет в outbox и уходит после сбоя.
+#
+#   python benchmarks/bench_outbox.py
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_telegram import FakeTelegramServer  # noqa: E402
+from notifications import DEAD, PENDING, SENT, NotificationOutbox  # noqa: E402
+from storage import SQLiteStorage  # noqa: E402
+from telegram_transport import TelegramTransport  # noqa: E402
+
+TOKEN = '123:TEST'
+SLOW_RTT = 0.25  # api.telegram.org отвечает медленно
+BOOKINGS = 8
+OUTAGE_MESSAGES = 60
+OUTAGE_SECONDS = 1.5
+
+
+def messages(booking_id):
+    return [
+        {'booking_id': booking_id, 'kind': 'created_admin', 'chat_id': 'admin', 'text': f"Новая запись #{booking_id}"},
+        {'booking_id': booking_id, 'kind': 'created_client', 'chat_id': str(booking_id),
+         'text': f"Запись #{booking_id} подтверждена"},
+    ]
+
+
+def submit_inline(transport, booking_id):
+    """Как было до фоновой отправки: админ и клиент уведомляются до st.rerun()"""
+    return [transport.send_message(m['chat_id'], m['text']).status_code == 200 for m in messages(booking_id)]
+
+
+def measure(submit):
+    latencies = []
+    for booking_id in range(1, BOOKINGS + 1):
+        started = time.perf_counter()
+        submit(booking_id)
+        latencies.append(time.perf_counter() - started)
+    return max(latencies)
+
+
+def wait_for(predicate, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def bench_form_latency():
+    with FakeTelegramServer(latency=SLOW_RTT) as server:
+        transport = TelegramTransport(TOKEN, api_url=server.url, pool_size=2, retries=0)
+        inline = measure(lambda booking_id: submit_inline(transport, booking_id))
+
+        server.reset_counters()
+        outbox = NotificationOutbox(SQLiteStorage(':memory:'), transport.send_message, poll_interval=0.05).start()
+        started = time.perf_counter()
+        queued = measure(lambda booking_id: outbox.enqueue(messages(booking_id)))
+        assert wait_for(lambda: outbox.summary()[SENT] == BOOKINGS * 2)
+        drained = time.perf_counter() - started
+        outbox.stop()
+        transport.close()
+
+    print(f"RTT Telegram={SLOW_RTT * 1000:.0f} мс, записей: {BOOKINGS}, по 2 уведомления")
+    print(f"  в потоке записи:   {inline * 1000:7.1f} мс на отправку формы (макс.)")
+    print(f"  запись в outbox:   {queued * 1000:7.1f} мс на отправку формы (макс.), "
+          f"доставлено {len(server.messages)} за {drained:.2f} с")
+
+
+def bench_outage():
+    with FakeTelegramServer(blocked_chats=['blocked']) as server:
+        transport = TelegramTransport(TOKEN, api_url=server.url, pool_size=2, retries=0)
+        server.down = True
+
+        # Как было: неудачная отправка печатает ошибку и теряется
+        lost = sum(not ok for booking_id in range(OUTAGE_MESSAGES // 2) for ok in submit_inline(transport, booking_id))
+        server.reset_counters()
+
+        db = SQLiteStorage(':memory:')
+        outbox = NotificationOutbox(db, transport.send_message, batch_size=10, max_attempts=8,
+                                    backoff=0.2, max_backoff=0.5, poll_interval=0.05).start()
+        for booking_id in range(OUTAGE_MESSAGES // 2):
+            outbox.enqueue(messages(booking_id))
+        outbox.enqueue([{'booking_id': None, 'kind': 'test', 'chat_id': 'blocked', 'text': 'недоставляемое'}])
+
+        time.sleep(OUTAGE_SECONDS)
+        requests_during_outage = server.requests
+        waiting = outbox.summary()[PENDING]
+        server.down = False
+
+        assert wait_for(lambda: outbox.summary()[SENT] == OUTAGE_MESSAGES)
+        counts = outbox.summary()
+        outbox.stop()
+        transport.close()
+
+    assert counts[DEAD] == 1 and counts[PENDING] == 0, counts
+    print(f"сбой Telegram {OUTAGE_SECONDS:.1f} с, {OUTAGE_MESSAGES} уведомлений:")
+    print(f"  в потоке записи: потеряно {lost} из {OUTAGE_MESSAGES}")
+    print(f"  outbox: {requests_during_outage} запросов к API за время сбоя, {waiting} ждали в очереди; "
+          f"после восстановления доставлено {counts[SENT]}, в dead letter {counts[DEAD]} (бот заблокирован)")
+
+
+if __name__ == '__main__':
+    bench_form_latency()
+    bench_outage()
@@ -0,0 +1,47 @@
+# benchmarks/bench_projections.py
+# Размер ответа на вызов: select('*') против проекции экрана.
+#
+#   python benchmarks/bench_projections.py
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.dataset import make_bookings  # noqa: E402
+from benchmarks.fake_supabase import FakeSupabase  # noqa: E402
+from projections import (  # noqa: E402
+    ADMIN_BOOKING_CARD, ADMIN_CLIENT_HISTORY, BOOKING_NOTIFY, CLIENT_HISTORY, CLIENT_PROFILE, UPCOMING_NOTIFY,
+)
+
+# Типичная выборка каждого экрана: (проекция, описание, фильтр по строкам)
+SCREENS = [
+    (CLIENT_HISTORY, 'история клиента', lambda q, r: q.eq('phone_hash', r['phone_hash'])),
+    (CLIENT_PROFILE, 'профиль клиента при входе', lambda q, r: q.eq('phone_hash', r['phone_hash']).limit(20)),
+    (UPCOMING_NOTIFY, 'предстоящие для Telegram', lambda q, r: q.eq('phone_hash', r['phone_hash'])),
+    (ADMIN_BOOKING_CARD, 'страница "Записи" (25)', lambda q, r: q.limit(25)),
+    (ADMIN_CLIENT_HISTORY, 'история во вкладке "Клиенты"', lambda q, r: q.eq('phone_hash', r['phone_hash'])),
+    (BOOKING_NOTIFY, 'отмена/смена статуса', lambda q, r: q.eq('id', r['id'])),
+]
+
+
+def response_bytes(db, columns, apply_filter, row):
+    db.reset_counters()
+    apply_filter(db.table('bookings').select(columns), row).execute()
+    return db.bytes_sent
+
+
+def main():
+    rows = make_bookings(200, per_client=5, days=400)
+    db = FakeSupabase({'bookings': rows})
+    sample = rows[0]
+
+    print(f"{'экран':<30} | {'select(*)':>10} | {'проекция':>9} | {'экономия':>8}")
+    for projection, title, apply_filter in SCREENS:
+        full = response_bytes(db, '*', apply_filter, sample)
+        projected = response_bytes(db, projection.select, apply_filter, sample)
+        print(f"{title:<30} | {full:>10} | {projected:>9} | {100 - projected * 100 / full:>7.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/bench_reminders.py
+# Напоминания: threading.Timer на запись против ReminderScheduler
+# (один поток, таблица reminders) — потоки и дубли. Перезапуск, перенос, отмена
+# и повторы проверяются в tests/test_reminders.py.
+#
+#   python benchmarks/bench_reminders.py
+
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reminders import ReminderScheduler  # noqa: E402
+from storage import SQLiteStorage  # noqa: E402
+
+BOOKINGS = 2000
+DAYS_AHEAD = 30
+
+
+def make_bookings(now, count):
+    bookings = []
+    for i in range(count):
+        start = now + timedelta(days=1 + i % DAYS_AHEAD, hours=i % 9)
+        bookings.append({'id': i + 1, 'booking_date': start.strftime('%Y-%m-%d'),
+                         'booking_time': start.strftime('%H:00'), 'client_name': f"Клиент {i}"})
+    return bookings
+
+
+def bench_threads(now, bookings):
+    """Потоки ОС: Timer на каждое напоминание против одной кучи"""
+    base = threading.active_count()
+    timers = []
+    for booking in bookings:
+        delay = (datetime.strptime(f"{booking['booking_date']} {booking['booking_time']}", "%Y-%m-%d %H:%M")
+                 - timedelta(hours=1) - now).total_seconds()
+        timer = threading.Timer(delay, lambda: None)
+        timer.daemon = True
+        timer.start()
+        timers.append(timer)
+    timer_threads = threading.active_count() - base
+    for timer in timers:
+        timer.cancel()
+
+    db = SQLiteStorage(':memory:')
+    base = threading.active_count()
+    scheduler = ReminderScheduler(db, lambda reminder: True).start()
+    started = time.perf_counter()
+    for booking in bookings:
+        scheduler.schedule(booking, 'chat')
+    schedule_time = (time.perf_counter() - started) / len(bookings)
+    scheduler_threads = threading.active_count() - base
+
+    # Клиент переподключает Telegram — повторное планирование не плодит напоминаний
+    for booking in bookings:
+        scheduler.schedule(booking, 'chat')
+    rows = db.table('reminders').select('id', count='exact').execute().count
+    assert rows == len(bookings) and scheduler.pending == len(bookings)
+    scheduler.stop()
+
+    print(f"{len(bookings)} напоминаний на {DAYS_AHEAD} дней вперед:")
+    print(f"  threading.Timer:   {timer_threads} потоков")
+    print(f"  ReminderScheduler: {scheduler_threads} поток, {schedule_time * 1e6:.0f} мкс на schedule(), "
+          f"строк после повторного подключения: {rows}")
+
+
+if __name__ == '__main__':
+    now = datetime.now().replace(second=0, microsecond=0)
+    bench_threads(now, make_bookings(now, BOOKINGS))
@@ -0,0 +1,135 @@
+# benchmarks/bench_request_memo.py
+# Запросы за один прогон скрипта: кабинет клиента (сайдбар + "Текущая запись"
+# + отмена) и сайдбар администратора со вкладкой "Аналитика" — без памяти
+# прогона и с request_memo. Функции повторяют чтения habit_tracker.
+#
+#   python benchmarks/bench_request_memo.py
+
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import load_stats  # noqa: E402
+from benchmarks.dataset import make_bookings  # noqa: E402
+from benchmarks.fake_supabase import FakeSupabase  # noqa: E402
+from request_memo import begin_request, end_request, request_memo, track_queries  # noqa: E402
+
+LATENCY = 0.002  # искусственный RTT до Supabase, секунд
+CLIENTS = 300
+RERUNS = 50
+
+
+def make_reads(db):
+    """Чтения страницы в виде habit_tracker; memo — декоратор (request_memo или без него)"""
+
+    def reads(memo):
+        @memo
+        def get_client_info(phone_hash):
+            response = db.table('bookings').select('client_name, client_email, client_telegram')\
+                .eq('phone_hash', phone_hash)\
+                .order('created_at', desc=True)\
+                .limit(1)\
+                .execute()
+            return response.data[0] if response.data else None
+
+        @memo
+        def has_active_booking(phone_hash):
+            response = db.table('bookings')\
+                .select('id', count='exact')\
+                .eq('phone_hash', phone_hash)\
+                .eq('status', 'confirmed')\
+                .gte('booking_date', datetime.now().date().isoformat())\
+                .execute()
+            return response.count > 0
+
+        @memo
+        def get_upcoming_client_booking(phone_hash):
+            response = db.table('bookings')\
+                .select('id, booking_date, booking_time, status')\
+                .eq('phone_hash', phone_hash)\
+                .eq('status', 'confirmed')\
+                .gte('booking_date', datetime.now().date().isoformat())\
+                .order('booking_date')\
+                .order('booking_time')\
+                .limit(1)\
+                .execute()
+            return response.data[0] if response.data else None
+
+        @memo
+        def get_client_telegram_chat_id(phone_hash):
+            # Без кэша ContactDirectory — как чтение из bookings до client_contacts
+            response = db.table('bookings')\
+                .select('telegram_chat_id')\
+                .eq('phone_hash', phone_hash)\
+                .not_.is_('telegram_chat_id', None)\
+                .limit(1)\
+                .execute()
+            return response.data[0]['telegram_chat_id'] if response.data else None
+
+        @memo
+        def get_stats():
+            stats = load_stats(db)
+            return stats['total'], stats['upcoming'], stats['this_month'], stats['this_week']
+
+        def client_page(phone_hash):
+            get_client_telegram_chat_id(phone_hash)           # сайдбар: статус уведомлений
+            if has_active_booking(phone_hash):                # "Текущая запись"
+                get_client_info(phone_hash)
+                get_upcoming_client_booking(phone_hash)
+                get_client_telegram_chat_id(phone_hash)       # блок уведомлений записи
+                get_client_telegram_chat_id(phone_hash)       # обработчик отмены
+            has_active_booking(phone_hash)                    # "Новая запись"
+            get_client_info(phone_hash)
+
+        def admin_page():
+            get_stats()                                       # сайдбар
+            get_stats()                                       # вкладка "Аналитика"
+
+        return client_page, admin_page
+
+    return reads
+
+
+def run(db, page, memo):
+    """Запросы и время на прогон"""
+    started = time.perf_counter()
+    queries = []
+    for _ in range(RERUNS):
+        scope = begin_request() if memo else None
+        before = db.queries
+        page()
+        queries.append(db.queries - before)
+        if scope is not None:
+            assert scope.queries == queries[-1]
+        end_request()
+    return max(queries), (time.perf_counter() - started) / RERUNS
+
+
+def main():
+    rows = make_bookings(CLIENTS, per_client=6, days=120)
+    client = FakeSupabase({'bookings': rows}, latency=LATENCY)
+    db = track_queries(client)
+    today = datetime.now().date().isoformat()
+    phone_hash = next(row['phone_hash'] for row in rows
+                      if row['status'] == 'confirmed' and row['booking_date'] >= today)
+
+    reads = make_reads(db)
+    plain_client, plain_admin = reads(lambda func: func)
+    memo_client, memo_admin = reads(request_memo)
+
+    print(f"{len(rows)} записей, RTT {LATENCY * 1000:.0f} мс, {RERUNS} прогонов")
+    for label, plain, memoized in (
+        ('кабинет клиента', lambda: plain_client(phone_hash), lambda: memo_client(phone_hash)),
+        ('сайдбар + аналитика', plain_admin, memo_admin),
+    ):
+        plain_queries, plain_time = run(client, plain, memo=False)
+        memo_queries, memo_time = run(client, memoized, memo=True)
+        print(f"  {label}: {plain_queries} запросов, {plain_time * 1000:.1f} мс -> "
+              f"{memo_queries} запросов, {memo_time * 1000:.1f} мс за прогон")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+# benchmarks/bench_reschedule.py
+# Каскад переносов и отмен: тысячи событий записей через шину booking_events.
+# Раньше Timer напоминания оставался взведенным на старое время (или к нему
+# добавлялся новый); теперь ReminderScheduler и CalendarIndex обновляются
+# по booking_id — куча ограничена, поток один, база и индексы согласованы.
+#
+#   python benchmarks/bench_reschedule.py
+
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from availability import CalendarIndex  # noqa: E402
+from booking_events import (  # noqa: E402
+    CANCELLED, CREATED, DELETED, RESCHEDULED, RESTORED, BookingEvent, BookingEvents
+)
+from reminders import COMPACT_SLACK, PENDING, ReminderScheduler, booking_datetime  # noqa: E402
+from storage import SQLiteStorage  # noqa: E402
+
+BOOKINGS = 500
+EVENTS = 20000
+LEGACY_EVENTS = 3000  # каждый Timer — поток ОС, больше не запускаем
+DAYS_AHEAD = 30
+SETTINGS = {'work_start': '09:00', 'work_end': '18:00', 'session_duration': 60}
+
+
+def random_slot(rng, now):
+    day = now + timedelta(days=rng.randint(1, DAYS_AHEAD))
+    return day.strftime('%Y-%m-%d'), f"{rng.randint(9, 17):02d}:00"
+
+
+def make_events(now, seed=7):
+    """Поток событий как из мутаций habit_tracker: создание, затем переносы/отмены/восстановления"""
+    rng = random.Random(seed)
+    bookings = {}  # id -> {'date', 'time', 'status'}
+    events = []
+    for booking_id in range(1, BOOKINGS + 1):
+        date, time_ = random_slot(rng, now)
+        bookings[booking_id] = {'date': date, 'time': time_, 'status': 'confirmed'}
+        events.append(BookingEvent(CREATED, booking_id, date, time_, session_duration=60, chat_id='chat'))
+
+    for _ in range(EVENTS):
+        booking_id = rng.choice(list(bookings))
+        booking = bookings[booking_id]
+        active = booking['status'] != 'cancelled'
+        roll = rng.random()
+        if roll < 0.6:
+            date, time_ = random_slot(rng, now)
+            events.append(BookingEvent(RESCHEDULED, booking_id, date, time_, session_duration=60,
+                                       old_date=booking['date'], old_time=booking['time'], was_active=active))
+            booking.update(date=date, time=time_)
+        elif roll < 0.8 and active:
+            events.append(BookingEvent(CANCELLED, booking_id, booking['date'], booking['time'], session_duration=60))
+            booking['status'] = 'cancelled'
+        elif roll < 0.97 and not active:
+            events.append(BookingEvent(RESTORED, booking_id, booking['date'], booking['time'], session_duration=60))
+            booking['status'] = 'confirmed'
+        elif roll >= 0.97 and len(bookings) > BOOKINGS // 2:
+            events.append(BookingEvent(DELETED, booking_id, booking['date'], booking['time'], session_duration=60,
+                                       was_active=active))
+            del bookings[booking_id]
+    return events, bookings
+
+
+def bench_legacy(now, events):
+    """Timer на запись: перенос взводит новый, старый продолжает тикать"""
+    base = threading.active_count()
+    timers = []
+    armed = {}  # booking_id -> время, на которое должно уйти напоминание
+    for event in events:
+        if event.kind in (CREATED, RESCHEDULED, RESTORED):
+            remind_at = booking_datetime(event.booking_date, event.booking_time) - timedelta(hours=1)
+            timer = threading.Timer((remind_at - now).total_seconds(), lambda: None)
+            timer.daemon = True
+            timer.start()
+            timers.append(timer)
+            armed[event.booking_id] = remind_at
+        else:
+            armed.pop(event.booking_id, None)
+    live = threading.active_count() - base
+    for timer in timers:
+        timer.cancel()
+    return live, len(armed)
+
+
+def bench_events(now, events, bookings):
+    db = SQLiteStorage(':memory:')
+    calendar = CalendarIndex(ttl=3600)
+    horizon = (now.strftime('%Y-%m-%d'), (now + timedelta(days=DAYS_AHEAD)).strftime('%Y-%m-%d'))
+    calendar.load({}, *horizon)
+    calendar.ensure_grid(SETTINGS)
+
+    base = threading.active_count()
+    scheduler = ReminderScheduler(db, lambda reminder: True).start()
+    bus = BookingEvents()
+    bus.subscribe(calendar.on_booking_event)
+    bus.subscribe(scheduler.on_booking_event)
+
+    max_heap = 0
+    started = time.perf_counter()
+    for event in events:
+        bus.emit(event)
+        heap, pending = scheduler.heap_size, scheduler.pending
+        assert heap <= 2 * pending + COMPACT_SLACK + 1, (heap, pending)
+        max_heap = max(max_heap, heap)
+    per_event = (time.perf_counter() - started) / len(events)
+    threads = threading.active_count() - base
+
+    # База, индекс напоминаний и календарь совпадают с итоговым состоянием записей
+    active = {booking_id: booking for booking_id, booking in bookings.items() if booking['status'] != 'cancelled'}
+    rows = db.table('reminders').select('booking_id, remind_at, status').execute().data
+    pending_rows = {row['booking_id']: row['remind_at'] for row in rows if row['status'] == PENDING}
+    expected = {
+        booking_id: (booking_datetime(booking['date'], booking['time']) - timedelta(hours=1)).strftime('%Y-%m-%d %H:%M:%S')
+        for booking_id, booking in active.items()
+    }
+    assert pending_rows == expected
+    assert {key[0] for key in scheduler._due} == set(expected)
+    busy = Counter((day, start) for day, items in calendar._busy.items() for start, _ in items)
+    assert busy == Counter((booking['date'], int(booking['time'][:2]) * 60) for booking in active.values())
+    scheduler.stop()
+    return threads, per_event, max_heap, scheduler.pending
+
+
+def main():
+    now = datetime.now().replace(second=0, microsecond=0)
+    events, bookings = make_events(now)
+    kinds = Counter(event.kind for event in events)
+
+    legacy_threads, legacy_armed = bench_legacy(now, events[:BOOKINGS + LEGACY_EVENTS])
+    threads, per_event, max_heap, pending = bench_events(now, events, bookings)
+
+    print(f"{len(events)} событий по {BOOKINGS} записям: "
+          + ", ".join(f"{kind} {count}" for kind, count in kinds.most_common()))
+    print(f"  threading.Timer (первые {BOOKINGS + LEGACY_EVENTS} событий): {legacy_threads} живых таймеров "
+          f"на {legacy_armed} актуальных напоминаний")
+    print(f"  события → ReminderScheduler: {threads} поток, куча не больше {max_heap} "
+          f"при {pending} актуальных, {per_event * 1e6:.0f} мкс на событие")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/bench_slots.py
+# Интервальный движок слотов: корректность при смене длительности и
+# стоимость расчета по сравнению с перебором списков.
+#
+#   python benchmarks/bench_slots.py
+
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from availability import DayState, build_day_states, day_intervals, free_slots_by_date, free_starts  # noqa: E402
+
+
+def check_duration_change():
+    """Запись на 90 минут, сделанная до смены длительности на 60, закрывает пересекающиеся слоты"""
+    day = '2030-01-10'
+    booked = [
+        {'booking_date': day, 'booking_time': '10:00', 'session_duration': 90},
+        {'booking_date': day, 'booking_time': '13:30', 'session_duration': 90},  # старая сетка 09:00 + k*90
+    ]
+    states = build_day_states(day, day, booked, [{'block_date': day, 'block_time': '16:00'}])
+    settings = {'work_start': '09:00', 'work_end': '18:00', 'session_duration': 60}
+    free = free_slots_by_date(states, settings, datetime(2030, 1, 1), 1)[day]
+
+    # Старая проверка по строкам пропустила бы 11:00, 13:00 и 14:00
+    legacy_taken = {'10:00', '13:30', '16:00'}
+    legacy = [f"{h:02d}:00" for h in range(9, 18) if f"{h:02d}:00" not in legacy_taken]
+
+    assert free == ['09:00', '12:00', '15:00', '17:00'], free
+    print(f"по строкам: {legacy}")
+    print(f"интервалы:  {free}")
+
+
+def naive_free_starts(bookings, work_start, work_end, step, duration):
+    """Перебор: каждый слот сравнивается с каждой занятостью"""
+    result = []
+    for start in range(work_start, work_end, step):
+        if all(start + duration <= b_start or b_end <= start for b_start, b_end in bookings):
+            result.append(start)
+    return result
+
+
+def bench_many_calendars(calendars=2000, per_day=40, step=10, duration=50, seed=1):
+    """Много календарей (практиков) с мелкой сеткой"""
+    rng = random.Random(seed)
+    days = []
+    for _ in range(calendars):
+        busy = tuple((rng.randrange(8 * 60, 20 * 60, 5), rng.choice((30, 45, 60, 90))) for _ in range(per_day))
+        days.append(DayState(False, busy))
+
+    started = time.perf_counter()
+    naive = [naive_free_starts([(s, s + d) for s, d in day.busy], 8 * 60, 20 * 60, step, duration) for day in days]
+    naive_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    fast = [free_starts(day_intervals(day, duration), 8 * 60, 20 * 60, step, duration) for day in days]
+    fast_time = time.perf_counter() - started
+
+    assert naive == fast
+    print(f"{calendars} календарей × {per_day} занятостей, сетка {step} мин:")
+    print(f"  перебор списков: {naive_time:.3f} с")
+    print(f"  слияние + bisect: {fast_time:.3f} с")
+
+
+if __name__ == '__main__':
+    check_duration_change()
+    bench_many_calendars()
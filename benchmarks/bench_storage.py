@@ -0,0 +1,67 @@
+# benchmarks/bench_storage.py
+# Время типовых чтений: удаленный Supabase (эмуляция RTT) против SQLite.
+#
+#   python benchmarks/bench_storage.py
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import load_client_summary  # noqa: E402
+from availability import fetch_availability  # noqa: E402
+from benchmarks.dataset import make_bookings  # noqa: E402
+from benchmarks.fake_supabase import FakeSupabase  # noqa: E402
+from storage import SQLiteStorage, SupabaseStorage  # noqa: E402
+
+LATENCY = 0.03  # типичный RTT до hosted Postgres, секунд
+SETTINGS = {'work_start': '09:00', 'work_end': '18:00', 'session_duration': 60}
+REPEAT = 20
+
+
+def client_info(db, phone_hash):
+    return db.table('bookings').select('client_name, client_email, client_telegram')\
+        .eq('phone_hash', phone_hash).order('created_at', desc=True).limit(1).execute().data
+
+
+def run(db, phone_hash):
+    today = datetime.now().date()
+    timings = {}
+    for title, func in (
+        ('get_client_info', lambda: client_info(db, phone_hash)),
+        ('availability 30 дней', lambda: fetch_availability(
+            db, today.isoformat(), (today + timedelta(days=30)).isoformat(), SETTINGS, 1)),
+        ('сводка клиентов', lambda: load_client_summary(db)),
+    ):
+        started = time.perf_counter()
+        for _ in range(REPEAT):
+            func()
+        timings[title] = (time.perf_counter() - started) / REPEAT * 1000
+    return timings
+
+
+def main():
+    rows = make_bookings(500, per_client=2, days=200)
+    phone_hash = rows[0]['phone_hash']
+
+    remote = SupabaseStorage(FakeSupabase({'bookings': rows, 'blocked_slots': []}, latency=LATENCY))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        local = SQLiteStorage(os.path.join(tmp, 'bookings.db'))
+        local.table('bookings').insert(rows).execute()
+
+        remote_timings = run(remote, phone_hash)
+        local_timings = run(local, phone_hash)
+        local.close()
+
+    print(f"RTT={LATENCY * 1000:.0f} мс, записей: {len(rows)}")
+    print(f"{'операция':<22} | {'supabase, мс':>12} | {'sqlite, мс':>10}")
+    for title in remote_timings:
+        print(f"{title:<22} | {remote_timings[title]:>12.2f} | {local_timings[title]:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+# benchmarks/bench_stylesheet.py
+# Байты стилей, отправляемые браузеру за прогон скрипта: исходный <style>
+# с отступами, минифицированный <style> и вставка в <head> на полных прогонах
+# (stylesheet.Stylesheet.injector); прогоны фрагментов стили не отправляют.
+#
+#   python benchmarks/bench_stylesheet.py
+
+import os
+import sys
+import textwrap
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stylesheet import STYLES_PATH, Stylesheet  # noqa: E402
+
+RERUNS = 30  # прогонов за сессию: клики, st.rerun() после действий
+FRAGMENT_SHARE = 0.5  # доля прогонов фрагментов (выбор даты, слота, фильтры)
+
+
+def legacy_payload() -> str:
+    """Тело st.markdown из прежнего load_custom_css (стили внутри функции с отступом)"""
+    with open(STYLES_PATH, encoding='utf-8') as f:
+        source = f.read()
+    return "\n        <style>\n" + textwrap.indent(source, ' ' * 8, lambda line: True) + "        </style>\n    "
+
+
+def main():
+    started = time.perf_counter()
+    stylesheet = Stylesheet()
+    build_ms = (time.perf_counter() - started) * 1000
+
+    legacy = len(legacy_payload().encode())
+    minified = len(stylesheet.style_tag().encode())
+    injector = len(stylesheet.injector().encode())
+
+    full_runs = RERUNS - int(RERUNS * FRAGMENT_SHARE)
+
+    print(f"static/styles.css: {stylesheet.source_size} байт, минификация {build_ms:.1f} мс один раз на процесс")
+    print(f"{'режим':<32} | {'полный прогон':>13} | {'фрагмент':>8} | {f'{RERUNS} прогонов':>12}")
+    for title, full, fragment in (
+        ('<style> с отступами (было)', legacy, legacy),
+        ('минифицированный <style>', minified, 0),
+        ('вставка в <head>', injector, 0),
+    ):
+        total = full * full_runs + fragment * (RERUNS - full_runs)
+        print(f"{title:<32} | {full:>13} | {fragment:>8} | {total:>12}")
+
+
+if __name__ == '__main__':
+    main()
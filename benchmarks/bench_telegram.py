@@ -0,0 +1,58 @@
+# benchmarks/bench_telegram.py
+# Отправка уведомлений: requests.post на каждое сообщение против общего
+# пула keep-alive соединений (TelegramTransport) на локальном фейке Bot API.
+#
+#   python benchmarks/bench_telegram.py
+
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_telegram import FakeTelegramServer  # noqa: E402
+from telegram_transport import TelegramTransport  # noqa: E402
+
+TOKEN = '123:TEST'
+RTT = 0.005
+HANDSHAKE = 0.030  # TCP + TLS до api.telegram.org
+BOOKINGS = 20
+MESSAGES_PER_BOOKING = 3  # админ + клиент + подтверждение
+
+
+def send_per_call(server, chat_id, text):
+    url = f"{server.url}/bot{TOKEN}/sendMessage"
+    return requests.post(url, json={'chat_id': chat_id, 'text': text, 'parse_mode': 'HTML'}, timeout=10)
+
+
+def run(server, send):
+    server.reset_counters()
+    started = time.perf_counter()
+    for booking in range(BOOKINGS):
+        for n in range(MESSAGES_PER_BOOKING):
+            response = send(str(booking), f"<b>Запись #{booking}</b> сообщение {n}")
+            assert response.status_code == 200
+    elapsed = time.perf_counter() - started
+    return elapsed / (BOOKINGS * MESSAGES_PER_BOOKING), server.connections
+
+
+def main():
+    with FakeTelegramServer(latency=RTT, handshake=HANDSHAKE) as server:
+        per_call, per_call_conns = run(server, lambda chat, text: send_per_call(server, chat, text))
+
+        transport = TelegramTransport(TOKEN, api_url=server.url, pool_size=4)
+        pooled, pooled_conns = run(server, transport.send_message)
+        transport.close()
+
+    total = BOOKINGS * MESSAGES_PER_BOOKING
+    print(f"RTT={RTT * 1000:.0f} мс, рукопожатие={HANDSHAKE * 1000:.0f} мс, сообщений: {total}")
+    print(f"requests.post:     {per_call * 1000:6.1f} мс/сообщение, соединений: {per_call_conns}")
+    print(f"TelegramTransport: {pooled * 1000:6.1f} мс/сообщение, соединений: {pooled_conns}")
+    assert pooled_conns == 1
+    assert pooled < per_call
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/bench_telegram_helper.py
+# telegram_helper: новый цикл событий и Bot на каждое сообщение против
+# общего TelegramNotifier (один цикл, один Bot с пулом HTTPXRequest).
+#
+#   python benchmarks/bench_telegram_helper.py
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Bot  # noqa: E402
+
+from benchmarks.fake_telegram import FakeTelegramServer  # noqa: E402
+from telegram_helper import TelegramNotifier  # noqa: E402
+
+TOKEN = '123:TEST'
+RTT = 0.005
+HANDSHAKE = 0.030
+MESSAGES = 40
+
+
+def send_old_way(base_url, chat_id, text):
+    """Как было: новый цикл и новый Bot (и HTTP-клиент) на сообщение"""
+    async def send():
+        bot = Bot(token=TOKEN, base_url=base_url)
+        await bot.send_message(chat_id=chat_id, text=text)
+        return True
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    result = loop.run_until_complete(send())
+    loop.close()
+    return result
+
+
+def main():
+    with FakeTelegramServer(latency=RTT, handshake=HANDSHAKE) as server:
+        base_url = f"{server.url}/bot"
+
+        started = time.perf_counter()
+        for n in range(MESSAGES):
+            assert send_old_way(base_url, 100 + n, f"Сообщение {n}")
+        old = (time.perf_counter() - started) / MESSAGES
+        old_conns = server.connections
+
+        server.reset_counters()
+        notifier = TelegramNotifier(TOKEN, pool_size=4, base_url=base_url)
+        started = time.perf_counter()
+        for n in range(MESSAGES):
+            assert notifier.submit(100 + n, f"Сообщение {n}").result(timeout=10)
+        sequential = (time.perf_counter() - started) / MESSAGES
+        sequential_conns = server.connections
+
+        # Несколько потоков Streamlit отправляют одновременно
+        server.reset_counters()
+        started = time.perf_counter()
+        futures = [notifier.submit(100 + n, f"Сообщение {n}") for n in range(MESSAGES)]
+        assert all(future.result(timeout=10) for future in futures)
+        burst = time.perf_counter() - started
+        burst_conns = server.connections
+        notifier.close()
+
+    print(f"RTT={RTT * 1000:.0f} мс, рукопожатие={HANDSHAKE * 1000:.0f} мс, сообщений: {MESSAGES}")
+    print(f"новый цикл + Bot:        {old * 1000:6.1f} мс/сообщение, соединений: {old_conns}")
+    print(f"TelegramNotifier.submit: {sequential * 1000:6.1f} мс/сообщение, соединений: {sequential_conns}")
+    print(f"{MESSAGES} submit() сразу:     {burst * 1000:6.1f} мс всего, новых соединений: {burst_conns}")
+    assert sequential < old
+
+
+if __name__ == '__main__':
+    main()
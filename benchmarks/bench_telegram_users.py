@@ -0,0 +1,107 @@
+# benchmarks/bench_telegram_users.py
+# Поиск chat_id по username: новое sqlite3-соединение на каждый вызов
+# против telegram_helper.TelegramUsers (соединение на поток, WAL, теплая карта).
+#
+#   python benchmarks/bench_telegram_users.py
+
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram_helper import TelegramUsers  # noqa: E402
+
+USERS = 5000
+LOOKUPS = 2000
+THREADS = 4
+
+
+def legacy_get_chat_id(path, username):
+    """Как было в get_chat_id_by_username"""
+    conn = sqlite3.connect(path)
+    c = conn.cursor()
+    username_clean = username.lower().replace('@', '')
+    c.execute("SELECT chat_id FROM telegram_users WHERE username = ?", (username_clean,))
+    result = c.fetchone()
+    conn.close()
+    return result[0] if result else None
+
+
+def make_db(path):
+    conn = sqlite3.connect(path)
+    conn.execute("""CREATE TABLE telegram_users
+                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                     username TEXT UNIQUE NOT NULL,
+                     chat_id INTEGER UNIQUE NOT NULL,
+                     registered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""")
+    conn.executemany("INSERT INTO telegram_users (username, chat_id) VALUES (?, ?)",
+                     [(f"user{n}", 100000 + n) for n in range(USERS)])
+    # Бот сохранил username как есть — старый поиск по lower() его не находит
+    conn.execute("INSERT INTO telegram_users (username, chat_id) VALUES ('MixedCase', 42)")
+    conn.commit()
+    conn.close()
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bookings.db')
+        make_db(path)
+        names = [f"@User{n * 7 % USERS}" for n in range(LOOKUPS)]
+
+        legacy, legacy_time = timed(lambda: [legacy_get_chat_id(path, name) for name in names])
+        users = TelegramUsers(path)
+        warm, warm_time = timed(lambda: [users.get(name) for name in names])
+        assert legacy == warm
+
+        # Рассылка из нескольких потоков: у каждого свое соединение
+        results = {}
+
+        def worker(n):
+            results[n] = [users.get(name) for name in names[n::THREADS]]
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(THREADS)]
+        _, threaded_time = timed(lambda: [t.start() for t in threads] and [t.join() for t in threads])
+        assert all(results[n] == legacy[n::THREADS] for n in range(THREADS))
+
+        # Регистрация через бота (другое соединение) видна без перезапуска; регистр не важен
+        external = sqlite3.connect(path)
+        external.execute("INSERT INTO telegram_users (username, chat_id) VALUES ('newcomer', 7)")
+        external.commit()
+        external.close()
+        assert users.get('@newcomer') == 7
+        assert legacy_get_chat_id(path, '@MixedCase') is None and users.get('@MixedCase') == 42
+
+        # Запись в другую таблицу того же файла (bookings.db) меняет data_version, но не карту
+        reloads = users.reloads
+        external = sqlite3.connect(path)
+        external.execute("CREATE TABLE IF NOT EXISTS bookings (id INTEGER PRIMARY KEY, notes TEXT)")
+        external.executemany("INSERT INTO bookings (notes) VALUES (?)", [(str(n),) for n in range(50)])
+        external.commit()
+        assert users.get('user1') == 100001 and users.reloads == reloads
+
+        # Бот перерегистрировал user1 под новым username (INSERT OR REPLACE) — карта перечитана
+        external.execute("DELETE FROM telegram_users WHERE chat_id = 100001")
+        external.execute("INSERT OR REPLACE INTO telegram_users (username, chat_id) VALUES ('renamed', 100001)")
+        external.commit()
+        external.close()
+        assert users.get('user1') is None and users.get('@Renamed') == 100001
+        users.close()
+
+        print(f"{LOOKUPS} поисков среди {USERS} пользователей:")
+        print(f"  connect на вызов: {legacy_time / LOOKUPS * 1e6:.0f} мкс на поиск")
+        print(f"  TelegramUsers:    {warm_time / LOOKUPS * 1e6:.1f} мкс на поиск, "
+              f"{THREADS} потока — {threaded_time / LOOKUPS * 1e6:.1f} мкс")
+
+
+if __name__ == '__main__':
+    main()
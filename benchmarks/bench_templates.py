@@ -0,0 +1,96 @@
+# benchmarks/bench_templates.py
+# Рендер уведомлений: f-строки с разбором даты и += в циклах против
+# реестра предкомпилированных шаблонов (message_templates.TEMPLATES).
+#
+#   python benchmarks/bench_templates.py
+
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.dataset import make_bookings  # noqa: E402
+from message_templates import TEMPLATES, BookingContext, ClientContext  # noqa: E402
+
+ROUNDS = 20000
+
+
+def legacy_format_date(date_str, format_str='%d.%m.%Y'):
+    try:
+        return datetime.strptime(date_str, '%Y-%m-%d').strftime(format_str)
+    except Exception:
+        return date_str
+
+
+def legacy_created_admin(booking_data):
+    """Как было в TelegramBotService.notify_booking_created_admin"""
+    name = booking_data.get('client_name', 'Клиент')
+    phone = booking_data.get('client_phone', 'Не указан')
+    date = legacy_format_date(booking_data.get('booking_date', ''))
+    time_ = booking_data.get('booking_time', '')
+    return f"""
+📅 <b>НОВАЯ ЗАПИСЬ НА КОНСУЛЬТАЦИЮ</b>
+
+👤 <b>Клиент:</b> {name}
+📱 <b>Телефон:</b> <code>{phone}</code>
+📅 <b>Дата:</b> {date}
+🕐 <b>Время:</b> {time_}
+
+⏰ <i>Напоминание будет отправлено за 1 час до консультации</i>
+        """
+
+
+def legacy_upcoming(client_name, bookings):
+    """Как было в send_upcoming_bookings_notification"""
+    message = f"""
+📅 <b>ВАШИ ПРЕДСТОЯЩИЕ КОНСУЛЬТАЦИИ</b>
+
+Уважаемый(ая) {client_name},
+
+У вас запланированы консультации:
+        """
+    for booking in bookings:
+        date = legacy_format_date(booking.get('booking_date', ''))
+        time_ = booking.get('booking_time', '')
+        message += f"\n• {date} в {time_}"
+    message += "\n\n⏰ Мы напомним вам за 1 час до каждой консультации!"
+    return message
+
+
+def timed(fn, rounds=ROUNDS):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - started) / rounds * 1e6
+
+
+def main():
+    bookings = make_bookings(50, per_client=10, days=30)
+    booking = bookings[0]
+    upcoming = bookings[:10]
+
+    legacy_single = timed(lambda: legacy_created_admin(booking))
+    new_single = timed(lambda: TEMPLATES.render('booking_created_admin', BookingContext.from_booking(booking, 'Клиент')))
+
+    legacy_list = timed(lambda: legacy_upcoming(booking['client_name'], upcoming))
+    new_list = timed(lambda: TEMPLATES.render('upcoming_bookings',
+                                              ClientContext.from_bookings(booking['client_name'], upcoming)))
+
+    # Экранирование: имя клиента с HTML-символами не ломает parse_mode=HTML
+    hostile = {**booking, 'client_name': 'Анна <script> & Co'}
+    assert '<script>' in legacy_created_admin(hostile)
+    assert '&lt;script&gt; &amp; Co' in TEMPLATES.render('booking_created_admin', BookingContext.from_booking(hostile))
+
+    print(f"{'сообщение':<28} | {'f-строки':>9} | {'шаблоны':>8}")
+    print(f"{'новая запись (админ)':<28} | {legacy_single:>6.2f} мкс | {new_single:>5.2f} мкс")
+    print(f"{'10 предстоящих записей':<28} | {legacy_list:>6.2f} мкс | {new_list:>5.2f} мкс")
+    print("статистика реестра:")
+    for name, stats in TEMPLATES.stats().items():
+        if stats['renders']:
+            print(f"  {name:<24} {stats['renders']:>7} рендеров, {stats['avg_us']:.2f} мкс")
+
+
+if __name__ == '__main__':
+    main()
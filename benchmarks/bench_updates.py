@@ -0,0 +1,106 @@
+# benchmarks/bench_updates.py
+# Прием /start connect_<токен> от локального фейка Bot API:
+# всплеск обновлений, обработка по одному против пачек (telegram_updates).
+#
+#   python benchmarks/bench_updates.py
+
+import asyncio
+import os
+import secrets
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.dataset import make_bookings  # noqa: E402
+from benchmarks.fake_telegram import FakeTelegramServer  # noqa: E402
+from contacts import ContactDirectory  # noqa: E402
+from storage import SQLiteStorage  # noqa: E402
+from telegram_updates import ChatLinker, UpdateReceiver, parse_connect  # noqa: E402
+
+TOKEN = '123:TEST'
+CLIENTS = 2000
+BURST = 300
+RTT = 0.005
+
+
+def make_db():
+    db = SQLiteStorage(':memory:')
+    rows = make_bookings(CLIENTS, per_client=2, days=365 * 3)
+    for row in rows:
+        row['telegram_chat_id'] = None
+    db.table('bookings').insert(rows).execute()
+    return db, list(dict.fromkeys(row['phone_hash'] for row in rows))
+
+
+def push_burst(server, linker, phone_hashes):
+    """Клиенты жмут START по ссылке; среди них повтор, выдуманный токен, старая ссылка
+    с префиксом phone_hash и обычный текст"""
+    expected = {}
+    tokens = [linker.issue(phone_hash) for phone_hash in phone_hashes[:BURST]]
+    for n, token in enumerate(tokens):
+        chat_id = 500000 + n
+        server.push_update(chat_id, f"/start connect_{token}")
+        expected[phone_hashes[n]] = str(chat_id)
+    server.push_update(500000, f"/start connect_{tokens[0]}")  # повторный START
+    server.push_update(999999, f"/start connect_{secrets.token_urlsafe(16)}")
+    server.push_update(999997, f"/start connect_{phone_hashes[BURST][:10]}")
+    server.push_update(999998, "Здравствуйте!")
+    return expected
+
+
+def run(batch_size):
+    db, phone_hashes = make_db()
+    contacts = ContactDirectory(db)
+    linker = ChatLinker(db, contacts)
+    with FakeTelegramServer(latency=RTT) as server:
+        expected = push_burst(server, linker, phone_hashes)
+        receiver = UpdateReceiver(TOKEN, linker, base_url=f"{server.url}/bot",
+                                  batch_size=batch_size, poll_timeout=1)
+        started = time.perf_counter()
+        receiver.start()
+        deadline = time.monotonic() + 120
+        while receiver.processed < BURST + 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - started
+        receiver.stop()
+
+        linked = {row['phone_hash']: row['telegram_chat_id']
+                  for row in db.table('client_contacts').select('*').execute().data}
+        assert linked == expected, "привязки не совпадают"
+        assert not db.table('link_tokens').select('token').execute().data, "токены не погашены"
+        replies = len(server.messages)
+        return elapsed, server.polls, receiver.linked, replies
+
+
+def check_webhook():
+    """Webhook: тот же разбор для одного Update из тела запроса"""
+    db, phone_hashes = make_db()
+    contacts = ContactDirectory(db)
+    with FakeTelegramServer() as server:
+        linker = ChatLinker(db, contacts)
+        receiver = UpdateReceiver(TOKEN, linker, base_url=f"{server.url}/bot")
+        update = {'update_id': 1, 'message': {
+            'message_id': 1, 'date': int(time.time()), 'text': f"/start connect_{linker.issue(phone_hashes[5])}",
+            'chat': {'id': 4242, 'type': 'private'}, 'from': {'id': 4242, 'is_bot': False, 'first_name': 'A'},
+        }}
+        assert asyncio.run(receiver.handle_webhook(update)) == 1
+    assert contacts.get(phone_hashes[5]) == '4242'
+
+
+def main():
+    token = secrets.token_urlsafe(16)
+    assert parse_connect(f'/start connect_{token}') == token
+    assert parse_connect(f'/start@Jenyhelperbot connect_{token}') == token
+    assert parse_connect('/start') is None and parse_connect(f'connect_{token}') is None
+    assert parse_connect('/start connect_0123abcdef') is None  # префикс phone_hash больше не принимается
+    check_webhook()
+
+    print(f"{BURST} нажатий START за раз, {CLIENTS} клиентов в базе, RTT фейка {RTT * 1000:.0f} мс")
+    for batch_size in (1, 100):
+        elapsed, polls, linked, replies = run(batch_size)
+        print(f"  пачка {batch_size:>3}: {elapsed:.2f} с, getUpdates: {polls}, привязано {linked}, ответов {replies}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+# benchmarks/dataset.py
+# Генерация синтетических записей для бенчмарков
+
+import hashlib
+import random
+from datetime import datetime, timedelta
+
+STATUSES = ['confirmed', 'completed', 'cancelled']
+
+
+def make_bookings(clients: int, per_client: int = 3, days: int = 120, seed: int = 42,
+                  start: datetime = None, work_start: int = 9, work_end: int = 18) -> list:
+    """Список строк таблицы bookings: clients × per_client записей без пересечений по времени"""
+    rng = random.Random(seed)
+    start = (start or datetime.now() - timedelta(days=days // 2)).replace(hour=0, minute=0, second=0, microsecond=0)
+    hours = list(range(work_start, work_end))
+    free = [(day, hour) for day in range(days) for hour in hours]
+    rng.shuffle(free)
+
+    rows = []
+    next_id = 1
+    for n in range(clients):
+        phone = f"7999{n:07d}"
+        phone_hash = hashlib.sha256(phone.encode()).hexdigest()
+        for _ in range(per_client):
+            if not free:
+                break
+            day, hour = free.pop()
+            booking_date = (start + timedelta(days=day)).date().isoformat()
+            rows.append({
+                'id': next_id,
+                'client_name': f"Клиент {n}",
+                'client_phone': phone,
+                'client_email': f"client{n}@example.com",
+                'client_telegram': f"@client{n}",
+                'booking_date': booking_date,
+                'booking_time': f"{hour:02d}:00",
+                'notes': "Комментарий к консультации " * rng.randint(1, 20),
+                'phone_hash': phone_hash,
+                'status': rng.choice(STATUSES),
+                'telegram_chat_id': str(100000 + n) if n % 2 else None,
+                'created_at': (start + timedelta(days=day - 3)).isoformat(),
+            })
+            next_id += 1
+    return rows
@@ -0,0 +1,201 @@
+# benchmarks/fake_supabase.py
+# Эмулятор подмножества API supabase-py в памяти: считает запросы и
+# добавляет искусственную задержку сети на каждый execute()
+
+import json
+import time
+
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class _Not:
+    def __init__(self, query):
+        self._query = query
+
+    def is_(self, column, value):
+        return self._query._add(column, lambda v: v is not None)
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self._db = db
+        self._table = table
+        self._action = 'select'
+        self._columns = None
+        self._count = None
+        self._payload = None
+        self._filters = []
+        self._order = []
+        self._limit = None
+        self._offset = 0
+
+    # ---- действия ----
+
+    def select(self, columns='*', count=None):
+        self._action = 'select'
+        self._columns = None if columns.strip() == '*' else [c.strip() for c in columns.split(',')]
+        self._count = count
+        return self
+
+    def insert(self, payload):
+        self._action = 'insert'
+        self._payload = payload
+        return self
+
+    def upsert(self, payload, on_conflict=None):
+        self._action = 'upsert'
+        self._payload = payload
+        self._on_conflict = [c.strip() for c in (on_conflict or 'id').split(',')]
+        return self
+
+    def update(self, payload):
+        self._action = 'update'
+        self._payload = payload
+        return self
+
+    def delete(self):
+        self._action = 'delete'
+        return self
+
+    # ---- фильтры ----
+
+    def _add(self, column, predicate):
+        self._filters.append((column, predicate))
+        return self
+
+    def eq(self, column, value):
+        return self._add(column, lambda v: v == value)
+
+    def neq(self, column, value):
+        return self._add(column, lambda v: v != value)
+
+    def gt(self, column, value):
+        return self._add(column, lambda v: v is not None and v > value)
+
+    def gte(self, column, value):
+        return self._add(column, lambda v: v is not None and v >= value)
+
+    def lt(self, column, value):
+        return self._add(column, lambda v: v is not None and v < value)
+
+    def lte(self, column, value):
+        return self._add(column, lambda v: v is not None and v <= value)
+
+    def in_(self, column, values):
+        values = set(values)
+        return self._add(column, lambda v: v in values)
+
+    def like(self, column, pattern):
+        prefix = pattern.rstrip('%')
+        return self._add(column, lambda v: v is not None and str(v).startswith(prefix))
+
+    def is_(self, column, value):
+        return self._add(column, lambda v: v is None)
+
+    def after(self, columns, values):
+        key = tuple(values)
+        self._filters.append((None, lambda row: tuple(row.get(c) for c in columns) > key))
+        return self
+
+    @property
+    def not_(self):
+        return _Not(self)
+
+    def order(self, column, desc=False):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def range(self, start, end):
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    # ---- выполнение ----
+
+    def _matches(self, row):
+        return all(predicate(row) if column is None else predicate(row.get(column))
+                   for column, predicate in self._filters)
+
+    def execute(self):
+        self._db.queries += 1
+        if self._db.latency:
+            time.sleep(self._db.latency)
+
+        rows = self._db.tables.setdefault(self._table, [])
+
+        if self._action in ('insert', 'upsert'):
+            payload = self._payload if isinstance(self._payload, list) else [self._payload]
+            inserted = []
+            for item in payload:
+                if self._action == 'upsert':
+                    key = tuple(item.get(c) for c in self._on_conflict)
+                    existing = next((r for r in rows if tuple(r.get(c) for c in self._on_conflict) == key), None)
+                    if existing is not None:
+                        existing.update(item)
+                        inserted.append(dict(existing))
+                        continue
+                row = dict(item)
+                row.setdefault('id', self._db.next_id(self._table))
+                rows.append(row)
+                inserted.append(dict(row))
+            self._db.bytes_sent += self._db.payload_size(inserted)
+            return FakeResponse(inserted)
+
+        matched = [row for row in rows if self._matches(row)]
+
+        if self._action == 'update':
+            for row in matched:
+                row.update(self._payload)
+            return FakeResponse([dict(row) for row in matched])
+
+        if self._action == 'delete':
+            self._db.tables[self._table] = [row for row in rows if not self._matches(row)]
+            return FakeResponse([dict(row) for row in matched])
+
+        for column, desc in reversed(self._order):
+            matched.sort(key=lambda r: (r.get(column) is None, r.get(column) or ''), reverse=desc)
+
+        count = len(matched) if self._count else None
+        matched = matched[self._offset:]
+        if self._limit is not None:
+            matched = matched[:self._limit]
+
+        if self._columns is None:
+            data = [dict(row) for row in matched]
+        else:
+            data = [{c: row.get(c) for c in self._columns} for row in matched]
+
+        self._db.bytes_sent += self._db.payload_size(data)
+        return FakeResponse(data, count)
+
+
+class FakeSupabase:
+    """Клиент-заглушка: client.table('bookings').select(...).eq(...).execute()"""
+
+    def __init__(self, tables=None, latency=0.0):
+        self.tables = {name: [dict(r) for r in rows] for name, rows in (tables or {}).items()}
+        self.latency = latency
+        self.queries = 0
+        self.bytes_sent = 0
+
+    def next_id(self, table):
+        return max((r.get('id') or 0 for r in self.tables.get(table, [])), default=0) + 1
+
+    @staticmethod
+    def payload_size(data):
+        return len(json.dumps(data, ensure_ascii=False, default=str).encode())
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def reset_counters(self):
+        self.queries = 0
+        self.bytes_sent = 0
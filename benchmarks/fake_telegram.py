@@ -0,0 +1,184 @@
+# benchmarks/fake_telegram.py
+# Локальный фейк Telegram Bot API для бенчмарков: HTTP/1.1 с keep-alive,
+# задержкой ответа (RTT) и задержкой установки соединения (TCP+TLS рукопожатие).
+# Может эмулировать flood control: 429 с retry_after при превышении лимитов,
+# и сбой API: при down=True все запросы получают 502.
+# getUpdates — long polling по очереди входящих сообщений (push_update).
+
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Заголовки и тело одним пакетом, без Nagle: иначе keep-alive упирается в delayed ACK
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        # Новое соединение: эмулируем стоимость рукопожатия
+        self.server.on_connect()
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        if self.headers.get('Content-Type', '').startswith('application/x-www-form-urlencoded'):
+            # python-telegram-bot шлет форму со значениями в JSON
+            payload = dict(parse_qsl(body.decode()))
+        else:
+            payload = json.loads(body or b'{}')
+        method = self.path.rsplit('/', 1)[-1]
+        status, body = self.server.handle_method(method, payload)
+        data = json.dumps(body).encode()
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeTelegramServer(ThreadingHTTPServer):
+    """Фейк api.telegram.org: запоминает отправленные сообщения и считает соединения"""
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.0, handshake: float = 0.0, port: int = 0,
+                 global_limit: int = None, chat_limit: int = None, retry_after: int = 1,
+                 blocked_chats=()):
+        super().__init__(('127.0.0.1', port), FakeTelegramHandler)
+        self.latency = latency
+        self.handshake = handshake
+        # Лимиты сообщений в секунду (None — без ограничений)
+        self.global_limit = global_limit
+        self.chat_limit = chat_limit
+        self.retry_after = retry_after
+        self.blocked_chats = {str(chat_id) for chat_id in blocked_chats}
+        self.down = False
+        self.lock = threading.Lock()
+        self.updates_ready = threading.Condition(self.lock)
+        self.updates = []
+        self.next_update_id = 1
+        self.thread = None
+        self.reset_counters()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset_counters(self):
+        with self.lock:
+            self.connections = 0
+            self.requests = 0
+            self.messages = []
+            self.rejected = 0
+            self.violations = 0
+            self.sent_at = deque()
+            self.chat_sent_at = {}
+            self.banned_until = 0.0
+            self.polls = 0
+
+    def on_connect(self):
+        with self.lock:
+            self.connections += 1
+        if self.handshake:
+            time.sleep(self.handshake)
+
+    def _flood_control(self, chat_id: str, now: float) -> bool:
+        """True — сообщение превышает лимит (вызывается под self.lock)"""
+        while self.sent_at and now - self.sent_at[0] >= 1.0:
+            self.sent_at.popleft()
+        chat_times = self.chat_sent_at.setdefault(chat_id, deque())
+        while chat_times and now - chat_times[0] >= 1.0:
+            chat_times.popleft()
+
+        if now < self.banned_until:
+            return True
+        if (self.global_limit and len(self.sent_at) >= self.global_limit) or \
+                (self.chat_limit and len(chat_times) >= self.chat_limit):
+            # Как у Telegram: после превышения бот получает 429 до истечения retry_after
+            self.violations += 1
+            self.banned_until = now + self.retry_after
+            return True
+        self.sent_at.append(now)
+        chat_times.append(now)
+        return False
+
+    def push_update(self, chat_id, text: str, username: str = None):
+        """Входящее сообщение пользователя боту"""
+        with self.lock:
+            update_id = self.next_update_id
+            self.next_update_id += 1
+            self.updates.append({'update_id': update_id, 'message': {
+                'message_id': update_id,
+                'date': int(time.time()),
+                'chat': {'id': int(chat_id), 'type': 'private', 'username': username},
+                'from': {'id': int(chat_id), 'is_bot': False, 'first_name': username or 'User'},
+                'text': text,
+            }})
+            self.updates_ready.notify_all()
+        return update_id
+
+    def _get_updates(self, payload: dict):
+        """Как у Bot API: offset подтверждает предыдущие, timeout — ожидание новых (под self.lock)"""
+        self.polls += 1
+        offset = int(payload.get('offset') or 0)
+        if offset:
+            self.updates = [update for update in self.updates if update['update_id'] >= offset]
+        deadline = time.monotonic() + float(payload.get('timeout') or 0)
+        while not self.updates and time.monotonic() < deadline:
+            self.updates_ready.wait(deadline - time.monotonic())
+        limit = int(payload.get('limit') or 100)
+        return 200, {'ok': True, 'result': self.updates[:limit]}
+
+    def handle_method(self, method: str, payload: dict):
+        if self.latency:
+            time.sleep(self.latency)
+        with self.lock:
+            self.requests += 1
+            if self.down:
+                self.rejected += 1
+                return 502, {'ok': False, 'error_code': 502, 'description': 'Bad Gateway'}
+            if method == 'getUpdates':
+                return self._get_updates(payload)
+            if method != 'sendMessage':
+                return 404, {'ok': False, 'error_code': 404, 'description': 'Not Found'}
+            chat_id = str(payload.get('chat_id'))
+            if chat_id in self.blocked_chats:
+                return 403, {'ok': False, 'error_code': 403, 'description': 'Forbidden: bot was blocked by the user'}
+            if self._flood_control(chat_id, time.monotonic()):
+                self.rejected += 1
+                return 429, {'ok': False, 'error_code': 429,
+                             'description': f"Too Many Requests: retry after {self.retry_after}",
+                             'parameters': {'retry_after': self.retry_after}}
+            self.messages.append(payload)
+            message_id = len(self.messages)
+        return 200, {'ok': True, 'result': {
+            'message_id': message_id,
+            'chat': {'id': payload.get('chat_id'), 'type': 'private'},
+            'date': int(time.time()),
+            'text': payload.get('text'),
+        }}
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
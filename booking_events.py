@@ -0,0 +1,49 @@
+# booking_events.py
+# События изменения записей: мутации публикуют событие, а индексы
+# (битовая карта календаря, планировщик напоминаний) обновляют себя сами
+# по booking_id — без обхода таймеров и без дублирования кода в мутациях.
+
+from typing import NamedTuple
+
+CREATED = 'created'
+RESCHEDULED = 'rescheduled'
+CANCELLED = 'cancelled'
+COMPLETED = 'completed'
+RESTORED = 'restored'
+DELETED = 'deleted'
+
+
+class BookingEvent(NamedTuple):
+    """Изменение записи; для переноса old_* — прежние дата и время"""
+    kind: str
+    booking_id: int
+    booking_date: str
+    booking_time: str
+    session_duration: int = None
+    old_date: str = None
+    old_time: str = None
+    chat_id: str = None
+    was_active: bool = True  # занимала ли запись слот до изменения (не была отменена)
+
+
+class BookingEvents:
+    """Синхронная шина событий: обработчики вызываются в порядке подписки"""
+
+    def __init__(self):
+        self.handlers = []  # [(имя, обработчик)]
+
+    def subscribe(self, handler, name: str = None):
+        self.handlers.append((name or handler.__qualname__, handler))
+        return handler
+
+    def emit(self, event: BookingEvent) -> dict:
+        """Вызов обработчиков; результат — {имя: что вернул обработчик} (None при ошибке)"""
+        results = {}
+        for name, handler in self.handlers:
+            try:
+                results[name] = handler(event)
+            except Exception as e:
+                # Ошибка одного индекса не должна срывать мутацию и остальные индексы
+                print(f"❌ Ошибка обработки события {event.kind} записи {event.booking_id}: {e}")
+                results[name] = None
+        return results
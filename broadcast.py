@@ -0,0 +1,198 @@
+# broadcast.py
+# Массовая рассылка в Telegram с учетом лимитов Bot API:
+# общий token bucket (~30 сообщений/с на бота), не чаще 1 сообщения/с в чат,
+# пауза всей рассылки по retry_after из ответов 429, итог по каждому чату
+
+import queue
+import threading
+import time
+
+from message_templates import Template, escape
+
+# Лимиты Bot API для рассылок (https://core.telegram.org/bots/faq#broadcasting-to-users)
+GLOBAL_RATE = 30
+PER_CHAT_RATE = 1
+
+SENT = 'sent'
+FAILED = 'failed'
+
+
+class TokenBucket:
+    """Ведро токенов с резервированием: take() возвращает, сколько ждать до отправки"""
+
+    def __init__(self, rate: float, capacity: float = 1, clock=time.monotonic):
+        # capacity=1 — равномерный темп: всплеск + пополнение за секунду не превышают лимит окна
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self) -> float:
+        """Зарезервировать токен; задержка в секундах (0 — можно сразу)"""
+        with self.lock:
+            self._refill(self.clock())
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def drain(self):
+        """Обнулить запас (после 429 не отправляем накопленным всплеском)"""
+        with self.lock:
+            self._refill(self.clock())
+            self.tokens = min(self.tokens, 0)
+
+
+class BroadcastReport:
+    """Итог рассылки: статус по каждому чату и счетчики"""
+
+    def __init__(self, chat_ids: list):
+        self.total = len(chat_ids)
+        self.results = {}  # chat_id -> {'status', 'attempts', 'error'}
+        self.rate_limited = 0
+        self.started = time.monotonic()
+        self.finished = None
+        self.lock = threading.Lock()
+
+    def record(self, chat_id, status: str, attempts: int, error: str = None):
+        with self.lock:
+            self.results[chat_id] = {'status': status, 'attempts': attempts, 'error': error}
+
+    @property
+    def done(self) -> int:
+        return len(self.results)
+
+    @property
+    def sent(self) -> int:
+        return sum(1 for result in self.results.values() if result['status'] == SENT)
+
+    @property
+    def failed(self) -> int:
+        return sum(1 for result in self.results.values() if result['status'] == FAILED)
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+
+def classify_response(response):
+    """(статус, retry_after, ошибка) по ответу Bot API"""
+    if response.status_code == 200:
+        return SENT, None, None
+    try:
+        body = response.json()
+    except ValueError:
+        body = {}
+    description = body.get('description') or f"HTTP {response.status_code}"
+    if response.status_code == 429:
+        retry_after = (body.get('parameters') or {}).get('retry_after') \
+            or response.headers.get('Retry-After') or 1
+        return None, float(retry_after), description
+    if response.status_code >= 500:
+        return None, None, description
+    # 400/403: чат не найден, бот заблокирован — повторять бессмысленно
+    return FAILED, None, description
+
+
+class Broadcaster:
+    """Рассылка пулом потоков в пределах лимитов Telegram"""
+
+    def __init__(self, send, global_rate: float = GLOBAL_RATE, per_chat_rate: float = PER_CHAT_RATE,
+                 workers: int = 8, max_attempts: int = 4, backoff: float = 0.5,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.send = send  # send(chat_id, text) -> requests.Response
+        self.bucket = TokenBucket(global_rate, clock=clock)
+        self.chat_interval = 1.0 / per_chat_rate
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.paused_until = 0.0
+        self.chat_ready = {}  # chat_id -> момент, когда в чат снова можно писать
+
+    def _pause(self, seconds: float):
+        """Flood control: остановить все потоки на retry_after"""
+        with self.lock:
+            self.paused_until = max(self.paused_until, self.clock() + seconds)
+        self.bucket.drain()
+
+    def _wait_turn(self, chat_id):
+        """Ждать токен, окончание паузы и интервал чата"""
+        delay = self.bucket.take()
+        if delay:
+            self.sleep(delay)
+        while True:
+            with self.lock:
+                now = self.clock()
+                ready = max(self.paused_until, self.chat_ready.get(chat_id, 0.0))
+                if ready <= now:
+                    self.chat_ready[chat_id] = now + self.chat_interval
+                    return
+            self.sleep(ready - now)
+
+    def _deliver(self, chat_id, text: str, report: BroadcastReport, retry: queue.Queue, attempt: int):
+        self._wait_turn(chat_id)
+        try:
+            status, retry_after, error = classify_response(self.send(chat_id, text))
+        except Exception as e:
+            status, retry_after, error = None, None, str(e)
+
+        if status is not None:
+            report.record(chat_id, status, attempt, error)
+            return
+        if retry_after is not None:
+            # 429 не тратит попытку: Telegram сам сообщил, когда повторить
+            with report.lock:
+                report.rate_limited += 1
+            self._pause(retry_after)
+            retry.put((chat_id, text, attempt))
+            return
+        if attempt >= self.max_attempts:
+            report.record(chat_id, FAILED, attempt, error)
+            return
+        self.sleep(self.backoff * 2 ** (attempt - 1))
+        retry.put((chat_id, text, attempt + 1))
+
+    def broadcast(self, chat_ids, template, context: dict = None, chat_context: dict = None,
+                  on_progress=None, poll_interval: float = 0.1) -> BroadcastReport:
+        """Разослать шаблон (строка или Template) по чатам; on_progress(done, total) — из текущего потока"""
+        if not isinstance(template, Template):
+            # Текст администратора: литералы экранируются (parse_mode HTML), неизвестные {поля}
+            # остаются как есть; ошибка разбора (ValueError) — до первой отправки
+            template = Template('broadcast', escape(template), strict=False)
+        chat_ids = list(dict.fromkeys(str(chat_id) for chat_id in chat_ids if chat_id))
+        report = BroadcastReport(chat_ids)
+        jobs = queue.Queue()
+        for chat_id in chat_ids:
+            values = {**(context or {}), **((chat_context or {}).get(chat_id) or {})}
+            jobs.put((chat_id, template.render(values), 1))
+
+        def work():
+            while report.done < report.total:
+                try:
+                    chat_id, text, attempt = jobs.get(timeout=poll_interval)
+                except queue.Empty:
+                    continue
+                self._deliver(chat_id, text, report, jobs, attempt)
+
+        threads = [threading.Thread(target=work, name=f"broadcast-{n}", daemon=True)
+                   for n in range(min(self.workers, len(chat_ids)))]
+        for thread in threads:
+            thread.start()
+
+        # Прогресс отдаем в вызывающий поток (Streamlit не принимает UI-вызовы из других потоков)
+        while any(thread.is_alive() for thread in threads):
+            if on_progress:
+                on_progress(report.done, report.total)
+            time.sleep(poll_interval)
+        if on_progress:
+            on_progress(report.done, report.total)
+
+        report.finished = time.monotonic()
+        return report
@@ -0,0 +1,85 @@
+# client_profile.py
+# Профиль клиента на время сессии: имя, контакты, chat_id, ближайшая запись
+# и последние записи загружаются одним запросом при входе и хранятся в
+# st.session_state — вкладки кабинета отрисовываются из памяти.
+#
+# Профиль перечитывается только после изменений (запись, отмена, подключение
+# Telegram) или по истечении max_age, если запись клиента изменил администратор.
+
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+from projections import CLIENT_HISTORY, CLIENT_PROFILE
+
+HISTORY_LIMIT = 20
+
+
+@dataclass
+class ClientProfile:
+    """Данные личного кабинета клиента"""
+
+    __slots__ = ('phone', 'phone_hash', 'name', 'email', 'telegram', 'chat_id', 'history', 'loaded_at')
+
+    phone: str
+    phone_hash: str
+    name: str
+    email: str
+    telegram: str
+    chat_id: str
+    history: tuple  # последние записи, новые первыми (проекция CLIENT_HISTORY)
+    loaded_at: float
+
+    @classmethod
+    def load(cls, db, contacts, phone: str, phone_hash: str, history_limit: int = HISTORY_LIMIT):
+        """Профиль по phone_hash или None, если у клиента нет записей"""
+        response = db.table('bookings')\
+            .select(CLIENT_PROFILE.select)\
+            .eq('phone_hash', phone_hash)\
+            .order('booking_date', desc=True)\
+            .order('booking_time', desc=True)\
+            .limit(history_limit)\
+            .execute()
+        rows = response.data or []
+        if not rows:
+            return None
+
+        # Контакты — из последней созданной записи
+        latest = max(rows, key=lambda row: row.get('created_at') or '')
+        return cls(
+            phone=phone,
+            phone_hash=phone_hash,
+            name=latest['client_name'],
+            email=latest.get('client_email') or '',
+            telegram=latest.get('client_telegram') or '',
+            chat_id=contacts.get(phone_hash),  # client_contacts, обычно из кэша справочника
+            history=tuple(CLIENT_HISTORY.project(row) for row in rows),
+            loaded_at=time.monotonic(),
+        )
+
+    def is_stale(self, max_age: float) -> bool:
+        return time.monotonic() - self.loaded_at > max_age
+
+    @property
+    def info(self) -> dict:
+        """Как get_client_info: {'name', 'email', 'telegram'}"""
+        return {'name': self.name, 'email': self.email, 'telegram': self.telegram}
+
+    @property
+    def upcoming_bookings(self) -> list:
+        """Предстоящие подтвержденные записи по возрастанию даты и времени"""
+        today = datetime.now().date().isoformat()
+        return sorted(
+            (row for row in self.history if row['status'] == 'confirmed' and row['booking_date'] >= today),
+            key=lambda row: (row['booking_date'], row['booking_time']),
+        )
+
+    @property
+    def upcoming(self):
+        """Ближайшая запись или None"""
+        bookings = self.upcoming_bookings
+        return bookings[0] if bookings else None
+
+    @property
+    def has_active_booking(self) -> bool:
+        return self.upcoming is not None
@@ -0,0 +1,215 @@
+# contacts.py
+# Контакты клиентов: phone_hash -> telegram chat_id в отдельной таблице
+# client_contacts (одна строка на клиента) и TTL-кэш в памяти поверх нее.
+#
+# Подключение Telegram — одна запись upsert вместо обновления всех записей
+# клиента в bookings; поиск на каждом перерисовывании — O(1) из кэша.
+# Старые данные (chat_id только в bookings) переносятся при первом чтении:
+# по одному клиенту при промахе кэша, целиком — один раз за процесс перед
+# первой выборкой всех подключенных (connected), дальше читается только
+# client_contacts.
+# Без таблицы client_contacts (migrations/client_contacts.sql не выполнена)
+# справочник работает по bookings.telegram_chat_id, как до ее появления.
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from storage import in_chunks
+
+_NONE = object()  # кэшированное "контакта нет"
+
+
+class ContactDirectory:
+    """Справочник chat_id клиентов с кэшем по phone_hash"""
+
+    def __init__(self, db, ttl: float = 600, maxsize: int = 10000, clock=time.monotonic):
+        self.db = db
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._items = OrderedDict()  # phone_hash -> (expires_at, chat_id | _NONE)
+        self._lock = threading.Lock()
+        self.has_table = True  # False — нет client_contacts, chat_id хранятся в bookings
+        self.migrated = False  # старые chat_id из bookings уже перенесены в client_contacts
+        self.hits = 0
+        self.misses = 0
+
+    def _table_missing(self, error) -> bool:
+        """Ошибка из-за отсутствия client_contacts: справочник переходит на bookings"""
+        if 'client_contacts' not in str(error):
+            return False
+        if self.has_table:
+            print(f"⚠️ Нет таблицы client_contacts (migrations/client_contacts.sql), chat_id берутся из bookings: {error}")
+        self.has_table = False
+        return True
+
+    # ---- кэш ----
+
+    def _cached(self, phone_hash: str):
+        """chat_id, _NONE или None, если в кэше нет/устарело; под self._lock"""
+        item = self._items.get(phone_hash)
+        if item is None:
+            return None
+        if item[0] <= self._clock():
+            del self._items[phone_hash]
+            return None
+        self._items.move_to_end(phone_hash)
+        return item[1]
+
+    def _put(self, values: dict):
+        expires_at = self._clock() + self.ttl
+        with self._lock:
+            for phone_hash, chat_id in values.items():
+                self._items[phone_hash] = (expires_at, _NONE if chat_id is None else str(chat_id))
+                self._items.move_to_end(phone_hash)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def invalidate(self, *phone_hashes):
+        """Сброс кэша по клиентам (без аргументов — целиком)"""
+        with self._lock:
+            if not phone_hashes:
+                self._items.clear()
+            for phone_hash in phone_hashes:
+                self._items.pop(phone_hash, None)
+
+    # ---- чтение ----
+
+    def get(self, phone_hash: str):
+        """chat_id клиента или None"""
+        return self.get_many([phone_hash]).get(phone_hash)
+
+    def get_many(self, phone_hashes) -> dict:
+        """{phone_hash: chat_id} для подключенных клиентов; промахи — одним запросом"""
+        phone_hashes = [phone_hash for phone_hash in dict.fromkeys(phone_hashes) if phone_hash]
+        found = {}
+        missing = []
+        with self._lock:
+            for phone_hash in phone_hashes:
+                value = self._cached(phone_hash)
+                if value is None:
+                    missing.append(phone_hash)
+                elif value is not _NONE:
+                    found[phone_hash] = value
+            self.hits += len(phone_hashes) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            loaded = self._load(missing)
+            self._put({phone_hash: loaded.get(phone_hash) for phone_hash in missing})
+            found.update(loaded)
+        return found
+
+    def _load(self, phone_hashes: list) -> dict:
+        loaded = {}
+        try:
+            for chunk in in_chunks(phone_hashes if self.has_table else []):
+                response = self.db.table('client_contacts')\
+                    .select('phone_hash, telegram_chat_id')\
+                    .in_('phone_hash', chunk)\
+                    .execute()
+                loaded.update({row['phone_hash']: str(row['telegram_chat_id']) for row in response.data or []})
+        except Exception as e:
+            if not self._table_missing(e):
+                raise
+
+        # Клиенты, подключившиеся до появления client_contacts: chat_id есть только в bookings
+        legacy = [] if self.migrated else [phone_hash for phone_hash in phone_hashes if phone_hash not in loaded]
+        migrated = {}
+        for chunk in in_chunks(legacy):
+            response = self.db.table('bookings')\
+                .select('phone_hash, telegram_chat_id')\
+                .in_('phone_hash', chunk)\
+                .not_.is_('telegram_chat_id', None)\
+                .order('created_at')\
+                .execute()
+            # Последняя запись клиента — самый свежий chat_id
+            migrated.update({row['phone_hash']: str(row['telegram_chat_id']) for row in response.data or []})
+        if migrated and self.has_table:
+            self._save(migrated)
+        loaded.update(migrated)
+        return loaded
+
+    def _legacy_chat_ids(self) -> dict:
+        """Все chat_id из bookings; у клиента — из последней записи"""
+        response = self.db.table('bookings')\
+            .select('phone_hash, telegram_chat_id')\
+            .not_.is_('telegram_chat_id', None)\
+            .order('created_at')\
+            .execute()
+        return {row['phone_hash']: str(row['telegram_chat_id']) for row in response.data or []}
+
+    def migrate_legacy(self) -> int:
+        """Однократный перенос старых chat_id из bookings в client_contacts; число перенесенных"""
+        if self.migrated or not self.has_table:
+            return 0
+        try:
+            response = self.db.table('client_contacts')\
+                .select('phone_hash')\
+                .execute()
+        except Exception as e:
+            if not self._table_missing(e):
+                raise
+            return 0
+
+        known = {row['phone_hash'] for row in response.data or []}
+        legacy = {phone_hash: chat_id for phone_hash, chat_id in self._legacy_chat_ids().items()
+                  if phone_hash not in known}
+        if legacy:
+            self._save(legacy)
+        self.migrated = self.has_table
+        return len(legacy)
+
+    def connected(self) -> dict:
+        """Все подключенные клиенты {phone_hash: chat_id}: client_contacts целиком
+        (без client_contacts — chat_id из bookings)"""
+        self.migrate_legacy()
+        found = None
+        try:
+            if self.has_table:
+                response = self.db.table('client_contacts')\
+                    .select('phone_hash, telegram_chat_id')\
+                    .execute()
+                found = {row['phone_hash']: str(row['telegram_chat_id']) for row in response.data or []}
+        except Exception as e:
+            if not self._table_missing(e):
+                raise
+        if found is None:
+            found = self._legacy_chat_ids()
+
+        self._put(found)
+        return found
+
+    # ---- запись ----
+
+    def _save(self, values: dict):
+        """Upsert строк client_contacts одним запросом (без таблицы — chat_id в записи клиента)"""
+        if self.has_table:
+            updated_at = datetime.now().isoformat(timespec='seconds')
+            try:
+                self.db.table('client_contacts').upsert([
+                    {'phone_hash': phone_hash, 'telegram_chat_id': str(chat_id), 'updated_at': updated_at}
+                    for phone_hash, chat_id in values.items()
+                ], on_conflict='phone_hash').execute()
+                return
+            except Exception as e:
+                if not self._table_missing(e):
+                    raise
+        for phone_hash, chat_id in values.items():
+            self.db.table('bookings').update({'telegram_chat_id': str(chat_id)}).eq('phone_hash', phone_hash).execute()
+
+    def connect(self, phone_hash: str, chat_id: str):
+        """Подключение Telegram: одна строка в client_contacts и сразу в кэш"""
+        self._save({phone_hash: chat_id})
+        self._put({phone_hash: chat_id})
+
+    def connect_many(self, values: dict):
+        """Подключение пачки клиентов {phone_hash: chat_id} одним запросом"""
+        if values:
+            self._save(values)
+            self._put(values)
+
+    def __len__(self):
+        return len(self._items)
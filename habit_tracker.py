@@ -1,17 +1,39 @@
 import streamlit as st
+import streamlit.components.v1 as components
+from streamlit.errors import StreamlitAPIException
 from datetime import datetime, timedelta
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import functools
 import hashlib
 import re
 import os
-import requests
-import threading
-from supabase import create_client, Client
 from dotenv import load_dotenv
 import time
 
+from analytics import compute_stats, load_client_summary, load_stats
+from availability import AvailabilityCache, CalendarIndex, fetch_availability, fetch_day_states
+from booking_events import (
+    CANCELLED, COMPLETED, CREATED, DELETED, RESCHEDULED, RESTORED, BookingEvent, BookingEvents
+)
+from broadcast import Broadcaster
+from client_profile import ClientProfile
+from contacts import ContactDirectory
+from message_templates import TEMPLATES, BookingContext, ClientContext, format_date
+from notifications import DEAD, PENDING, SENDING, SENT, NotificationOutbox
+from reminders import ReminderScheduler
+from request_memo import (
+    begin_request, child_request, invalidate as invalidate_request_memo, request_memo, track_queries
+)
+from projections import (
+    ADMIN_BOOKING_CARD, ADMIN_CLIENT_HISTORY, BOOKING_NOTIFY, RESCHEDULE_CHECK, UPCOMING_NOTIFY, Projection
+)
+from storage import StorageError, create_storage, in_chunks, keyset_after
+from stylesheet import STYLES_PATH, Stylesheet
+from telegram_transport import TelegramTransport
+from telegram_updates import ChatLinker, UpdateReceiver
+
 # Загрузка переменных окружения
 load_dotenv()
 
@@ -26,8 +48,21 @@ PAGE_CONFIG = {
     "initial_sidebar_state": "expanded"
 }
 
+# Первая команда Streamlit: init_* ниже (cache_resource) уже выводят элементы
+st.set_page_config(**PAGE_CONFIG)
+
+STYLE_CONFIG = {
+    "path": STYLES_PATH,
+    # true — стили в <head> через компонент-iframe, false — минифицированный <style>
+    # через st.markdown (если iframe-компоненты недоступны)
+    "inject_once": os.getenv('CSS_INJECT_ONCE', 'true').lower() == 'true',
+}
+
 ADMIN_PASSWORD_HASH = "240be518fabd2724ddb6f04eeb1da5967448d7e831c08c8fa822809f74c720a9"  # admin123
 
+# Разделы админ-панели: выполняется только выбранный (st.tabs выполняет все)
+ADMIN_TABS = ["📋 Записи", "👥 Клиенты", "⚙️ Настройки", "🚫 Блокировки", "📊 Аналитика", "🔔 Уведомления"]
+
 BOOKING_RULES = {
     "MIN_ADVANCE_HOURS": 1,
     "MIN_CANCEL_MINUTES": 30,
@@ -45,370 +80,197 @@ WEEKDAY_MAP = {
     '3': 'Ср', '4': 'Чт', '5': 'Пт', '6': 'Сб'
 }
 
+CACHE_SETTINGS = {
+    "AVAILABILITY_TTL_SECONDS": 60,
+    "AVAILABILITY_MAX_DAYS": 120,
+    "STATS_TTL_SECONDS": 300,
+    "CALENDAR_INDEX_TTL_SECONDS": 300,
+    "CONTACTS_TTL_SECONDS": 600,
+    "CONTACTS_MAX_CLIENTS": 10000,
+    "CLIENT_PROFILE_HISTORY": 20,
+    "CLIENT_PROFILE_MAX_AGE_SECONDS": 300,
+    # Строка "запросов за прогон" в сайдбаре (отладка повторных чтений)
+    "DEBUG_QUERIES": os.getenv('DEBUG_QUERIES', 'false').lower() == 'true',
+}
+
+DELIVERY_DISPLAY = {
+    'created_admin': 'админ (запись)',
+    'created_client': 'клиент (запись)',
+    'cancelled_admin': 'админ (отмена)',
+    'cancelled_client': 'клиент (отмена)',
+    'reminder_admin': 'админ (напоминание)',
+    'reminder_client': 'клиент (напоминание)',
+}
+
+DELIVERY_STATUS_EMOJI = {PENDING: '⏳', SENDING: '📤', SENT: '✅', DEAD: '❌'}
+
+DELIVERY_STATUS_TEXT = {PENDING: 'В очереди', SENDING: 'Отправляется', SENT: 'Отправлено', DEAD: 'Не доставлено'}
+
 TELEGRAM_CONFIG = {
     'bot_token': os.getenv('TELEGRAM_BOT_TOKEN', ''),
     'admin_chat_id': os.getenv('TELEGRAM_ADMIN_CHAT_ID', ''),
     'bot_username': os.getenv('TELEGRAM_BOT_USERNAME', 'Jenyhelperbot'),
-    'enabled': True
+    'enabled': True,
+    # HTTP-пул к Bot API (api_url можно направить на локальный фейк для тестов)
+    'api_url': os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org'),
+    'pool_size': int(os.getenv('TELEGRAM_POOL_SIZE', '10')),
+    'connect_timeout': float(os.getenv('TELEGRAM_CONNECT_TIMEOUT', '3.05')),
+    'read_timeout': float(os.getenv('TELEGRAM_READ_TIMEOUT', '10')),
+    'retries': int(os.getenv('TELEGRAM_RETRIES', '2')),
+    # Outbox уведомлений: запись не ждет ответа Telegram, повторы — в фоне
+    'outbox_batch': int(os.getenv('TELEGRAM_OUTBOX_BATCH', '20')),
+    'outbox_attempts': int(os.getenv('TELEGRAM_OUTBOX_ATTEMPTS', '6')),
+    'outbox_backoff': float(os.getenv('TELEGRAM_OUTBOX_BACKOFF', '5')),
+    # Рассылки: ниже лимита Bot API (30 сообщений/с), не чаще 1 сообщения/с в чат
+    'broadcast_rate': float(os.getenv('TELEGRAM_BROADCAST_RATE', '25')),
+    'broadcast_workers': int(os.getenv('TELEGRAM_BROADCAST_WORKERS', '8')),
+    # Прием /start connect_... через getUpdates (выключить, если обновления забирает другой процесс)
+    'receive_updates': os.getenv('TELEGRAM_RECEIVE_UPDATES', 'false').lower() == 'true',
+    'updates_batch': int(os.getenv('TELEGRAM_UPDATES_BATCH', '100')),
 }
 
 # ============================================================================
-# ИНИЦИАЛИЗАЦИЯ SUPABASE
+# ИНИЦИАЛИЗАЦИЯ ХРАНИЛИЩА (SUPABASE ИЛИ SQLITE)
 # ============================================================================
 
 @st.cache_resource
-def init_supabase():
-    """Инициализация клиента Supabase"""
+def init_service_errors():
+    """Фоновые службы, отключенные при запуске: {служба: состояние и причина} (видит администратор)"""
+    return {}
+
+@st.cache_resource
+def init_storage():
+    """Инициализация хранилища по STORAGE_BACKEND (supabase по умолчанию)"""
+    # Причина — на экране настройки: st.error отсюда повторялся бы в каждом init_*, вызывающем init_storage
     try:
-        supabase_url = os.getenv('SUPABASE_URL')
-        supabase_key = os.getenv('SUPABASE_KEY')
-        
-        if not supabase_url or not supabase_key:
-            st.error("❌ SUPABASE_URL и SUPABASE_KEY не настроены в переменных окружения")
-            return None
-            
-        return create_client(supabase_url, supabase_key)
+        return create_storage()
+    except StorageError as e:
+        print(f"❌ {e}")
+        init_service_errors()["🗄️ Хранилище"] = f"недоступно: {e}"
+        return None
+    except Exception as e:
+        print(f"❌ Ошибка подключения к хранилищу: {e}")
+        init_service_errors()["🗄️ Хранилище"] = f"недоступно: ошибка подключения ({e})"
+        return None
+
+@st.cache_resource
+def bookings_have_duration() -> bool:
+    """Есть ли в bookings колонка session_duration (в старых базах ее нет — длительность из настроек)"""
+    storage = init_storage()
+    if storage is None:
+        return False
+    try:
+        storage.table('bookings').select('session_duration').limit(1).execute()
+        return True
+    except Exception as e:
+        if 'session_duration' in str(e):
+            print("⚠️ В bookings нет колонки session_duration (migrations/bookings_session_duration.sql), используется длительность из настроек")
+            return False
+        print(f"Ошибка проверки колонки session_duration: {e}")
+        return True
+
+def booking_projection(projection: Projection) -> Projection:
+    """Проекция записей без session_duration, если колонки нет в базе"""
+    return projection if bookings_have_duration() else projection.without('session_duration')
+
+@st.cache_resource
+def init_availability_cache():
+    """Общий для всех сессий кэш занятости дней"""
+    return AvailabilityCache(
+        maxsize=CACHE_SETTINGS["AVAILABILITY_MAX_DAYS"],
+        ttl=CACHE_SETTINGS["AVAILABILITY_TTL_SECONDS"]
+    )
+
+@st.cache_resource
+def init_contact_directory():
+    """Общий для всех сессий справочник phone_hash -> Telegram chat_id"""
+    return ContactDirectory(
+        init_storage(),
+        ttl=CACHE_SETTINGS["CONTACTS_TTL_SECONDS"],
+        maxsize=CACHE_SETTINGS["CONTACTS_MAX_CLIENTS"]
+    )
+
+@st.cache_resource
+def init_calendar_index():
+    """Общая для всех сессий битовая карта занятости на горизонт записи"""
+    return CalendarIndex(ttl=CACHE_SETTINGS["CALENDAR_INDEX_TTL_SECONDS"])
+
+@st.cache_resource
+def init_telegram_transport():
+    """Общий пул keep-alive соединений к Telegram Bot API"""
+    return TelegramTransport(
+        TELEGRAM_CONFIG['bot_token'],
+        api_url=TELEGRAM_CONFIG['api_url'],
+        pool_size=TELEGRAM_CONFIG['pool_size'],
+        connect_timeout=TELEGRAM_CONFIG['connect_timeout'],
+        read_timeout=TELEGRAM_CONFIG['read_timeout'],
+        retries=TELEGRAM_CONFIG['retries']
+    )
+
+@st.cache_resource
+def init_broadcaster():
+    """Рассылки: свой пул соединений, 429 обрабатывает Broadcaster (retry_after)"""
+    transport = TelegramTransport(
+        TELEGRAM_CONFIG['bot_token'],
+        api_url=TELEGRAM_CONFIG['api_url'],
+        pool_size=TELEGRAM_CONFIG['broadcast_workers'],
+        connect_timeout=TELEGRAM_CONFIG['connect_timeout'],
+        read_timeout=TELEGRAM_CONFIG['read_timeout'],
+        retries=TELEGRAM_CONFIG['retries'],
+        retry_rate_limited=False
+    )
+    return Broadcaster(
+        transport.send_message,
+        global_rate=TELEGRAM_CONFIG['broadcast_rate'],
+        workers=TELEGRAM_CONFIG['broadcast_workers']
+    )
+
+@st.cache_resource
+def init_outbox():
+    """Outbox уведомлений: свой пул без повторов — задержки между попытками задает outbox
+    (None — таблицы outbox нет, уведомления отправляются сразу)"""
+    storage = init_storage()
+    if storage is None:
+        return None
+    transport = TelegramTransport(
+        TELEGRAM_CONFIG['bot_token'],
+        api_url=TELEGRAM_CONFIG['api_url'],
+        pool_size=2,
+        connect_timeout=TELEGRAM_CONFIG['connect_timeout'],
+        read_timeout=TELEGRAM_CONFIG['read_timeout'],
+        retries=0
+    )
+    try:
+        return NotificationOutbox(
+            storage,
+            transport.send_message,
+            batch_size=TELEGRAM_CONFIG['outbox_batch'],
+            max_attempts=TELEGRAM_CONFIG['outbox_attempts'],
+            backoff=TELEGRAM_CONFIG['outbox_backoff']
+        ).start()
     except Exception as e:
-        st.error(f"❌ Ошибка подключения к Supabase: {e}")
+        print(f"❌ Outbox отключен: {e}")
+        init_service_errors()["📬 Outbox"] = f"отключен: таблица outbox недоступна, см. migrations/outbox.sql ({e})"
         return None
 
 # ============================================================================
 # УЛУЧШЕННАЯ СТИЛИЗАЦИЯ С АНИМАЦИЯМИ И MODERN UI
 # ============================================================================
 
+@st.cache_resource
+def init_stylesheet():
+    """Стили из static/styles.css: чтение и минификация один раз на процесс"""
+    return Stylesheet(STYLE_CONFIG["path"])
+
 def load_custom_css():
-    """Загрузка улучшенных CSS стилей с современными эффектами"""
-    st.markdown("""
-        <style>
-        /* ===== ОБЩИЕ СТИЛИ ===== */
-        .main {
-            padding: 0rem 1rem;
-            background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%);
-        }
-        
-        /* ===== КНОПКИ С УЛУЧШЕННОЙ АНИМАЦИЕЙ ===== */
-        .stButton>button {
-            width: 100%;
-            border-radius: 12px;
-            height: 3.2em;
-            background: linear-gradient(135deg, #88c8bc 0%, #6ba292 100%);
-            color: white;
-            font-weight: 600;
-            border: none;
-            box-shadow: 0 4px 15px rgba(136, 200, 188, 0.3);
-            transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-            font-size: 1rem;
-            position: relative;
-            overflow: hidden;
-        }
-        
-        .stButton>button::before {
-            content: '';
-            position: absolute;
-            top: 50%;
-            left: 50%;
-            width: 0;
-            height: 0;
-            border-radius: 50%;
-            background: rgba(255, 255, 255, 0.2);
-            transform: translate(-50%, -50%);
-            transition: width 0.6s, height 0.6s;
-        }
-        
-        .stButton>button:hover::before {
-            width: 300px;
-            height: 300px;
-        }
-        
-        .stButton>button:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 8px 25px rgba(136, 200, 188, 0.5);
-            background: linear-gradient(135deg, #6ba292 0%, #88c8bc 100%);
-        }
-        
-        .stButton>button:active {
-            transform: translateY(0);
-            box-shadow: 0 4px 15px rgba(136, 200, 188, 0.3);
-        }
-        
-        /* ===== КАРТОЧКИ ЗАПИСЕЙ ===== */
-        .booking-card {
-            padding: 2rem;
-            border-radius: 20px;
-            background: rgba(255, 255, 255, 0.98);
-            margin-bottom: 1.5rem;
-            border-left: 5px solid #88c8bc;
-            box-shadow: 0 8px 30px rgba(0, 0, 0, 0.08);
-            transition: all 0.3s ease;
-            position: relative;
-            overflow: hidden;
-        }
-        
-        .booking-card::before {
-            content: '';
-            position: absolute;
-            top: 0;
-            left: -100%;
-            width: 100%;
-            height: 100%;
-            background: linear-gradient(90deg, transparent, rgba(136, 200, 188, 0.1), transparent);
-            transition: left 0.5s;
-        }
-        
-        .booking-card:hover {
-            transform: translateY(-5px);
-            box-shadow: 0 12px 40px rgba(0, 0, 0, 0.12);
-        }
-        
-        .booking-card:hover::before {
-            left: 100%;
-        }
-        
-        /* ===== ИНФОРМАЦИОННЫЕ ПАНЕЛИ ===== */
-        .info-box {
-            background: white;
-            border-radius: 20px;
-            padding: 2rem;
-            box-shadow: 0 8px 30px rgba(0, 0, 0, 0.08);
-            border-left: 5px solid #88c8bc;
-            transition: all 0.3s ease;
-            animation: fadeInUp 0.5s ease-out;
-        }
-        
-        .info-box:hover {
-            box-shadow: 0 12px 40px rgba(0, 0, 0, 0.12);
-        }
-        
-        @keyframes fadeInUp {
-            from {
-                opacity: 0;
-                transform: translateY(20px);
-            }
-            to {
-                opacity: 1;
-                transform: translateY(0);
-            }
-        }
-        
-        /* ===== ПРИВЕТСТВЕННЫЙ ХЕДЕР ===== */
-        .welcome-header {
-            background: linear-gradient(135deg, #88c8bc 0%, #a8d5ba 100%);
-            color: white;
-            padding: 3rem 2rem;
-            border-radius: 20px;
-            margin-bottom: 2rem;
-            text-align: center;
-            box-shadow: 0 10px 40px rgba(136, 200, 188, 0.3);
-            position: relative;
-            overflow: hidden;
-        }
-        
-        .welcome-header::before {
-            content: '';
-            position: absolute;
-            top: -50%;
-            right: -50%;
-            width: 200%;
-            height: 200%;
-            background: radial-gradient(circle, rgba(255,255,255,0.1) 0%, transparent 70%);
-            animation: rotate 20s linear infinite;
-        }
-        
-        @keyframes rotate {
-            from { transform: rotate(0deg); }
-            to { transform: rotate(360deg); }
-        }
-        
-        .welcome-header h1 {
-            position: relative;
-            z-index: 1;
-            margin: 0;
-            font-size: 2.5rem;
-            font-weight: 700;
-            text-shadow: 2px 2px 4px rgba(0,0,0,0.1);
-        }
-        
-        .welcome-header p {
-            position: relative;
-            z-index: 1;
-            margin: 0.5rem 0 0 0;
-            font-size: 1.2rem;
-            opacity: 0.95;
-        }
-        
-        /* ===== СООБЩЕНИЯ О УСПЕХЕ ===== */
-        .success-message {
-            background: linear-gradient(135deg, #f0f9f7 0%, #e8f5f1 100%);
-            border-left: 5px solid #88c8bc;
-            padding: 2rem;
-            border-radius: 16px;
-            margin: 1.5rem 0;
-            box-shadow: 0 8px 30px rgba(136, 200, 188, 0.2);
-            animation: slideInRight 0.5s ease-out;
-        }
-        
-        @keyframes slideInRight {
-            from {
-                opacity: 0;
-                transform: translateX(30px);
-            }
-            to {
-                opacity: 1;
-                transform: translateX(0);
-            }
-        }
-        
-        .success-message h3 {
-            color: #88c8bc;
-            margin-top: 0;
-        }
-        
-        /* ===== TELEGRAM СТАТУСЫ ===== */
-        .telegram-connected {
-            background: linear-gradient(135deg, #e3f2fd 0%, #bbdefb 100%);
-            border-left: 5px solid #0088cc;
-            padding: 1.5rem;
-            border-radius: 12px;
-            margin: 1rem 0;
-            animation: fadeIn 0.5s ease-out;
-        }
-        
-        .telegram-disconnected {
-            background: linear-gradient(135deg, #fff3e0 0%, #ffe0b2 100%);
-            border-left: 5px solid #ff9800;
-            padding: 1.5rem;
-            border-radius: 12px;
-            margin: 1rem 0;
-            animation: fadeIn 0.5s ease-out;
-        }
-        
-        @keyframes fadeIn {
-            from { opacity: 0; }
-            to { opacity: 1; }
-        }
-        
-        /* ===== ВРЕМЕННЫЕ СЛОТЫ ===== */
-        .time-slot-button {
-            transition: all 0.2s ease;
-        }
-        
-        .time-slot-button:hover {
-            transform: scale(1.05);
-        }
-        
-        /* ===== МЕТРИКИ ===== */
-        [data-testid="stMetricValue"] {
-            font-size: 2rem;
-            font-weight: 700;
-            color: #88c8bc;
-        }
-        
-        /* ===== ФОРМЫ ===== */
-        .stTextInput>div>div>input,
-        .stTextArea>div>div>textarea,
-        .stSelectbox>div>div>select {
-            border-radius: 10px;
-            border: 2px solid #e0e0e0;
-            transition: all 0.3s ease;
-        }
-        
-        .stTextInput>div>div>input:focus,
-        .stTextArea>div>div>textarea:focus,
-        .stSelectbox>div>div>select:focus {
-            border-color: #88c8bc;
-            box-shadow: 0 0 0 3px rgba(136, 200, 188, 0.1);
-        }
-        
-        /* ===== ЭКСПАНДЕРЫ ===== */
-        .streamlit-expanderHeader {
-            background: white;
-            border-radius: 10px;
-            border: 1px solid #e0e0e0;
-            transition: all 0.3s ease;
-        }
-        
-        .streamlit-expanderHeader:hover {
-            background: #f8f9fa;
-            border-color: #88c8bc;
-        }
-        
-        /* ===== ТАБЫ ===== */
-        .stTabs [data-baseweb="tab-list"] {
-            gap: 8px;
-        }
-        
-        .stTabs [data-baseweb="tab"] {
-            border-radius: 10px;
-            padding: 12px 24px;
-            background: white;
-            border: 2px solid #e0e0e0;
-            transition: all 0.3s ease;
-        }
-        
-        .stTabs [data-baseweb="tab"]:hover {
-            background: #f8f9fa;
-            border-color: #88c8bc;
-        }
-        
-        .stTabs [aria-selected="true"] {
-            background: linear-gradient(135deg, #88c8bc 0%, #6ba292 100%);
-            color: white !important;
-            border-color: #88c8bc;
-        }
-        
-        /* ===== ПРОГРЕСС БАР ===== */
-        .stProgress > div > div > div > div {
-            background: linear-gradient(90deg, #88c8bc 0%, #6ba292 100%);
-        }
-        
-        /* ===== АЛЕРТЫ ===== */
-        .stAlert {
-            border-radius: 12px;
-            animation: slideInLeft 0.3s ease-out;
-        }
-        
-        @keyframes slideInLeft {
-            from {
-                opacity: 0;
-                transform: translateX(-20px);
-            }
-            to {
-                opacity: 1;
-                transform: translateX(0);
-            }
-        }
-        
-        /* ===== САЙДБАР ===== */
-        [data-testid="stSidebar"] {
-            background: linear-gradient(180deg, #f8f9fa 0%, #ffffff 100%);
-        }
-        
-        /* ===== СКРОЛЛБАР ===== */
-        ::-webkit-scrollbar {
-            width: 8px;
-            height: 8px;
-        }
-        
-        ::-webkit-scrollbar-track {
-            background: #f1f1f1;
-            border-radius: 10px;
-        }
-        
-        ::-webkit-scrollbar-thumb {
-            background: linear-gradient(135deg, #88c8bc 0%, #6ba292 100%);
-            border-radius: 10px;
-        }
-        
-        ::-webkit-scrollbar-thumb:hover {
-            background: linear-gradient(135deg, #6ba292 0%, #88c8bc 100%);
-        }
-        
-        /* ===== LOADING SPINNER ===== */
-        .stSpinner > div {
-            border-top-color: #88c8bc !important;
-        }
-        </style>
-    """, unsafe_allow_html=True)
+    """Подключение стилей в <head> страницы на каждом полном прогоне (фрагменты его не повторяют)"""
+    stylesheet = init_stylesheet()
+    if not STYLE_CONFIG["inject_once"]:
+        st.markdown(stylesheet.style_tag(), unsafe_allow_html=True)
+    else:
+        # На каждом полном прогоне: сервер не знает, выполнил ли браузер скрипт
+        # (прогон мог прервать st.rerun()). Тот же iframe браузер не пересоздает
+        components.html(stylesheet.injector(), height=0)
 
 # ============================================================================
 # УТИЛИТЫ И ХЕЛПЕРЫ (УЛУЧШЕННЫЕ)
@@ -453,13 +315,6 @@ def validate_email(email: str) -> tuple:
         return True, "✅ Email корректен"
     return False, "❌ Неверный формат email"
 
-def format_date(date_str: str, format_str: str = '%d.%m.%Y') -> str:
-    """Форматирование даты с обработкой ошибок"""
-    try:
-        return datetime.strptime(date_str, '%Y-%m-%d').strftime(format_str)
-    except:
-        return date_str
-
 def calculate_time_until(date_str: str, time_str: str) -> timedelta:
     """Вычисление времени до события"""
     try:
@@ -527,11 +382,12 @@ def format_datetime_relative(date_str: str, time_str: str) -> str:
 # ============================================================================
 
 class TelegramBotService:
-    def __init__(self):
+    def __init__(self, transport: TelegramTransport):
         self.bot_token = TELEGRAM_CONFIG['bot_token']
         self.admin_chat_id = TELEGRAM_CONFIG['admin_chat_id']
         self.bot_username = TELEGRAM_CONFIG['bot_username']
         self.enabled = TELEGRAM_CONFIG['enabled']
+        self.transport = transport
     
     def _send_message(self, chat_id: str, message: str, parse_mode: str = 'HTML') -> bool:
         """Базовая отправка сообщения в Telegram"""
@@ -539,15 +395,8 @@ class TelegramBotService:
             if not self.enabled or not self.bot_token:
                 return False
             
-            url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
-            
-            payload = {
-                'chat_id': chat_id,
-                'text': message,
-                'parse_mode': parse_mode
-            }
-            
-            response = requests.post(url, json=payload, timeout=10)
+            # Общая сессия: без нового TCP+TLS рукопожатия на каждое сообщение
+            response = self.transport.send_message(chat_id, message, parse_mode)
             
             if response.status_code == 200:
                 return True
@@ -575,160 +424,35 @@ class TelegramBotService:
         except:
             return False
     
-    def get_bot_link(self, client_phone: str = None) -> str:
+    def get_bot_link(self, link_token: str = None) -> str:
         """Получение ссылки на бота с параметрами"""
         base_url = f"https://t.me/{self.bot_username}"
-        if client_phone:
-            return f"{base_url}?start=connect_{hash_password(client_phone)[:10]}"
+        if link_token:
+            # Одноразовый токен — по нему приемник обновлений находит клиента
+            return f"{base_url}?start=connect_{link_token}"
         return base_url
     
     # ============================================================================
     # УВЕДОМЛЕНИЯ О ЗАПИСИ
     # ============================================================================
     
-    def notify_booking_created_admin(self, booking_data: dict) -> bool:
-        """Уведомление админу о новой записи"""
-        name = booking_data.get('client_name', 'Клиент')
-        phone = booking_data.get('client_phone', 'Не указан')
-        date = format_date(booking_data.get('booking_date', ''))
-        time = booking_data.get('booking_time', '')
-        
-        message = f"""
-📅 <b>НОВАЯ ЗАПИСЬ НА КОНСУЛЬТАЦИЮ</b>
-
-👤 <b>Клиент:</b> {name}
-📱 <b>Телефон:</b> <code>{phone}</code>
-📅 <b>Дата:</b> {date}
-🕐 <b>Время:</b> {time}
-
-⏰ <i>Напоминание будет отправлено за 1 час до консультации</i>
-        """
-        
-        return self.send_to_admin(message)
-    
-    def notify_booking_created_client(self, client_chat_id: str, booking_data: dict) -> bool:
-        """Уведомление клиенту о подтверждении записи"""
-        name = booking_data.get('client_name', '')
-        date = format_date(booking_data.get('booking_date', ''))
-        time = booking_data.get('booking_time', '')
-        
-        message = f"""
-✅ <b>ВАША ЗАПИСЬ ПОДТВЕРЖДЕНА</b>
-
-Добрый день, {name}!
-
-📅 <b>Дата:</b> {date}
-🕐 <b>Время:</b> {time}
-
-Мы ждем вас на консультацию!
-
-⏰ <i>Мы напомним вам за 1 час до начала</i>
-
-Если у вас возникли вопросы, ответьте на это сообщение.
-        """
-        
-        return self.send_to_client(client_chat_id, message)
-    
-    def notify_booking_cancelled_admin(self, booking_data: dict) -> bool:
-        """Уведомление админу об отмене записи"""
-        name = booking_data.get('client_name', 'Клиент')
-        phone = booking_data.get('client_phone', 'Не указан')
-        date = format_date(booking_data.get('booking_date', ''))
-        
-        message = f"""
-❌ <b>ОТМЕНА ЗАПИСИ</b>
-
-👤 <b>Клиент:</b> {name}
-📱 <b>Телефон:</b> <code>{phone}</code>
-📅 <b>Дата:</b> {date}
-
-🚫 <i>Запись отменена клиентом</i>
-        """
-        
-        return self.send_to_admin(message)
-    
-    def notify_booking_cancelled_client(self, client_chat_id: str, booking_data: dict) -> bool:
-        """Уведомление клиенту об отмене записи"""
-        name = booking_data.get('client_name', '')
-        date = format_date(booking_data.get('booking_date', ''))
-        
-        message = f"""
-❌ <b>ЗАПИСЬ ОТМЕНЕНА</b>
-
-Уважаемый(ая) {name},
-
-Ваша запись на {date} отменена.
-
-Если вы хотите записаться на другое время, ответьте на это сообщение.
-
-С уважением,
-Ваш психолог
-        """
-        
-        return self.send_to_client(client_chat_id, message)
+    def booking_message(self, template: str, booking_data: dict, default_name: str = '') -> str:
+        """Текст уведомления о записи (отправляет outbox)"""
+        return TEMPLATES.render(template, BookingContext.from_booking(booking_data, default_name))
     
     def notify_reminder_admin(self, booking_data: dict) -> bool:
         """Напоминание админу за 1 час"""
-        name = booking_data.get('client_name', 'Клиент')
-        phone = booking_data.get('client_phone', 'Не указан')
-        time = booking_data.get('booking_time', '')
-        
-        message = f"""
-⏰ <b>НАПОМИНАНИЕ О КОНСУЛЬТАЦИИ</b>
-
-Через 1 час у вас консультация:
-
-👤 <b>Клиент:</b> {name}
-📱 <b>Телефон:</b> <code>{phone}</code>
-🕐 <b>Время:</b> {time}
-
-Подготовьтесь к встрече!
-        """
-        
+        message = TEMPLATES.render('reminder_admin', BookingContext.from_booking(booking_data, 'Клиент'))
         return self.send_to_admin(message)
     
     def notify_reminder_client(self, client_chat_id: str, booking_data: dict) -> bool:
         """Напоминание клиенту за 1 час"""
-        name = booking_data.get('client_name', '')
-        time = booking_data.get('booking_time', '')
-        
-        message = f"""
-⏰ <b>НАПОМИНАНИЕ О КОНСУЛЬТАЦИИ</b>
-
-Добрый день, {name}!
-
-Через 1 час у вас консультация в {time}.
-
-Пожалуйста, подготовьтесь к встрече.
-
-Ждем вас!
-        """
-        
+        message = TEMPLATES.render('reminder_client', BookingContext.from_booking(booking_data))
         return self.send_to_client(client_chat_id, message)
     
     def send_welcome_notification(self, client_chat_id: str, client_name: str, upcoming_bookings: list):
         """Приветственное уведомление после подключения"""
-        message = f"""
-👋 <b>ДОБРО ПОЖАЛОВАТЬ, {client_name}!</b>
-
-✅ <b>Вы успешно подключили уведомления!</b>
-
-Теперь вы будете получать:
-• ✅ Подтверждения новых записей
-• ⏰ Напоминания за 1 час до консультаций
-• ❌ Уведомления об отменах
-        """
-        
-        # Добавляем информацию о предстоящих записях
-        if upcoming_bookings:
-            message += "\n\n📅 <b>Ваши предстоящие консультации:</b>\n"
-            for booking in upcoming_bookings:
-                date = format_date(booking.get('booking_date', ''))
-                time = booking.get('booking_time', '')
-                message += f"• {date} в {time}\n"
-        
-        message += "\nС уважением,\nВаш психолог 🌿"
-        
+        message = TEMPLATES.render('welcome', ClientContext.from_bookings(client_name, upcoming_bookings))
         return self.send_to_client(client_chat_id, message)
     
     def send_upcoming_bookings_notification(self, client_chat_id: str, client_name: str, bookings: list):
@@ -736,81 +460,68 @@ class TelegramBotService:
         if not bookings:
             return False
         
-        message = f"""
-📅 <b>ВАШИ ПРЕДСТОЯЩИЕ КОНСУЛЬТАЦИИ</b>
-
-Уважаемый(ая) {client_name},
-
-У вас запланированы консультации:
-        """
-        
-        for booking in bookings:
-            date = format_date(booking.get('booking_date', ''))
-            time = booking.get('booking_time', '')
-            message += f"\n• {date} в {time}"
-        
-        message += "\n\n⏰ Мы напомним вам за 1 час до каждой консультации!"
-        
+        message = TEMPLATES.render('upcoming_bookings', ClientContext.from_bookings(client_name, bookings))
         return self.send_to_client(client_chat_id, message)
+
+# Создаем экземпляр бота
+telegram_bot = TelegramBotService(init_telegram_transport())
+
+def send_booking_reminder(reminder: dict) -> bool:
+    """Отправка напоминания из таблицы reminders (данные записи читаются заново);
+    None — запись отменена, False — повторить позже"""
+    response = db.table('bookings')\
+        .select(booking_projection(BOOKING_NOTIFY).select)\
+        .eq('id', reminder['booking_id'])\
+        .execute()
     
-    def schedule_reminder(self, booking_data: dict, client_chat_id: str):
-        """Планирование напоминания за 1 час до консультации"""
-        try:
-            booking_date = booking_data.get('booking_date')
-            booking_time = booking_data.get('booking_time')
-            
-            if not booking_date or not booking_time:
-                return
-            
-            # Создаем datetime объекта консультации
-            consultation_datetime = datetime.strptime(
-                f"{booking_date} {booking_time}", 
-                "%Y-%m-%d %H:%M"
-            )
-            
-            # Вычисляем время напоминания (за 1 час)
-            reminder_time = consultation_datetime - timedelta(hours=1)
-            
-            # Вычисляем задержку в секундах
-            now = datetime.now()
-            delay_seconds = (reminder_time - now).total_seconds()
-            
-            # Если напоминание должно быть в будущем
-            if delay_seconds > 0:
-                # Запускаем в отдельном потоке
-                timer = threading.Timer(
-                    delay_seconds, 
-                    self._send_reminder, 
-                    [booking_data, client_chat_id]
-                )
-                timer.daemon = True
-                timer.start()
-                
-                print(f"⏰ Напоминание запланировано на {reminder_time}")
-            else:
-                print("⚠️ Время консультации уже прошло, напоминание не планируется")
-                
-        except Exception as e:
-            print(f"❌ Ошибка планирования напоминания: {e}")
+    if not response.data or response.data[0]['status'] == 'cancelled':
+        return None
     
-    def _send_reminder(self, booking_data: dict, client_chat_id: str):
-        """Отправка запланированного напоминания"""
-        try:
-            print("🔔 Отправка запланированного напоминания...")
-            
-            # Отправляем админу
-            self.notify_reminder_admin(booking_data)
-            
-            # Отправляем клиенту
-            self.notify_reminder_client(client_chat_id, booking_data)
-            
-            print("✅ Напоминания отправлены!")
-                
-        except Exception as e:
-            print(f"❌ Ошибка отправки напоминания: {e}")
+    if not telegram_bot.enabled or not telegram_bot.bot_token:
+        return False
+    
+    booking = response.data[0]
+    rows = [
+        {'booking_id': booking['id'], 'kind': kind, 'chat_id': chat_id,
+         'text': telegram_bot.booking_message(template, booking, default_name)}
+        for kind, chat_id, template, default_name in [
+            ('reminder_admin', telegram_bot.admin_chat_id, 'reminder_admin', 'Клиент'),
+            ('reminder_client', reminder.get('chat_id'), 'reminder_client', ''),
+        ]
+        if chat_id
+    ]
+    
+    outbox = init_outbox()
+    if outbox is not None:
+        # Повторы каждого получателя отдельно — на стороне outbox
+        return len(outbox.enqueue(rows)) == len(rows)
+    
+    # Без outbox — сразу; напоминание отправлено, только если дошло и админу, и клиенту
+    results = [telegram_bot.send_to_client(row['chat_id'], row['text']) for row in rows]
+    return all(results)
 
-# Создаем экземпляр бота
-telegram_bot = TelegramBotService()
+@st.cache_resource
+def init_reminder_scheduler():
+    """Единый планировщик напоминаний: при старте догоняет просроченные (None — напоминания отключены)"""
+    storage = init_storage()
+    if storage is None:
+        return None
+    try:
+        return ReminderScheduler(storage, send_booking_reminder, lead=timedelta(hours=1)).start()
+    except Exception as e:
+        print(f"❌ Напоминания отключены: {e}")
+        init_service_errors()["⏰ Напоминания"] = f"отключены: таблица reminders недоступна, см. migrations/reminders.sql ({e})"
+        return None
+
+@st.cache_resource
+def init_booking_events():
+    """Шина событий записей: календарь и напоминания обновляются по booking_id"""
+    events = BookingEvents()
+    events.subscribe(init_calendar_index().on_booking_event, name='calendar')
+    reminders = init_reminder_scheduler()
+    if reminders is not None:
+        events.subscribe(reminders.on_booking_event, name='reminders')
+    return events
 
 # ============================================================================
 # ФУНКЦИИ ДЛЯ РАБОТЫ С TELEGRAM В БАЗЕ
@@ -821,43 +532,34 @@ def save_telegram_chat_id(phone: str, chat_id: str):
     try:
         phone_hash = hash_password(normalize_phone(phone))
         
-        # Обновляем все записи клиента
-        response = supabase.table('bookings')\
-            .update({'telegram_chat_id': chat_id})\
-            .eq('phone_hash', phone_hash)\
-            .execute()
+        # Одна строка в client_contacts; кэш обновляется сразу
+        contacts.connect(phone_hash, chat_id)
+        invalidate_request_memo(get_client_telegram_chat_id)
+        refresh_client_profile()
         
         return True
     except Exception as e:
         print(f"❌ Ошибка сохранения chat_id: {e}")
         return False
 
+@request_memo
 def get_client_telegram_chat_id(phone: str):
     """Получение Telegram chat_id клиента"""
     try:
         phone_hash = hash_password(normalize_phone(phone))
-        
-        response = supabase.table('bookings')\
-            .select('telegram_chat_id')\
-            .eq('phone_hash', phone_hash)\
-            .not_.is_('telegram_chat_id', None)\
-            .limit(1)\
-            .execute()
-        
-        if response.data and response.data[0]['telegram_chat_id']:
-            return response.data[0]['telegram_chat_id']
-        return None
+        return contacts.get(phone_hash)
     except Exception as e:
         print(f"❌ Ошибка получения chat_id: {e}")
         return None
 
+@request_memo
 def get_upcoming_bookings_with_telegram(phone: str):
     """Получение предстоящих записей клиента"""
     try:
         phone_hash = hash_password(normalize_phone(phone))
         
-        response = supabase.table('bookings')\
-            .select('*')\
+        response = db.table('bookings')\
+            .select(UPCOMING_NOTIFY.select)\
             .eq('phone_hash', phone_hash)\
             .eq('status', 'confirmed')\
             .gte('booking_date', datetime.now().date().isoformat())\
@@ -870,29 +572,139 @@ def get_upcoming_bookings_with_telegram(phone: str):
         print(f"❌ Ошибка получения записей: {e}")
         return []
 
-def send_telegram_connection_test(chat_id: str, client_name: str):
-    """Отправка тестового уведомления после подключения"""
+def schedule_reminders_for_linked(chat_ids: dict):
+    """Напоминания по предстоящим записям клиентов, подключенных через бота ({phone_hash: chat_id})"""
+    reminders = init_reminder_scheduler()
+    if reminders is None:
+        return
     try:
-        message = f"""
-🔔 <b>ТЕСТОВОЕ УВЕДОМЛЕНИЕ</b>
-
-Привет, {client_name}!
+        response = init_storage().table('bookings')\
+            .select('id, booking_date, booking_time, phone_hash')\
+            .in_('phone_hash', list(chat_ids))\
+            .eq('status', 'confirmed')\
+            .gte('booking_date', datetime.now().date().isoformat())\
+            .execute()
+        
+        for booking in response.data or []:
+            reminders.schedule(booking, chat_ids[booking['phone_hash']])
+    except Exception as e:
+        print(f"❌ Ошибка планирования напоминаний: {e}")
 
-Это тестовое сообщение подтверждает, что вы успешно подключили уведомления в Telegram.
+@st.cache_resource
+def init_chat_linker():
+    """Привязка chat_id по одноразовым токенам ссылок на бота"""
+    return ChatLinker(init_storage(), init_contact_directory(), on_linked=schedule_reminders_for_linked)
 
-Теперь вы будете получать:
-✅ Подтверждения записей
-⏰ Напоминания за 1 час
-❌ Уведомления об отменах
+@st.cache_resource
+def init_update_receiver():
+    """Long polling обновлений бота: автоматическая привязка chat_id по ссылке get_bot_link"""
+    if not TELEGRAM_CONFIG['receive_updates'] or not TELEGRAM_CONFIG['bot_token']:
+        return None
+    return UpdateReceiver(
+        TELEGRAM_CONFIG['bot_token'],
+        init_chat_linker(),
+        base_url=f"{TELEGRAM_CONFIG['api_url']}/bot",
+        batch_size=TELEGRAM_CONFIG['updates_batch'],
+        connect_timeout=TELEGRAM_CONFIG['connect_timeout'],
+        read_timeout=TELEGRAM_CONFIG['read_timeout']
+    ).start()
+
+def get_telegram_link_token(phone: str):
+    """Одноразовый токен ссылки на бота, один на сессию клиента
+    (None — приемника обновлений нет или таблица link_tokens недоступна)"""
+    if init_update_receiver() is None:
+        return None
+    phone_hash = hash_password(normalize_phone(phone))
+    issued = st.session_state.get('telegram_link_token')
+    if issued and issued[0] == phone_hash:
+        return issued[1]
+    try:
+        token = init_chat_linker().issue(phone_hash)
+    except Exception as e:
+        print(f"❌ Токен ссылки на бота не выдан (migrations/link_tokens.sql): {e}")
+        return None
+    st.session_state.telegram_link_token = (phone_hash, token)
+    return token
 
-Отлично! Уведомления работают! 🎉
-        """
+def send_telegram_connection_test(chat_id: str, client_name: str):
+    """Отправка тестового уведомления после подключения"""
+    try:
+        message = TEMPLATES.render('connection_test', {'name': client_name})
         
         return telegram_bot.send_to_client(chat_id, message)
     except Exception as e:
         print(f"❌ Ошибка отправки тестового уведомления: {e}")
         return False
 
+def get_broadcast_recipients(date: str = None) -> dict:
+    """Чаты клиентов с подключенным Telegram: {chat_id: поля для шаблона}"""
+    try:
+        if date:
+            # Для изменения расписания — только подтвержденные записи на этот день
+            response = db.table('bookings')\
+                .select('phone_hash, client_name, booking_date, booking_time')\
+                .eq('booking_date', date)\
+                .eq('status', 'confirmed')\
+                .order('booking_time')\
+                .execute()
+            rows = response.data or []
+            # chat_id — из справочника контактов (клиент мог подключиться уже после записи)
+            chat_ids = contacts.get_many([row['phone_hash'] for row in rows])
+        else:
+            # Все подключенные клиенты; имена — из их последних записей, частями по IN_CHUNK_SIZE
+            chat_ids = contacts.connected()
+            rows = []
+            for chunk in in_chunks(list(chat_ids)):
+                response = db.table('bookings')\
+                    .select('phone_hash, client_name')\
+                    .in_('phone_hash', chunk)\
+                    .order('created_at', desc=True)\
+                    .execute()
+                rows.extend(response.data or [])
+        
+        recipients = {}
+        for row in rows:
+            chat_id = chat_ids.get(row['phone_hash'])
+            if not chat_id:
+                continue
+            fields = {'name': row['client_name']}
+            if date:
+                fields.update({'date': row['booking_date'], 'time': row['booking_time']})
+            recipients.setdefault(str(chat_id), fields)
+        return recipients
+    except Exception as e:
+        print(f"❌ Ошибка получения получателей рассылки: {e}")
+        return {}
+
+def broadcast_to_clients(recipients: dict, template: str, context: dict = None):
+    """Рассылка с индикатором прогресса; итог сохраняется в session state"""
+    progress = st.progress(0.0, text="📢 Рассылка...")
+    
+    def on_progress(done, total):
+        progress.progress(done / total if total else 1.0, text=f"📢 Отправлено {done} из {total}")
+    
+    try:
+        report = init_broadcaster().broadcast(
+            list(recipients), template, context, chat_context=recipients, on_progress=on_progress
+        )
+    except (ValueError, KeyError) as e:
+        progress.empty()
+        st.error(f"❌ Ошибка в тексте рассылки (фигурные скобки вне полей пишите как {{{{ и }}}}): {e}")
+        return None
+    
+    st.session_state.last_broadcast = {
+        'at': datetime.now().strftime('%d.%m.%Y %H:%M'),
+        'total': report.total,
+        'sent': report.sent,
+        'failed': [
+            {'chat_id': chat_id, 'client_name': recipients[chat_id].get('name'), 'error': result['error']}
+            for chat_id, result in report.results.items() if result['status'] != 'sent'
+        ],
+        'rate_limited': report.rate_limited,
+        'elapsed': report.elapsed,
+    }
+    return report
+
 # ============================================================================
 # МЕНЕДЖЕР УВЕДОМЛЕНИЙ
 # ============================================================================
@@ -900,36 +712,54 @@ def send_telegram_connection_test(chat_id: str, client_name: str):
 class NotificationManager:
     def __init__(self):
         self.bot = telegram_bot
+        self.outbox = init_outbox()
+        self.reminders = init_reminder_scheduler()
+    
+    def _enqueue(self, booking_data: dict, messages: list) -> set:
+        """Запись уведомлений в outbox одним запросом: [(вид, chat_id, шаблон, имя по умолчанию)]"""
+        if not self.bot.enabled or not self.bot.bot_token:
+            return set()
+        
+        rows = [
+            {'booking_id': booking_data.get('id'), 'kind': kind, 'chat_id': chat_id,
+             'text': self.bot.booking_message(template, booking_data, default_name)}
+            for kind, chat_id, template, default_name in messages
+            if chat_id
+        ]
+        if self.outbox is None:
+            # Без outbox — сразу, без повторов
+            return {row['kind'] for row in rows if self.bot.send_to_client(row['chat_id'], row['text'])}
+        try:
+            return {row['kind'] for row in self.outbox.enqueue(rows)}
+        except Exception as e:
+            print(f"❌ Ошибка записи уведомлений в outbox: {e}")
+            return set()
     
     def notify_booking_created(self, booking_data: dict, client_chat_id: str = None):
-        """Полный цикл уведомлений о новой записи"""
-        results = {}
-        
-        # Уведомление администратору
-        results['admin_notified'] = self.bot.notify_booking_created_admin(booking_data)
-        
-        # Уведомление клиенту (если указан chat_id)
-        if client_chat_id:
-            results['client_notified'] = self.bot.notify_booking_created_client(client_chat_id, booking_data)
-            
-            # Планируем напоминание за 1 час
-            self.bot.schedule_reminder(booking_data, client_chat_id)
-            results['reminder_scheduled'] = True
-        
-        return results
+        """Уведомления о новой записи (админу и клиенту, если указан chat_id)"""
+        queued = self._enqueue(booking_data, [
+            ('created_admin', self.bot.admin_chat_id, 'booking_created_admin', 'Клиент'),
+            ('created_client', client_chat_id, 'booking_created_client', ''),
+        ])
+        return {'admin_queued': 'created_admin' in queued, 'client_queued': 'created_client' in queued}
     
     def notify_booking_cancelled(self, booking_data: dict, client_chat_id: str = None):
-        """Уведомления об отмене записи"""
-        results = {}
-        
-        # Уведомление администратору
-        results['admin_notified'] = self.bot.notify_booking_cancelled_admin(booking_data)
-        
-        # Уведомление клиенту (если указан chat_id)
-        if client_chat_id:
-            results['client_notified'] = self.bot.notify_booking_cancelled_client(client_chat_id, booking_data)
-        
-        return results
+        """Уведомления об отмене записи (админу и клиенту, если указан chat_id)"""
+        queued = self._enqueue(booking_data, [
+            ('cancelled_admin', self.bot.admin_chat_id, 'booking_cancelled_admin', 'Клиент'),
+            ('cancelled_client', client_chat_id, 'booking_cancelled_client', ''),
+        ])
+        return {'admin_queued': 'cancelled_admin' in queued, 'client_queued': 'cancelled_client' in queued}
+    
+    def delivery_statuses(self, booking_ids: list) -> dict:
+        """Статусы доставки уведомлений по записям страницы (один запрос)"""
+        if self.outbox is None:
+            return {}
+        try:
+            return self.outbox.for_bookings(booking_ids)
+        except Exception as e:
+            print(f"❌ Ошибка чтения outbox: {e}")
+            return {}
     
     def connect_client_telegram(self, phone: str, chat_id: str, client_name: str):
         """Подключение клиента к Telegram уведомлениям"""
@@ -950,8 +780,9 @@ class NotificationManager:
             test_success = send_telegram_connection_test(chat_id, client_name)
             
             # Планируем напоминания для предстоящих записей
-            for booking in upcoming_bookings:
-                self.bot.schedule_reminder(booking, chat_id)
+            if self.reminders is not None:
+                for booking in upcoming_bookings:
+                    self.reminders.schedule(booking, chat_id)
             
             return welcome_success or test_success
             
@@ -989,8 +820,9 @@ def render_telegram_section():
     """Отображение секции подключения Telegram"""
     st.markdown("### 💬 Уведомления в Telegram")
     
-    # Получаем текущий chat_id клиента
-    current_chat_id = get_client_telegram_chat_id(st.session_state.client_phone)
+    # Текущий chat_id клиента из профиля сессии
+    profile = get_client_profile()
+    current_chat_id = profile.chat_id if profile else None
     
     if current_chat_id:
         # Telegram уже подключен
@@ -1026,7 +858,7 @@ def render_telegram_section():
                     st.error("❌ Нет предстоящих записей")
         
         # Информация о предстоящих записях
-        upcoming_bookings = get_upcoming_bookings_with_telegram(st.session_state.client_phone)
+        upcoming_bookings = profile.upcoming_bookings
         if upcoming_bookings:
             st.markdown("#### 📅 Ваши предстоящие консультации:")
             for booking in upcoming_bookings:
@@ -1043,7 +875,14 @@ def render_telegram_section():
         </div>
         """, unsafe_allow_html=True)
         
-        st.markdown("""
+        # С приемником обновлений chat_id привязывается сам по ссылке на бота
+        link_token = get_telegram_link_token(st.session_state.client_phone)
+        if link_token is None:
+            connect_step = "4. Вернитесь сюда и введите ваш Chat ID"
+        else:
+            connect_step = '4. Вернитесь сюда и нажмите "Проверить подключение" — Chat ID вводить не нужно'
+        
+        st.markdown(f"""
         ### 📱 Подключите Telegram за 2 минуты!
         
         **После подключения вы будете получать:**
@@ -1055,11 +894,16 @@ def render_telegram_section():
         1. Нажмите кнопку "Подключить Telegram" ниже
         2. Откроется Telegram с нашим ботом
         3. Нажмите кнопку START / ЗАПУСТИТЬ
-        4. Вернитесь сюда и введите ваш Chat ID
+        {connect_step}
         """)
         
+        if link_token is not None:
+            if st.button("🔄 Проверить подключение", use_container_width=True):
+                refresh_client_profile()
+                st.rerun()
+        
         # Ссылка на бота
-        bot_link = telegram_bot.get_bot_link(st.session_state.client_phone)
+        bot_link = telegram_bot.get_bot_link(link_token)
         
         col1, col2 = st.columns([1, 2])
         
@@ -1161,11 +1005,19 @@ def render_telegram_section():
 # ИНИЦИАЛИЗАЦИЯ ПРИЛОЖЕНИЯ
 # ============================================================================
 
-st.set_page_config(**PAGE_CONFIG)
 load_custom_css()
 
-# Инициализация Supabase
-supabase = init_supabase()
+# Память чтений на один прогон скрипта
+request_scope = begin_request()
+
+# Инициализация хранилища (запросы страницы считаются в request_scope;
+# фоновые компоненты работают с init_storage() напрямую)
+db = track_queries(init_storage())
+availability_cache = init_availability_cache()
+calendar_index = init_calendar_index()
+contacts = init_contact_directory()
+update_receiver = init_update_receiver()
+booking_events = init_booking_events()
 
 # Инициализация session state
 def init_session_state():
@@ -1175,6 +1027,7 @@ def init_session_state():
         'client_logged_in': False,
         'client_phone': "",
         'client_name': "",
+        'client_profile': None,
         'current_tab': "Запись",
         'show_admin_login': False,
         'selected_time': None,
@@ -1185,7 +1038,9 @@ def init_session_state():
         'show_stats': False,
         'confirm_delete': {},
         'search_query': '',
-        'auto_refresh': False
+        'auto_refresh': False,
+        'bookings_page_cursors': [None],
+        'admin_tab': ADMIN_TABS[0]
     }
     
     for key, value in defaults.items():
@@ -1198,11 +1053,12 @@ init_session_state()
 # БИЗНЕС-ЛОГИКА: НАСТРОЙКИ
 # ============================================================================
 
+@request_memo
 @st.cache_data(ttl=300)
 def get_settings():
     """Получение настроек системы"""
     try:
-        response = supabase.table('settings').select('*').eq('id', 1).execute()
+        response = db.table('settings').select('*').eq('id', 1).execute()
         if response.data:
             settings = response.data[0]
             
@@ -1217,7 +1073,7 @@ def get_settings():
             }
             
             for key, value in default_info_settings.items():
-                if key not in settings:
+                if settings.get(key) is None:
                     settings[key] = value
             
             return settings
@@ -1237,7 +1093,7 @@ def get_settings():
             }
             
             try:
-                supabase.table('settings').insert({**default_settings, 'id': 1}).execute()
+                db.table('settings').insert({**default_settings, 'id': 1}).execute()
                 return default_settings
             except Exception as insert_error:
                 # Если не удалось вставить все поля, пробуем только основные
@@ -1247,7 +1103,7 @@ def get_settings():
                     'session_duration': 60,
                     'break_duration': 15
                 }
-                supabase.table('settings').insert({**basic_settings, 'id': 1}).execute()
+                db.table('settings').insert({**basic_settings, 'id': 1}).execute()
                 return {**basic_settings, **default_info_settings}
                 
     except Exception as e:
@@ -1280,8 +1136,9 @@ def update_settings(work_start: str, work_end: str, session_duration: int):
         filtered_data = {k: v for k, v in update_data.items() if k in current_settings}
         
         if filtered_data:
-            supabase.table('settings').update(filtered_data).eq('id', 1).execute()
+            db.table('settings').update(filtered_data).eq('id', 1).execute()
             st.cache_data.clear()
+            invalidate_request_memo()
             return True
         else:
             return False
@@ -1302,8 +1159,9 @@ def update_info_settings(info_data: dict):
                 update_data[key] = value
         
         if update_data:
-            supabase.table('settings').update(update_data).eq('id', 1).execute()
+            db.table('settings').update(update_data).eq('id', 1).execute()
             st.cache_data.clear()
+            invalidate_request_memo()
             return True
         else:
             st.error("❌ Нет полей для обновления")
@@ -1344,138 +1202,62 @@ def render_info_panel():
     
     info_html += "</div>"
     
-    st.markdown(info_html, unsafe_allow_html=True)
-
-# ============================================================================
-# БИЗНЕС-ЛОГИКА: КЛИЕНТЫ
-# ============================================================================
-
-@st.cache_data(ttl=60)
-def get_client_info(phone: str):
-    """Получение информации о клиенте"""
-    try:
-        phone_hash = hash_password(normalize_phone(phone))
-        response = supabase.table('bookings').select('client_name, client_email, client_telegram')\
-            .eq('phone_hash', phone_hash)\
-            .order('created_at', desc=True)\
-            .limit(1)\
-            .execute()
-        
-        if response.data:
-            result = response.data[0]
-            return {
-                'name': result['client_name'],
-                'email': result['client_email'],
-                'telegram': result['client_telegram']
-            }
-        return None
-    except Exception as e:
-        st.error(f"❌ Ошибка получения информации о клиенте: {e}")
-        return None
-
-def has_active_booking(phone: str) -> bool:
-    """Проверка наличия активной записи"""
-    try:
-        phone_hash = hash_password(normalize_phone(phone))
-        response = supabase.table('bookings')\
-            .select('id', count='exact')\
-            .eq('phone_hash', phone_hash)\
-            .eq('status', 'confirmed')\
-            .gte('booking_date', datetime.now().date().isoformat())\
-            .execute()
-        
-        return response.count > 0
-    except Exception as e:
-        st.error(f"❌ Ошибка проверки активных записей: {e}")
-        return False
-
-@st.cache_data(ttl=60)
-def get_client_bookings(phone: str):
-    """Получение всех записей клиента"""
-    try:
-        phone_hash = hash_password(normalize_phone(phone))
-        response = supabase.table('bookings')\
-            .select('*')\
-            .eq('phone_hash', phone_hash)\
-            .order('booking_date', desc=True)\
-            .order('booking_time', desc=True)\
-            .execute()
-        
-        return pd.DataFrame(response.data) if response.data else pd.DataFrame()
-    except Exception as e:
-        st.error(f"❌ Ошибка получения записей клиента: {e}")
-        return pd.DataFrame()
+    st.markdown(info_html, unsafe_allow_html=True)
+
+# ============================================================================
+# БИЗНЕС-ЛОГИКА: КЛИЕНТЫ
+# ============================================================================
 
-def get_upcoming_client_booking(phone: str):
-    """Получение ближайшей записи клиента"""
+def load_client_profile(phone: str):
+    """Загрузка профиля клиента одним запросом в session state"""
+    try:
+        profile = ClientProfile.load(db, contacts, phone, hash_password(normalize_phone(phone)),
+                                     CACHE_SETTINGS["CLIENT_PROFILE_HISTORY"])
+    except Exception as e:
+        st.error(f"❌ Ошибка загрузки профиля: {e}")
+        profile = None
+    st.session_state.client_profile = profile
+    return profile
+
+def get_client_profile():
+    """Профиль вошедшего клиента из session state (перечитывается после изменений)"""
+    profile = st.session_state.client_profile
+    if (profile is None or profile.phone != st.session_state.client_phone
+            or profile.is_stale(CACHE_SETTINGS["CLIENT_PROFILE_MAX_AGE_SECONDS"])):
+        profile = load_client_profile(st.session_state.client_phone)
+    return profile
+
+def refresh_client_profile():
+    """Сброс профиля после изменения записей или контактов клиента"""
+    st.session_state.client_profile = None
+
+@request_memo
+def has_active_booking(phone: str) -> bool:
+    """Проверка наличия активной записи"""
     try:
         phone_hash = hash_password(normalize_phone(phone))
-        response = supabase.table('bookings')\
-            .select('*')\
+        response = db.table('bookings')\
+            .select('id', count='exact')\
             .eq('phone_hash', phone_hash)\
             .eq('status', 'confirmed')\
             .gte('booking_date', datetime.now().date().isoformat())\
-            .order('booking_date')\
-            .order('booking_time')\
-            .limit(1)\
             .execute()
         
-        return response.data[0] if response.data else None
+        return response.count > 0
     except Exception as e:
-        st.error(f"❌ Ошибка получения ближайшей записи: {e}")
-        return None
+        st.error(f"❌ Ошибка проверки активных записей: {e}")
+        return False
 
 @st.cache_data(ttl=120)
 def get_all_clients():
     """Получение списка всех уникальных клиентов"""
     try:
-        response = supabase.table('bookings')\
-            .select('client_name, client_phone, client_email, client_telegram, phone_hash')\
-            .execute()
+        clients_df = load_client_summary(db)
         
-        if response.data:
-            df = pd.DataFrame(response.data)
-            clients_df = df.groupby('phone_hash').first().reset_index()
-            
-            clients_data = []
-            for phone_hash in clients_df['phone_hash'].unique():
-                client_row = clients_df[clients_df['phone_hash'] == phone_hash].iloc[0]
-                
-                bookings_response = supabase.table('bookings')\
-                    .select('id, status, booking_date')\
-                    .eq('phone_hash', phone_hash)\
-                    .execute()
-                
-                if bookings_response.data:
-                    bookings_df = pd.DataFrame(bookings_response.data)
-                    total = len(bookings_df)
-                    upcoming = len(bookings_df[bookings_df['status'] == 'confirmed']) if 'status' in bookings_df.columns else 0
-                    completed = len(bookings_df[bookings_df['status'] == 'completed']) if 'status' in bookings_df.columns else 0
-                    cancelled = len(bookings_df[bookings_df['status'] == 'cancelled']) if 'status' in bookings_df.columns else 0
-                    first_booking = bookings_df['booking_date'].min() if 'booking_date' in bookings_df.columns else ''
-                    last_booking = bookings_df['booking_date'].max() if 'booking_date' in bookings_df.columns else ''
-                else:
-                    total = upcoming = completed = cancelled = 0
-                    first_booking = last_booking = ''
-                
-                client_data = {
-                    'phone_hash': phone_hash,
-                    'client_name': client_row['client_name'],
-                    'client_phone': format_phone(client_row['client_phone']),
-                    'client_email': client_row['client_email'],
-                    'client_telegram': client_row['client_telegram'],
-                    'total_bookings': total,
-                    'upcoming_bookings': upcoming,
-                    'completed_bookings': completed,
-                    'cancelled_bookings': cancelled,
-                    'first_booking': first_booking,
-                    'last_booking': last_booking
-                }
-                clients_data.append(client_data)
-            
-            return pd.DataFrame(clients_data)
-        else:
-            return pd.DataFrame()
+        if not clients_df.empty:
+            clients_df['client_phone'] = clients_df['client_phone'].map(format_phone)
+        
+        return clients_df
     except Exception as e:
         st.error(f"❌ Ошибка получения списка клиентов: {e}")
         return pd.DataFrame()
@@ -1484,8 +1266,8 @@ def get_all_clients():
 def get_client_booking_history(phone_hash: str):
     """Получение истории записей конкретного клиента"""
     try:
-        response = supabase.table('bookings')\
-            .select('*')\
+        response = db.table('bookings')\
+            .select(ADMIN_CLIENT_HISTORY.select)\
             .eq('phone_hash', phone_hash)\
             .order('booking_date', desc=True)\
             .order('booking_time', desc=True)\
@@ -1517,67 +1299,65 @@ def is_time_available(selected_date: str, time_slot: str) -> tuple:
     except ValueError:
         return False, "❌ Неверный формат времени"
 
-def get_available_slots(date: str) -> list:
-    """Получение доступных временных слотов"""
+def get_available_slots_range(date_from: str, date_to: str) -> dict:
+    """Получение доступных слотов по датам диапазона (дата -> список слотов)"""
     try:
         settings = get_settings()
         if not settings:
-            return []
-            
-        work_start = datetime.strptime(settings['work_start'], '%H:%M').time()
-        work_end = datetime.strptime(settings['work_end'], '%H:%M').time()
-        session_duration = settings['session_duration']
-        
-        # Проверка блокировки дня
-        blocked_response = supabase.table('blocked_slots')\
-            .select('id')\
-            .eq('block_date', date)\
-            .is_('block_time', None)\
-            .execute()
-        
-        if blocked_response.data:
-            return []
-        
-        # Получаем занятые слоты
-        booked_response = supabase.table('bookings')\
-            .select('booking_time')\
-            .eq('booking_date', date)\
-            .neq('status', 'cancelled')\
-            .execute()
-        
-        booked_slots = [item['booking_time'] for item in booked_response.data] if booked_response.data else []
-        
-        # Получаем заблокированные слоты
-        blocked_slots_response = supabase.table('blocked_slots')\
-            .select('block_time')\
-            .eq('block_date', date)\
-            .not_.is_('block_time', None)\
-            .execute()
+            return {}
         
-        blocked_slots = [item['block_time'] for item in blocked_slots_response.data] if blocked_slots_response.data else []
-        
-        # Генерируем доступные слоты
-        slots = []
-        current_time = datetime.combine(datetime.today(), work_start)
-        end_time = datetime.combine(datetime.today(), work_end)
+        return fetch_availability(
+            db, date_from, date_to, settings,
+            BOOKING_RULES["MIN_ADVANCE_HOURS"],
+            cache=availability_cache,
+            with_duration=bookings_have_duration()
+        )
+    except Exception as e:
+        st.error(f"❌ Ошибка получения доступных слотов: {e}")
+        return {}
+
+def get_available_slots(date: str) -> list:
+    """Получение доступных временных слотов"""
+    return get_available_slots_range(date, date).get(date, [])
+
+def get_next_available_slots(n: int = 5) -> list:
+    """Ближайшие свободные слоты по битовой карте: [(дата, время), ...]"""
+    try:
+        settings = get_settings()
+        today = datetime.now().date()
+        horizon_end = today + timedelta(days=BOOKING_RULES["MAX_DAYS_AHEAD"])
         
-        while current_time < end_time:
-            time_slot = current_time.strftime('%H:%M')
-            
-            time_available, _ = is_time_available(date, time_slot)
-            
-            if (time_slot not in booked_slots and 
-                time_slot not in blocked_slots and 
-                time_available):
-                slots.append(time_slot)
-            
-            current_time += timedelta(minutes=session_duration)
+        if not calendar_index.covers(str(today), str(horizon_end)):
+            states = fetch_day_states(db, str(today), str(horizon_end), bookings_have_duration())
+            calendar_index.load(states, str(today), str(horizon_end))
+        calendar_index.ensure_grid(settings)
         
-        return slots
+        after = datetime.now() + timedelta(hours=BOOKING_RULES["MIN_ADVANCE_HOURS"])
+        return calendar_index.next_available(after, n)
     except Exception as e:
-        st.error(f"❌ Ошибка получения доступных слотов: {e}")
+        st.error(f"❌ Ошибка поиска свободных слотов: {e}")
         return []
 
+def invalidate_availability(*dates):
+    """Сброс кэша доступности для затронутых дат"""
+    availability_cache.invalidate(*dates)
+
+def reload_calendar_day(date: str):
+    """Перечитать день битовой карты из базы (слот занят записью, которой индекс не видел)"""
+    try:
+        states = fetch_day_states(db, date, date, bookings_have_duration())
+        calendar_index.load_day(date, states[date])
+    except Exception as e:
+        print(f"Ошибка обновления календаря на {date}: {e}")
+        calendar_index.invalidate()
+
+def invalidate_booking_caches(*dates):
+    """Сброс кэшей после изменения записей: доступность дат, статистика, память прогона и профиль"""
+    invalidate_availability(*dates)
+    get_stats_snapshot.clear()
+    invalidate_request_memo()
+    refresh_client_profile()
+
 def create_booking(client_name: str, client_phone: str, client_email: str, 
                   client_telegram: str, date: str, time_slot: str, notes: str = "",
                   client_chat_id: str = None) -> tuple:
@@ -1594,7 +1374,7 @@ def create_booking(client_name: str, client_phone: str, client_email: str,
         
         phone_hash = hash_password(normalize_phone(client_phone))
         
-        response = supabase.table('bookings').insert({
+        booking = {
             'client_name': client_name,
             'client_phone': client_phone,
             'client_email': client_email,
@@ -1605,21 +1385,43 @@ def create_booking(client_name: str, client_phone: str, client_email: str,
             'phone_hash': phone_hash,
             'status': 'confirmed',
             'telegram_chat_id': client_chat_id  # 🔥 СОХРАНЯЕМ CHAT_ID
-        }).execute()
+        }
+        if bookings_have_duration():
+            booking['session_duration'] = get_settings()['session_duration']
+        
+        response = db.table('bookings').insert(booking).execute()
+        
+        # chat_id из формы — и в справочник контактов: там может быть старый chat_id или кэшированное "нет"
+        if client_chat_id:
+            try:
+                if contacts.get(phone_hash) != str(client_chat_id):
+                    contacts.connect(phone_hash, client_chat_id)
+            except Exception as e:
+                print(f"❌ Ошибка сохранения chat_id: {e}")
+        
+        invalidate_booking_caches(date)
         
         if response.data:
             booking_data = response.data[0]
             
+            # Календарь и напоминание за 1 час обновляются по событию
+            handled = booking_events.emit(BookingEvent(
+                CREATED, booking_data['id'], date, time_slot,
+                session_duration=booking_data.get('session_duration'), chat_id=client_chat_id
+            ))
+            
             # 🔥 ОТПРАВЛЯЕМ УВЕДОМЛЕНИЯ О НОВОЙ ЗАПИСИ
             notification_results = notifier.notify_booking_created(booking_data, client_chat_id)
             
             # Показываем статус уведомлений
-            if notification_results.get('admin_notified'):
-                st.success("✅ Администратор уведомлен")
-            if notification_results.get('client_notified') and client_chat_id:
-                st.success("✅ Уведомление отправлено в Telegram")
-            if notification_results.get('reminder_scheduled') and client_chat_id:
+            if notification_results.get('admin_queued'):
+                st.success("✅ Администратор будет уведомлен")
+            if notification_results.get('client_queued') and client_chat_id:
+                st.success("✅ Уведомление отправляется в Telegram")
+            if handled.get('reminders'):
                 st.success("✅ Напоминание запланировано за 1 час")
+            elif client_chat_id:
+                st.warning("⚠️ Напоминание за 1 час не запланировано")
             
             return True, "✅ Запись успешно создана"
         else:
@@ -1627,6 +1429,9 @@ def create_booking(client_name: str, client_phone: str, client_email: str,
             
     except Exception as e:
         if "duplicate key" in str(e) or "unique constraint" in str(e):
+            # Слот занят кем-то еще — кэш по этой дате устарел
+            invalidate_availability(date)
+            reload_calendar_day(date)
             return False, "❌ Это время уже занято"
         return False, f"❌ Ошибка: {str(e)}"
 
@@ -1636,7 +1441,7 @@ def create_booking_by_admin(client_name: str, client_phone: str, client_email: s
     try:
         phone_hash = hash_password(normalize_phone(client_phone))
         
-        response = supabase.table('bookings').insert({
+        booking = {
             'client_name': client_name,
             'client_phone': client_phone,
             'client_email': client_email,
@@ -1646,10 +1451,20 @@ def create_booking_by_admin(client_name: str, client_phone: str, client_email: s
             'notes': notes,
             'phone_hash': phone_hash,
             'status': 'confirmed'
-        }).execute()
+        }
+        if bookings_have_duration():
+            booking['session_duration'] = get_settings()['session_duration']
+        
+        response = db.table('bookings').insert(booking).execute()
+        
+        invalidate_booking_caches(date)
         
         if response.data:
             booking_data = response.data[0]
+            booking_events.emit(BookingEvent(
+                CREATED, booking_data['id'], date, time_slot,
+                session_duration=booking_data.get('session_duration')
+            ))
             
             # 🔥 ОТПРАВЛЯЕМ УВЕДОМЛЕНИЯ АДМИНУ
             notifier.notify_booking_created(booking_data)
@@ -1660,6 +1475,9 @@ def create_booking_by_admin(client_name: str, client_phone: str, client_email: s
             
     except Exception as e:
         if "duplicate key" in str(e) or "unique constraint" in str(e):
+            # Слот занят кем-то еще — кэш по этой дате устарел
+            invalidate_availability(date)
+            reload_calendar_day(date)
             return False, "❌ Это время уже занято"
         return False, f"❌ Ошибка: {str(e)}"
 
@@ -1669,8 +1487,8 @@ def cancel_booking(booking_id: int, phone: str, client_chat_id: str = None) -> t
         phone_hash = hash_password(normalize_phone(phone))
         
         # Получаем информацию о записи
-        response = supabase.table('bookings')\
-            .select('*')\
+        response = db.table('bookings')\
+            .select(booking_projection(BOOKING_NOTIFY).select)\
             .eq('id', booking_id)\
             .eq('phone_hash', phone_hash)\
             .execute()
@@ -1688,20 +1506,26 @@ def cancel_booking(booking_id: int, phone: str, client_chat_id: str = None) -> t
             return False, f"Отмена возможна не позднее чем за {BOOKING_RULES['MIN_CANCEL_MINUTES']} минут"
         
         # Отменяем запись
-        supabase.table('bookings')\
+        db.table('bookings')\
             .update({'status': 'cancelled'})\
             .eq('id', booking_id)\
             .execute()
         
+        invalidate_booking_caches(booking['booking_date'])
+        booking_events.emit(BookingEvent(
+            CANCELLED, booking_id, booking['booking_date'], booking['booking_time'],
+            session_duration=booking.get('session_duration')
+        ))
+        
         # 🔥 ОТПРАВЛЯЕМ УВЕДОМЛЕНИЯ ОБ ОТМЕНЕ
         updated_booking = {**booking, 'status': 'cancelled'}
         notification_results = notifier.notify_booking_cancelled(updated_booking, client_chat_id)
         
         # Показываем статус уведомлений
-        if notification_results.get('admin_notified'):
-            st.success("✅ Администратор уведомлен об отмене")
-        if notification_results.get('client_notified') and client_chat_id:
-            st.success("✅ Клиент уведомлен об отмене")
+        if notification_results.get('admin_queued'):
+            st.success("✅ Администратор будет уведомлен об отмене")
+        if notification_results.get('client_queued') and client_chat_id:
+            st.success("✅ Уведомление об отмене отправляется клиенту")
         
         return True, "Запись успешно отменена"
         
@@ -1711,16 +1535,23 @@ def cancel_booking(booking_id: int, phone: str, client_chat_id: str = None) -> t
 def delete_booking(booking_id: int):
     """Удаление записи (для админа)"""
     try:
-        supabase.table('bookings').delete().eq('id', booking_id).execute()
+        response = db.table('bookings').delete().eq('id', booking_id).execute()
+        invalidate_booking_caches(*[row['booking_date'] for row in response.data or []])
+        for row in response.data or []:
+            booking_events.emit(BookingEvent(
+                DELETED, booking_id, row['booking_date'], row['booking_time'],
+                session_duration=row.get('session_duration'),
+                was_active=row.get('status') != 'cancelled'
+            ))
         return True
     except Exception as e:
         st.error(f"❌ Ошибка удаления записи: {e}")
         return False
 
-def get_all_bookings(date_from: str = None, date_to: str = None):
-    """Получение всех записей"""
+def get_all_bookings(date_from: str = None, date_to: str = None, projection: Projection = ADMIN_BOOKING_CARD):
+    """Получение всех записей (только колонки проекции)"""
     try:
-        query = supabase.table('bookings').select('*')
+        query = db.table('bookings').select(booking_projection(projection).select)
         
         if date_from and date_to:
             query = query.gte('booking_date', date_from).lte('booking_date', date_to)
@@ -1735,6 +1566,37 @@ def get_all_bookings(date_from: str = None, date_to: str = None):
         st.error(f"❌ Ошибка получения записей: {e}")
         return pd.DataFrame()
 
+BOOKINGS_PAGE_ORDER = ['booking_date', 'booking_time', 'id']
+
+def get_bookings_page(date_from: str = None, date_to: str = None, after: list = None,
+                      page_size: int = 25, with_count: bool = False):
+    """Страница записей по ключу (booking_date, booking_time, id)"""
+    try:
+        query = db.table('bookings').select(booking_projection(ADMIN_BOOKING_CARD).select, count='exact' if with_count else None)
+        
+        if date_from:
+            query = query.gte('booking_date', date_from)
+        if date_to:
+            query = query.lte('booking_date', date_to)
+        if after:
+            query = keyset_after(query, BOOKINGS_PAGE_ORDER, after)
+        
+        for column in BOOKINGS_PAGE_ORDER:
+            query = query.order(column)
+        
+        # Берем на одну строку больше, чтобы понять, есть ли следующая страница
+        response = query.limit(page_size + 1).execute()
+        rows = response.data or []
+        
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        next_cursor = [rows[-1][column] for column in BOOKINGS_PAGE_ORDER] if has_next else None
+        
+        return pd.DataFrame(rows), next_cursor, response.count
+    except Exception as e:
+        st.error(f"❌ Ошибка получения записей: {e}")
+        return pd.DataFrame(), None, 0
+
 # ============================================================================
 # БИЗНЕС-ЛОГИКА: УПРАВЛЕНИЕ ЗАПИСЯМИ (админ)
 # ============================================================================
@@ -1742,24 +1604,42 @@ def get_all_bookings(date_from: str = None, date_to: str = None):
 def update_booking_datetime(booking_id: int, new_date: str, new_time: str):
     """Обновление даты и времени записи"""
     try:
-        response = supabase.table('bookings').update({
+        old_response = db.table('bookings')\
+            .select(booking_projection(RESCHEDULE_CHECK).select)\
+            .eq('id', booking_id)\
+            .execute()
+        
+        response = db.table('bookings').update({
             'booking_date': new_date,
             'booking_time': new_time
         }).eq('id', booking_id).execute()
         
+        invalidate_booking_caches(new_date, *[row['booking_date'] for row in old_response.data or []])
+        
         if response.data:
+            # Слот в календаре и напоминание переезжают вместе с записью
+            for row in old_response.data or []:
+                booking_events.emit(BookingEvent(
+                    RESCHEDULED, booking_id, new_date, new_time,
+                    session_duration=row.get('session_duration'),
+                    old_date=row['booking_date'], old_time=row['booking_time'],
+                    was_active=row.get('status') != 'cancelled'
+                ))
             return True, "✅ Время записи обновлено"
         else:
             return False, "❌ Ошибка обновления времени"
     except Exception as e:
         if "duplicate key" in str(e) or "unique constraint" in str(e):
+            # Слот занят кем-то еще — кэш по этой дате устарел
+            invalidate_availability(new_date)
+            reload_calendar_day(new_date)
             return False, "❌ Это время уже занято"
         return False, f"❌ Ошибка: {str(e)}"
 
 def update_booking_notes(booking_id: int, new_notes: str):
     """Обновление комментария к записи"""
     try:
-        supabase.table('bookings').update({'notes': new_notes}).eq('id', booking_id).execute()
+        db.table('bookings').update({'notes': new_notes}).eq('id', booking_id).execute()
         return True, "✅ Комментарий обновлен"
     except Exception as e:
         return False, f"❌ Ошибка: {str(e)}"
@@ -1768,8 +1648,8 @@ def update_booking_status(booking_id: int, new_status: str):
     """Обновление статуса записи"""
     try:
         # Получаем текущие данные
-        response = supabase.table('bookings')\
-            .select('*')\
+        response = db.table('bookings')\
+            .select(booking_projection(BOOKING_NOTIFY).select)\
             .eq('id', booking_id)\
             .execute()
         
@@ -1779,7 +1659,22 @@ def update_booking_status(booking_id: int, new_status: str):
         old_booking = response.data[0]
         
         # Обновляем статус
-        supabase.table('bookings').update({'status': new_status}).eq('id', booking_id).execute()
+        db.table('bookings').update({'status': new_status}).eq('id', booking_id).execute()
+        invalidate_booking_caches(old_booking['booking_date'])
+        
+        # Отмена освобождает слот и снимает напоминание, восстановление — возвращает
+        kinds = []
+        if old_booking['status'] != 'cancelled' and new_status == 'cancelled':
+            kinds.append(CANCELLED)
+        elif old_booking['status'] == 'cancelled' and new_status != 'cancelled':
+            kinds.append(RESTORED)
+        if new_status == 'completed':
+            kinds.append(COMPLETED)
+        for kind in kinds:
+            booking_events.emit(BookingEvent(
+                kind, booking_id, old_booking['booking_date'], old_booking['booking_time'],
+                session_duration=old_booking.get('session_duration')
+            ))
         
         # 🔥 ОТПРАВЛЯЕМ УВЕДОМЛЕНИЯ
         updated_booking = {**old_booking, 'status': new_status}
@@ -1800,11 +1695,13 @@ def update_booking_status(booking_id: int, new_status: str):
 def block_date(date: str, reason: str = "Выходной") -> bool:
     """Блокировка дня"""
     try:
-        response = supabase.table('blocked_slots').insert({
+        response = db.table('blocked_slots').insert({
             'block_date': date,
             'reason': reason
         }).execute()
         
+        invalidate_availability(date)
+        calendar_index.set_day_blocked(date, True)
         return bool(response.data)
     except Exception as e:
         if "duplicate key" in str(e) or "unique constraint" in str(e):
@@ -1815,18 +1712,21 @@ def block_date(date: str, reason: str = "Выходной") -> bool:
 def unblock_date(date: str):
     """Разблокировка дня"""
     try:
-        supabase.table('blocked_slots')\
+        db.table('blocked_slots')\
             .delete()\
             .eq('block_date', date)\
             .is_('block_time', None)\
             .execute()
+        
+        invalidate_availability(date)
+        calendar_index.set_day_blocked(date, False)
     except Exception as e:
         st.error(f"❌ Ошибка разблокировки дня: {e}")
 
 def get_blocked_dates():
     """Получение заблокированных дат"""
     try:
-        response = supabase.table('blocked_slots')\
+        response = db.table('blocked_slots')\
             .select('block_date, reason')\
             .is_('block_time', None)\
             .order('block_date')\
@@ -1840,15 +1740,21 @@ def get_blocked_dates():
 def block_time_slot(date: str, time_slot: str, reason: str = "Технические работы") -> bool:
     """Блокировка временного слота"""
     try:
-        response = supabase.table('blocked_slots').insert({
+        response = db.table('blocked_slots').insert({
             'block_date': date,
             'block_time': time_slot,
             'reason': reason
         }).execute()
         
+        invalidate_availability(date)
+        if response.data:
+            calendar_index.add(date, time_slot)
         return bool(response.data)
     except Exception as e:
         if "duplicate key" in str(e) or "unique constraint" in str(e):
+            # Слот уже заблокирован — день в календаре перечитывается из базы
+            invalidate_availability(date)
+            reload_calendar_day(date)
             return False
         st.error(f"❌ Ошибка блокировки времени: {e}")
         return False
@@ -1856,14 +1762,17 @@ def block_time_slot(date: str, time_slot: str, reason: str = "Техническ
 def unblock_time_slot(block_id: int):
     """Разблокировка временного слота"""
     try:
-        supabase.table('blocked_slots').delete().eq('id', block_id).execute()
+        response = db.table('blocked_slots').delete().eq('id', block_id).execute()
+        invalidate_availability(*[row['block_date'] for row in response.data or []])
+        for row in response.data or []:
+            calendar_index.remove(row['block_date'], row['block_time'])
     except Exception as e:
         st.error(f"❌ Ошибка разблокировки времени: {e}")
 
 def get_blocked_slots():
     """Получение заблокированных слотов"""
     try:
-        response = supabase.table('blocked_slots')\
+        response = db.table('blocked_slots')\
             .select('*')\
             .not_.is_('block_time', None)\
             .order('block_date')\
@@ -1879,46 +1788,25 @@ def get_blocked_slots():
 # СТАТИСТИКА И АНАЛИТИКА
 # ============================================================================
 
-@st.cache_data(ttl=60)
-def get_stats():
-    """Получение основной статистики"""
+@st.cache_data(ttl=CACHE_SETTINGS["STATS_TTL_SECONDS"])
+def get_stats_snapshot() -> dict:
+    """Снимок статистики одним запросом (сбрасывается при изменении записей).
+    Ошибки не перехватываются: исключение st.cache_data не кэширует"""
+    return load_stats(db)
+
+@request_memo
+def get_stats_data() -> dict:
+    """Снимок статистики; при ошибке — сообщение и нули только на этот прогон"""
     try:
-        # Общее количество записей
-        total_response = supabase.table('bookings').select('id', count='exact').execute()
-        total = total_response.count or 0
-        
-        # Предстоящие записи
-        upcoming_response = supabase.table('bookings')\
-            .select('id', count='exact')\
-            .eq('status', 'confirmed')\
-            .gte('booking_date', datetime.now().date().isoformat())\
-            .execute()
-        upcoming = upcoming_response.count or 0
-        
-        # Записи за текущий месяц
-        current_date = datetime.now()
-        month_start = current_date.replace(day=1).date().isoformat()
-        month_end = get_month_end(current_date.year, current_date.month)
-        
-        monthly_response = supabase.table('bookings')\
-            .select('id', count='exact')\
-            .gte('booking_date', month_start)\
-            .lte('booking_date', month_end)\
-            .execute()
-        this_month = monthly_response.count or 0
-        
-        # Записи за последние 7 дней
-        week_ago = (datetime.now() - timedelta(days=7)).date().isoformat()
-        weekly_response = supabase.table('bookings')\
-            .select('id', count='exact')\
-            .gte('booking_date', week_ago)\
-            .execute()
-        this_week = weekly_response.count or 0
-        
-        return total, upcoming, this_month, this_week
+        return get_stats_snapshot()
     except Exception as e:
         st.error(f"❌ Ошибка получения статистики: {e}")
-        return 0, 0, 0, 0
+        return compute_stats([])
+
+def get_stats():
+    """Получение основной статистики"""
+    stats = get_stats_data()
+    return stats['total'], stats['upcoming'], stats['this_month'], stats['this_week']
 
 # ============================================================================
 # АВТОРИЗАЦИЯ
@@ -1931,18 +1819,13 @@ def check_admin_password(password: str) -> bool:
 def client_login(phone: str) -> bool:
     """Авторизация клиента"""
     try:
-        phone_hash = hash_password(normalize_phone(phone))
-        response = supabase.table('bookings')\
-            .select('client_name')\
-            .eq('phone_hash', phone_hash)\
-            .order('created_at', desc=True)\
-            .limit(1)\
-            .execute()
+        # Профиль со всеми данными кабинета — одним запросом
+        profile = load_client_profile(phone)
         
-        if response.data:
+        if profile:
             st.session_state.client_logged_in = True
             st.session_state.client_phone = phone
-            st.session_state.client_name = response.data[0]['client_name']
+            st.session_state.client_name = profile.name
             return True
         return False
     except Exception as e:
@@ -1954,6 +1837,7 @@ def client_logout():
     st.session_state.client_logged_in = False
     st.session_state.client_phone = ""
     st.session_state.client_name = ""
+    st.session_state.client_profile = None
     st.session_state.current_tab = "Запись"
 
 def admin_login():
@@ -1969,8 +1853,8 @@ def admin_logout():
 # UI КОМПОНЕНТЫ
 # ============================================================================
 
-def render_booking_card(row, date, show_actions=True):
-    """Отрисовка карточки записи"""
+def render_booking_card(row, date, show_actions=True, deliveries: dict = None):
+    """Отрисовка карточки записи (deliveries — статусы уведомлений по видам)"""
     status_info = STATUS_DISPLAY.get(row['status'], STATUS_DISPLAY['confirmed'])
     
     unique_key = f"delete_{date}_{row['booking_time']}_{row['id']}"
@@ -1993,13 +1877,19 @@ def render_booking_card(row, date, show_actions=True):
             
             st.markdown(f"**Статус:** <span style='color: {status_info['color']};'>{status_info['text']}</span>", 
                        unsafe_allow_html=True)
+            
+            if deliveries:
+                st.caption("📨 Telegram: " + ", ".join(
+                    f"{DELIVERY_DISPLAY.get(kind, kind)} {DELIVERY_STATUS_EMOJI[info['status']]}"
+                    for kind, info in deliveries.items()
+                ))
         
         if show_actions and col2:
             with col2:
                 if st.button("🗑️ Удалить", key=unique_key, use_container_width=True):
                     delete_booking(row['id'])
                     st.success("✅ Удалено!")
-                    st.rerun()
+                    rerun_fragment()
         
         st.markdown("---")
 
@@ -2018,10 +1908,288 @@ def render_time_slots(available_slots, key_prefix="slot"):
             if st.button(f"🕐 {time_slot}", key=f"{key_prefix}_{time_slot}", 
                         use_container_width=True, type="primary"):
                 st.session_state.selected_time = time_slot
-                st.rerun()
+                rerun_fragment()
     
     return st.session_state.get('selected_time')
 
+def render_nearest_slots(date_key: str, key_prefix: str, n: int = 5):
+    """Ближайшие свободные слоты с выбором в один клик"""
+    nearest = get_next_available_slots(n)
+    
+    if not nearest:
+        st.caption("🔴 Свободных слотов в ближайшие дни нет")
+        return
+    
+    st.caption("⚡ Ближайшие свободные слоты:")
+    cols = st.columns(len(nearest))
+    for col, (date, time_slot) in zip(cols, nearest):
+        with col:
+            if st.button(f"{format_date(date, '%d.%m')} {time_slot}", key=f"{key_prefix}_{date}_{time_slot}",
+                         use_container_width=True):
+                st.session_state[date_key] = datetime.strptime(date, '%Y-%m-%d').date()
+                st.session_state.selected_time = time_slot
+                rerun_fragment()
+
+def init_date_state(date_key: str, min_date, max_date):
+    """Значение выбора даты в session state в пределах горизонта записи"""
+    current = st.session_state.get(date_key)
+    if current is None or current < min_date or current > max_date:
+        st.session_state[date_key] = min_date
+
+# ============================================================================
+# ФРАГМЕНТЫ СТРАНИЦЫ (ПЕРЕРИСОВЫВАЮТСЯ БЕЗ ВСЕГО СКРИПТА)
+# ============================================================================
+
+def page_fragment(func):
+    """st.fragment со своей памятью чтений: клик внутри перерисовывает и запрашивает только этот блок"""
+    @st.fragment
+    @functools.wraps(func)
+    def fragment(*args, **kwargs):
+        with child_request() as scope:
+            result = func(*args, **kwargs)
+        if CACHE_SETTINGS["DEBUG_QUERIES"]:
+            st.caption(f"🛠️ Фрагмент {func.__name__}: {scope.queries} запросов · {scope.elapsed * 1000:.0f} мс")
+        return result
+    return fragment
+
+def rerun_fragment():
+    """Перерисовка только текущего фрагмента (в полном прогоне — всего скрипта)"""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+@page_fragment
+def render_guest_booking():
+    """Новая запись без входа: дата, слоты и форма данных"""
+    st.markdown("#### 📅 Новая запись")
+    
+    # Выбор даты
+    min_date = datetime.now().date()
+    max_date = min_date + timedelta(days=BOOKING_RULES["MAX_DAYS_AHEAD"])
+    
+    # Свободные слоты на весь горизонт записи одним пакетом
+    availability = get_available_slots_range(str(min_date), str(max_date))
+    render_nearest_slots("guest_booking_date", "guest_nearest")
+    
+    init_date_state("guest_booking_date", min_date, max_date)
+    selected_date = st.date_input("Дата консультации", min_value=min_date, 
+                                  max_value=max_date, format="DD.MM.YYYY",
+                                  key="guest_booking_date")
+    
+    # Получаем слоты
+    available_slots = availability.get(str(selected_date), [])
+    selected_time = render_time_slots(available_slots, "guest_slot")
+    
+    if selected_time:
+        st.success(f"✅ Выбрано: **{selected_date.strftime('%d.%m.%Y')}** в **{selected_time}**")
+        
+        st.markdown("#### 👤 Ваши данные")
+        with st.form("booking_form"):
+            col_a, col_b = st.columns(2)
+            with col_a:
+                client_name = st.text_input("👤 Имя *", placeholder="Иван Иванов")
+                client_email = st.text_input("📧 Email", placeholder="example@mail.com")
+                # 🔥 НОВОЕ ПОЛЕ
+                client_chat_id = st.text_input("💬 ID Telegram для уведомлений", 
+                                             placeholder="123456789 (опционально)",
+                                             help="Чтобы получать уведомления о записи и напоминания")
+            with col_b:
+                client_phone = st.text_input("📱 Телефон *", placeholder="+7 (999) 123-45-67")
+                client_telegram = st.text_input("💬 Telegram username", placeholder="@username")
+            
+            notes = st.text_area("💭 Комментарий (необязательно)", height=80)
+            submit = st.form_submit_button("✅ Подтвердить запись", use_container_width=True)
+            
+            if submit:
+                if not client_name or not client_phone:
+                    st.error("❌ Заполните имя и телефон")
+                elif has_active_booking(client_phone):
+                    st.error("❌ У вас уже есть активная запись")
+                else:
+                    success, message = create_booking(
+                        client_name, client_phone, client_email, 
+                        client_telegram, str(selected_date), selected_time, notes,
+                        client_chat_id  # 🔥 ПЕРЕДАЕМ CHAT_ID
+                    )
+                    if success:
+                        st.balloons()
+                        # Автологин
+                        st.session_state.client_logged_in = True
+                        st.session_state.client_phone = client_phone
+                        st.session_state.client_name = client_name
+                        st.session_state.current_tab = "👁️ Текущая запись"
+                        
+                        st.markdown(f"""
+                        <div class="success-message">
+                            <h3>🌿 Запись подтверждена!</h3>
+                            <p><strong>📅 Дата:</strong> {selected_date.strftime('%d.%m.%Y')}</p>
+                            <p><strong>🕐 Время:</strong> {selected_time}</p>
+                            <p><strong>🎉 Вы автоматически авторизованы!</strong></p>
+                            <p><strong>🔔 Уведомления отправлены!</strong></p>
+                        </div>
+                        """, unsafe_allow_html=True)
+                        st.rerun()
+                    else:
+                        st.error(message)
+
+@page_fragment
+def render_client_booking():
+    """Новая запись из личного кабинета: дата, слоты и тема"""
+    client_profile = get_client_profile()
+    client_info = client_profile.info
+    
+    min_date = datetime.now().date()
+    max_date = min_date + timedelta(days=BOOKING_RULES["MAX_DAYS_AHEAD"])
+    
+    availability = get_available_slots_range(str(min_date), str(max_date))
+    render_nearest_slots("client_booking_date", "client_nearest")
+    
+    init_date_state("client_booking_date", min_date, max_date)
+    selected_date = st.date_input("Дата", min_value=min_date,
+                                max_value=max_date,
+                                format="DD.MM.YYYY",
+                                key="client_booking_date")
+    
+    available_slots = availability.get(str(selected_date), [])
+    selected_time = render_time_slots(available_slots, "client_slot")
+    
+    if selected_time:
+        st.success(f"✅ {selected_date.strftime('%d.%m.%Y')} в {selected_time}")
+        
+        with st.form("quick_booking"):
+            notes = st.text_area("💭 Тема консультации", height=80)
+            submit = st.form_submit_button("✅ Записаться", use_container_width=True)
+            
+            if submit:
+                success, message = create_booking(
+                    client_info['name'],
+                    st.session_state.client_phone,
+                    client_info['email'],
+                    client_info['telegram'],
+                    str(selected_date), selected_time, notes,
+                    client_profile.chat_id  # 🔥 ПЕРЕДАЕМ CHAT_ID
+                )
+                if success:
+                    st.balloons()
+                    st.success("🎉 Запись создана!")
+                    st.rerun()
+                else:
+                    st.error(message)
+
+@page_fragment
+def render_bookings_admin():
+    """Список записей админки с фильтром и постраничным выводом"""
+    st.markdown("### 📋 Управление записями")
+    
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        date_filter = st.selectbox(
+            "📅 Период отображения",
+            ["Все даты", "Сегодня", "На неделю", "На месяц"]
+        )
+    with col2:
+        page_size = st.selectbox("📄 На странице", [10, 25, 50, 100], index=1)
+    with col3:
+        if st.button("🔄 Обновить данные", use_container_width=True):
+            st.session_state.bookings_page_cursors = [None]
+            rerun_fragment()
+    
+    today = datetime.now().date()
+    
+    if date_filter == "Сегодня":
+        date_from = str(today)
+        date_to = str(today)
+    elif date_filter == "На неделю":
+        date_from = str(today)
+        date_to = str(today + timedelta(days=7))
+    elif date_filter == "На месяц":
+        date_from = str(today)
+        date_to = str(today + timedelta(days=30))
+    else:
+        date_from = None
+        date_to = None
+    
+    # Курсоры страниц храним в сессии; при смене фильтра начинаем сначала
+    page_filter = (date_filter, page_size)
+    if st.session_state.get('bookings_page_filter') != page_filter:
+        st.session_state.bookings_page_filter = page_filter
+        st.session_state.bookings_page_cursors = [None]
+    
+    cursors = st.session_state.bookings_page_cursors
+    page_number = len(cursors)
+    
+    df, next_cursor, total_count = get_bookings_page(
+        date_from, date_to, after=cursors[-1], page_size=page_size,
+        with_count=page_number == 1
+    )
+    if total_count is not None:
+        st.session_state.bookings_total_count = total_count
+    
+    if not df.empty:
+        st.info(f"📊 Найдено записей: {st.session_state.get('bookings_total_count', len(df))} · страница {page_number}")
+        
+        df['formatted_date'] = pd.to_datetime(df['booking_date']).dt.strftime('%d.%m.%Y')
+        deliveries = notifier.delivery_statuses([int(booking_id) for booking_id in df['id']])
+        
+        # Страница уже отсортирована по (дата, время, id) — группировка одним проходом
+        for date, date_bookings in df.groupby('formatted_date', sort=False):
+            st.markdown(f"#### 📅 {date}")
+            
+            for idx, row in date_bookings.iterrows():
+                render_booking_card(row, date, deliveries=deliveries.get(row['id']))
+            
+            st.markdown("---")
+        
+        col_prev, col_next = st.columns(2)
+        with col_prev:
+            if page_number > 1 and st.button("⬅️ Назад", use_container_width=True):
+                cursors.pop()
+                rerun_fragment()
+        with col_next:
+            if next_cursor and st.button("Далее ➡️", use_container_width=True):
+                cursors.append(next_cursor)
+                rerun_fragment()
+    else:
+        st.info("📭 Нет записей для отображения")
+        if page_number > 1 and st.button("⬅️ К первой странице", use_container_width=True):
+            st.session_state.bookings_page_cursors = [None]
+            rerun_fragment()
+
+@page_fragment
+def render_blocked_dates():
+    """Список заблокированных дней"""
+    blocked_dates = get_blocked_dates()
+    if blocked_dates:
+        for block in blocked_dates:
+            col_a, col_b = st.columns([3, 1])
+            with col_a:
+                st.info(f"**{format_date(block['block_date'])}** - {block['reason']}")
+            with col_b:
+                if st.button("🗑️", key=f"unblock_{block['block_date']}", use_container_width=True):
+                    unblock_date(block['block_date'])
+                    st.success("✅ Разблокирован!")
+                    rerun_fragment()
+    else:
+        st.info("📭 Нет блокировок")
+
+@page_fragment
+def render_blocked_slots():
+    """Список заблокированных слотов"""
+    blocked_slots_df = get_blocked_slots()
+    if not blocked_slots_df.empty:
+        for idx, row in blocked_slots_df.iterrows():
+            col_a, col_b = st.columns([3, 1])
+            with col_a:
+                st.warning(f"**{format_date(row['block_date'])} {row['block_time']}** - {row['reason']}")
+            with col_b:
+                if st.button("🗑️", key=f"unblock_slot_{row['id']}", use_container_width=True):
+                    unblock_time_slot(row['id'])
+                    st.success("✅ Разблокирован!")
+                    rerun_fragment()
+    else:
+        st.info("📭 Нет заблокированных слотов")
+
 # ============================================================================
 # БОКОВАЯ ПАНЕЛЬ
 # ============================================================================
@@ -2043,8 +2211,8 @@ with st.sidebar:
         st.session_state.current_tab = tabs
         
         # Показываем статус Telegram
-        telegram_connected = get_client_telegram_chat_id(st.session_state.client_phone)
-        if telegram_connected:
+        client_profile = get_client_profile()
+        if client_profile and client_profile.chat_id:
             st.success("🔔 Уведомления подключены")
         else:
             st.warning("🔕 Нет уведомлений")
@@ -2106,12 +2274,14 @@ with st.sidebar:
                 st.rerun()
 
 # ============================================================================
-# ПРОВЕРКА ПОДКЛЮЧЕНИЯ К SUPABASE
+# ПРОВЕРКА ПОДКЛЮЧЕНИЯ К ХРАНИЛИЩУ
 # ============================================================================
 
-if supabase is None:
+if db is None:
+    for service, reason in init_service_errors().items():
+        st.error(f"❌ {service} {reason}")
     st.error("""
-    ❌ Не удалось подключиться к Supabase. Пожалуйста, проверьте:
+    ❌ Не удалось подключиться к хранилищу. Пожалуйста, проверьте:
     
     1. **Переменные окружения** SUPABASE_URL и SUPABASE_KEY
     2. **Настройки проекта** в панели управления Supabase
@@ -2122,6 +2292,12 @@ if supabase is None:
     SUPABASE_URL=your_project_url
     SUPABASE_KEY=your_anon_key
     ```
+    
+    Или работайте с локальной базой SQLite без сети:
+    ```
+    STORAGE_BACKEND=sqlite
+    SQLITE_PATH=bookings.db
+    ```
     """)
     st.stop()
 
@@ -2132,67 +2308,19 @@ if supabase is None:
 if st.session_state.admin_logged_in:
     st.title("👩‍💼 Панель управления")
     
-    tabs = st.tabs(["📋 Записи", "👥 Клиенты", "⚙️ Настройки", "🚫 Блокировки", "📊 Аналитика", "🔔 Уведомления"])
+    for service, reason in init_service_errors().items():
+        st.error(f"❌ {service} {reason}")
+    
+    # Раздел хранится в session state; загрузчики данных выполняются только у выбранного
+    admin_tab = st.radio("Раздел", ADMIN_TABS, key="admin_tab", horizontal=True,
+                         label_visibility="collapsed")
     
     # Вкладка Записи
-    with tabs[0]:
-        st.markdown("### 📋 Управление записями")
-        
-        col1, col2 = st.columns([2, 1])
-        with col1:
-            date_filter = st.selectbox(
-                "📅 Период отображения",
-                ["Все даты", "Сегодня", "На неделю", "На месяц"]
-            )
-        with col2:
-            if st.button("🔄 Обновить данные", use_container_width=True):
-                st.rerun()
-        
-        today = datetime.now().date()
-        
-        if date_filter == "Сегодня":
-            date_from = str(today)
-            date_to = str(today)
-        elif date_filter == "На неделю":
-            date_from = str(today)
-            date_to = str(today + timedelta(days=7))
-        elif date_filter == "На месяц":
-            date_from = str(today)
-            date_to = str(today + timedelta(days=30))
-        else:
-            date_from = None
-            date_to = None
-        
-        df = get_all_bookings(date_from, date_to)
-        
-        if not df.empty:
-            if date_from and date_to:
-                df = df[(df['booking_date'] >= date_from) & (df['booking_date'] <= date_to)]
-            elif date_from:
-                df = df[df['booking_date'] >= date_from]
-            
-            df = df.sort_values(['booking_date', 'booking_time'], ascending=[True, True])
-            
-            st.info(f"📊 Найдено записей: {len(df)}")
-            
-            if not df.empty:
-                df['booking_date'] = pd.to_datetime(df['booking_date']).dt.strftime('%d.%m.%Y')
-                
-                for date in sorted(df['booking_date'].unique()):
-                    st.markdown(f"#### 📅 {date}")
-                    date_bookings = df[df['booking_date'] == date]
-                    
-                    for idx, row in date_bookings.iterrows():
-                        render_booking_card(row, date)
-                    
-                    st.markdown("---")
-            else:
-                st.info("📭 Нет записей для отображения по выбранным фильтрам")
-        else:
-            st.info("📭 Нет записей для отображения")
+    if admin_tab == ADMIN_TABS[0]:
+        render_bookings_admin()
     
     # Вкладка Клиенты
-    with tabs[1]:
+    elif admin_tab == ADMIN_TABS[1]:
         st.markdown("### 👥 База клиентов")
         
         # Поиск и фильтры
@@ -2340,6 +2468,13 @@ if st.session_state.admin_logged_in:
                             history_df['formatted_date'] = history_df['booking_date'].dt.strftime('%d.%m.%Y')
                             history_df['created_at'] = pd.to_datetime(history_df['created_at']).dt.strftime('%d.%m.%Y %H:%M')
                             
+                            # Свободные слоты для переноса — один пакет на всю историю
+                            reschedule_from = datetime.now().date()
+                            reschedule_availability = get_available_slots_range(
+                                str(reschedule_from),
+                                str(reschedule_from + timedelta(days=BOOKING_RULES["MAX_DAYS_AHEAD"]))
+                            )
+                            
                             # Отображаем историю с возможностью редактирования
                             for _, booking in history_df.iterrows():
                                 status_info = STATUS_DISPLAY.get(booking['status'], STATUS_DISPLAY['confirmed'])
@@ -2364,6 +2499,11 @@ if st.session_state.admin_logged_in:
                                                                    value=booking['booking_date'].date(),
                                                                    min_value=datetime.now().date(),
                                                                    key=f"date_{booking['id']}")
+                                            free_slots = reschedule_availability.get(str(new_date), [])
+                                            if free_slots:
+                                                st.caption(f"🟢 Свободно: {', '.join(free_slots)}")
+                                            elif str(new_date) in reschedule_availability:
+                                                st.caption("🔴 На эту дату свободных слотов нет")
                                             new_time = st.time_input("Новое время", 
                                                                    value=datetime.strptime(booking['booking_time'], "%H:%M").time(),
                                                                    key=f"time_{booking['id']}")
@@ -2438,7 +2578,7 @@ if st.session_state.admin_logged_in:
             st.info("📭 В базе нет клиентов")
     
     # Вкладка Настройки
-    with tabs[2]:
+    elif admin_tab == ADMIN_TABS[2]:
         st.markdown("### ⚙️ Настройки системы")
         
         settings_tabs = st.tabs(["📅 Расписание", "ℹ️ Информационная панель"])
@@ -2544,7 +2684,7 @@ if st.session_state.admin_logged_in:
                         """, unsafe_allow_html=True)
     
     # Вкладка Блокировки
-    with tabs[3]:
+    elif admin_tab == ADMIN_TABS[3]:
         st.markdown("### 🚫 Управление блокировками")
         
         col1, col2 = st.columns(2)
@@ -2554,11 +2694,17 @@ if st.session_state.admin_logged_in:
             with st.form("block_day_form"):
                 block_date_input = st.date_input("Дата", min_value=datetime.now().date())
                 block_reason = st.text_input("Причина", value="Выходной")
+                notify_clients = st.checkbox("📢 Уведомить клиентов с записями на этот день", value=True)
                 submit_block = st.form_submit_button("🚫 Заблокировать", use_container_width=True)
                 
                 if submit_block:
                     if block_date(str(block_date_input), block_reason):
                         st.success(f"✅ День заблокирован!")
+                        if notify_clients:
+                            recipients = get_broadcast_recipients(str(block_date_input))
+                            if recipients:
+                                broadcast_to_clients(recipients, TEMPLATES.get('day_blocked'),
+                                                     {'reason': block_reason})
                         st.rerun()
                     else:
                         st.error("❌ День уже заблокирован")
@@ -2579,48 +2725,30 @@ if st.session_state.admin_logged_in:
         
         with col2:
             st.markdown("#### 📋 Заблокированные дни")
-            blocked_dates = get_blocked_dates()
-            if blocked_dates:
-                for block in blocked_dates:
-                    col_a, col_b = st.columns([3, 1])
-                    with col_a:
-                        st.info(f"**{format_date(block['block_date'])}** - {block['reason']}")
-                    with col_b:
-                        if st.button("🗑️", key=f"unblock_{block['block_date']}", use_container_width=True):
-                            unblock_date(block['block_date'])
-                            st.success("✅ Разблокирован!")
-                            st.rerun()
-            else:
-                st.info("📭 Нет блокировок")
+            render_blocked_dates()
             
             st.markdown("#### 🕐 Заблокированные слоты")
-            blocked_slots_df = get_blocked_slots()
-            if not blocked_slots_df.empty:
-                for idx, row in blocked_slots_df.iterrows():
-                    col_a, col_b = st.columns([3, 1])
-                    with col_a:
-                        st.warning(f"**{format_date(row['block_date'])} {row['block_time']}** - {row['reason']}")
-                    with col_b:
-                        if st.button("🗑️", key=f"unblock_slot_{row['id']}", use_container_width=True):
-                            unblock_time_slot(row['id'])
-                            st.success("✅ Разблокирован!")
-                            st.rerun()
-            else:
-                st.info("📭 Нет заблокированных слотов")
+            render_blocked_slots()
     
     # Вкладка Аналитика
-    with tabs[4]:
+    elif admin_tab == ADMIN_TABS[4]:
         st.markdown("### 📊 Аналитика")
         
-        total, upcoming, this_month, this_week = get_stats()
+        stats = get_stats_data()
         col1, col2, col3, col4 = st.columns(4)
-        col1.metric("📊 Всего", total)
-        col2.metric("⏰ Предстоящих", upcoming)
-        col3.metric("📅 За месяц", this_month)
-        col4.metric("📆 За неделю", this_week)
+        col1.metric("📊 Всего", stats['total'])
+        col2.metric("⏰ Предстоящих", stats['upcoming'])
+        col3.metric("📅 За месяц", stats['this_month'])
+        col4.metric("📆 За неделю", stats['this_week'])
+        
+        col5, col6, col7, col8 = st.columns(4)
+        col5.metric("🗓️ Сегодня", stats['today'])
+        col6.metric("✅ Завершено", stats['completed'])
+        col7.metric("❌ Отменено", stats['cancelled'])
+        col8.metric("📉 Доля отмен", f"{stats['cancel_rate']:.1f}%")
     
     # Вкладка Уведомления
-    with tabs[5]:
+    elif admin_tab == ADMIN_TABS[5]:
         st.markdown("### 🔔 Система уведомлений")
         
         # Статус бота
@@ -2653,6 +2781,62 @@ if st.session_state.admin_logged_in:
                             st.error("❌ Ошибка отправки")
                     else:
                         st.error("❌ Введите Chat ID")
+            
+            # Outbox
+            st.markdown("#### 📬 Доставка уведомлений")
+            
+            outbox = notifier.outbox
+            if outbox is None:
+                st.warning("⚠️ Outbox отключен (migrations/outbox.sql): уведомления отправляются сразу, без повторов")
+            else:
+                try:
+                    counts = outbox.summary()
+                    col1, col2, col3 = st.columns(3)
+                    col1.metric(f"{DELIVERY_STATUS_EMOJI[PENDING]} В очереди", counts[PENDING] + counts[SENDING])
+                    col2.metric(f"{DELIVERY_STATUS_EMOJI[SENT]} Отправлено", counts[SENT])
+                    col3.metric(f"{DELIVERY_STATUS_EMOJI[DEAD]} Не доставлено", counts[DEAD])
+                    if outbox.paused_until:
+                        st.warning(f"⏸️ Telegram недоступен, следующая попытка в {outbox.paused_until.strftime('%H:%M:%S')}")
+                    
+                    outbox_status = st.radio("Показать", [PENDING, DEAD, SENT], horizontal=True,
+                                             format_func=lambda status: DELIVERY_STATUS_TEXT[status])
+                    outbox_rows = outbox.recent(outbox_status)
+                    if outbox_rows:
+                        outbox_df = pd.DataFrame(outbox_rows)
+                        outbox_df['kind'] = outbox_df['kind'].map(lambda kind: DELIVERY_DISPLAY.get(kind, kind))
+                        st.dataframe(outbox_df, use_container_width=True, hide_index=True)
+                    else:
+                        st.info("📭 Сообщений нет")
+                    
+                    if counts[DEAD] and st.button("🔁 Повторить недоставленные", use_container_width=True):
+                        st.success(f"✅ В очередь возвращено: {outbox.retry()}")
+                        st.rerun()
+                except Exception as e:
+                    st.error(f"❌ Ошибка чтения outbox: {e}")
+            
+            # Рассылка
+            st.markdown("#### 📢 Рассылка клиентам")
+            
+            if not contacts.has_table:
+                st.warning("⚠️ Нет таблицы client_contacts (migrations/client_contacts.sql): chat_id хранятся в записях")
+            
+            broadcast_text = st.text_area("Текст рассылки ({name} — имя клиента)",
+                                          "Здравствуйте, {name}! ")
+            if st.button("📢 Отправить всем клиентам с Telegram", use_container_width=True):
+                recipients = get_broadcast_recipients()
+                if recipients:
+                    broadcast_to_clients(recipients, broadcast_text)
+                else:
+                    st.info("📭 Нет клиентов с подключенным Telegram")
+            
+            last_broadcast = st.session_state.get('last_broadcast')
+            if last_broadcast:
+                st.info(f"📊 Последняя рассылка ({last_broadcast['at']}): доставлено "
+                        f"{last_broadcast['sent']} из {last_broadcast['total']} за {last_broadcast['elapsed']:.1f} с"
+                        + (f", пауз по лимиту Telegram: {last_broadcast['rate_limited']}"
+                           if last_broadcast['rate_limited'] else ""))
+                if last_broadcast['failed']:
+                    st.dataframe(pd.DataFrame(last_broadcast['failed']), use_container_width=True, hide_index=True)
         
         else:
             st.error("❌ Бот не настроен")
@@ -2693,70 +2877,7 @@ elif not st.session_state.client_logged_in:
                     st.error("❌ Записей не найдено")
         
         st.markdown("---")
-        st.markdown("#### 📅 Новая запись")
-        
-        # Выбор даты
-        min_date = datetime.now().date()
-        max_date = min_date + timedelta(days=BOOKING_RULES["MAX_DAYS_AHEAD"])
-        
-        selected_date = st.date_input("Дата консультации", min_value=min_date, 
-                                      max_value=max_date, value=min_date, format="DD.MM.YYYY")
-        
-        # Получаем слоты
-        available_slots = get_available_slots(str(selected_date))
-        selected_time = render_time_slots(available_slots, "guest_slot")
-        
-        if selected_time:
-            st.success(f"✅ Выбрано: **{selected_date.strftime('%d.%m.%Y')}** в **{selected_time}**")
-            
-            st.markdown("#### 👤 Ваши данные")
-            with st.form("booking_form"):
-                col_a, col_b = st.columns(2)
-                with col_a:
-                    client_name = st.text_input("👤 Имя *", placeholder="Иван Иванов")
-                    client_email = st.text_input("📧 Email", placeholder="example@mail.com")
-                    # 🔥 НОВОЕ ПОЛЕ
-                    client_chat_id = st.text_input("💬 ID Telegram для уведомлений", 
-                                                 placeholder="123456789 (опционально)",
-                                                 help="Чтобы получать уведомления о записи и напоминания")
-                with col_b:
-                    client_phone = st.text_input("📱 Телефон *", placeholder="+7 (999) 123-45-67")
-                    client_telegram = st.text_input("💬 Telegram username", placeholder="@username")
-                
-                notes = st.text_area("💭 Комментарий (необязательно)", height=80)
-                submit = st.form_submit_button("✅ Подтвердить запись", use_container_width=True)
-                
-                if submit:
-                    if not client_name or not client_phone:
-                        st.error("❌ Заполните имя и телефон")
-                    elif has_active_booking(client_phone):
-                        st.error("❌ У вас уже есть активная запись")
-                    else:
-                        success, message = create_booking(
-                            client_name, client_phone, client_email, 
-                            client_telegram, str(selected_date), selected_time, notes,
-                            client_chat_id  # 🔥 ПЕРЕДАЕМ CHAT_ID
-                        )
-                        if success:
-                            st.balloons()
-                            # Автологин
-                            st.session_state.client_logged_in = True
-                            st.session_state.client_phone = client_phone
-                            st.session_state.client_name = client_name
-                            st.session_state.current_tab = "👁️ Текущая запись"
-                            
-                            st.markdown(f"""
-                            <div class="success-message">
-                                <h3>🌿 Запись подтверждена!</h3>
-                                <p><strong>📅 Дата:</strong> {selected_date.strftime('%d.%m.%Y')}</p>
-                                <p><strong>🕐 Время:</strong> {selected_time}</p>
-                                <p><strong>🎉 Вы автоматически авторизованы!</strong></p>
-                                <p><strong>🔔 Уведомления отправлены!</strong></p>
-                            </div>
-                            """, unsafe_allow_html=True)
-                            st.rerun()
-                        else:
-                            st.error(message)
+        render_guest_booking()
     
     with col2:
         render_info_panel()
@@ -2768,7 +2889,12 @@ elif not st.session_state.client_logged_in:
 else:
     st.title("👤 Личный кабинет")
     
-    client_info = get_client_info(st.session_state.client_phone)
+    # Все вкладки кабинета отрисовываются из профиля сессии
+    client_profile = get_client_profile()
+    if client_profile is None:
+        client_logout()
+        st.rerun()
+    client_info = client_profile.info
     st.markdown(f"""
     <div class="welcome-header">
         <h1>👋 Здравствуйте, {st.session_state.client_name}!</h1>
@@ -2780,7 +2906,7 @@ else:
     if st.session_state.current_tab == "👁️ Текущая запись":
         st.markdown("### 👁️ Текущая запись")
         
-        upcoming = get_upcoming_client_booking(st.session_state.client_phone)
+        upcoming = client_profile.upcoming
         
         if upcoming:
             time_until = calculate_time_until(upcoming['booking_date'], upcoming['booking_time'])
@@ -2796,8 +2922,7 @@ else:
             """, unsafe_allow_html=True)
             
             # Проверяем подключен ли Telegram
-            telegram_connected = get_client_telegram_chat_id(st.session_state.client_phone)
-            if not telegram_connected:
+            if not client_profile.chat_id:
                 st.warning("""
                 ⚠️ **Вы не получаете напоминания!**
                 
@@ -2809,9 +2934,8 @@ else:
             
             if time_until.total_seconds() > BOOKING_RULES["MIN_CANCEL_MINUTES"] * 60:
                 if st.button("❌ Отменить запись", type="secondary", use_container_width=True):
-                    # Получаем chat_id для уведомления
-                    chat_id = get_client_telegram_chat_id(st.session_state.client_phone)
-                    success, message = cancel_booking(upcoming['id'], st.session_state.client_phone, chat_id)
+                    success, message = cancel_booking(upcoming['id'], st.session_state.client_phone,
+                                                      client_profile.chat_id)
                     if success:
                         st.success(message)
                         st.rerun()
@@ -2844,55 +2968,27 @@ else:
     elif st.session_state.current_tab == "💬 Уведомления":  # 🔥 НОВАЯ ВКЛАДКА
         render_telegram_section()
     
-    elif st.session_state.current_tab == "📅 Запись":
+    elif st.session_state.current_tab == "📅 Новая запись":
         st.markdown("### 📅 Новая запись")
         
-        if has_active_booking(st.session_state.client_phone):
+        if client_profile.has_active_booking:
             st.warning("⚠️ У вас уже есть активная запись. Перейдите в 'Текущая запись'.")
         else:
             col1, col2 = st.columns([2, 1])
             
             with col1:
-                selected_date = st.date_input("Дата", min_value=datetime.now().date(),
-                                            max_value=datetime.now().date() + timedelta(days=30),
-                                            format="DD.MM.YYYY")
-                
-                available_slots = get_available_slots(str(selected_date))
-                selected_time = render_time_slots(available_slots, "client_slot")
-                
-                if selected_time:
-                    st.success(f"✅ {selected_date.strftime('%d.%m.%Y')} в {selected_time}")
-                    
-                    with st.form("quick_booking"):
-                        notes = st.text_area("💭 Тема консультации", height=80)
-                        submit = st.form_submit_button("✅ Записаться", use_container_width=True)
-                        
-                        if submit:
-                            # Получаем chat_id для уведомления
-                            chat_id = get_client_telegram_chat_id(st.session_state.client_phone)
-                            
-                            success, message = create_booking(
-                                client_info['name'] if client_info else st.session_state.client_name,
-                                st.session_state.client_phone,
-                                client_info.get('email', '') if client_info else '',
-                                client_info.get('telegram', '') if client_info else '',
-                                str(selected_date), selected_time, notes,
-                                chat_id  # 🔥 ПЕРЕДАЕМ CHAT_ID
-                            )
-                            if success:
-                                st.balloons()
-                                st.success("🎉 Запись создана!")
-                                st.rerun()
-                            else:
-                                st.error(message)
+                render_client_booking()
             
             with col2:
                 render_info_panel()
     
-    elif st.session_state.current_tab == "📊 История":
+    elif st.session_state.current_tab == "📊 История записей":
         st.markdown("### 📊 История записей")
         
-        bookings = get_client_bookings(st.session_state.client_phone)
+        bookings = pd.DataFrame(list(client_profile.history))
+        
+        if len(bookings) >= CACHE_SETTINGS["CLIENT_PROFILE_HISTORY"]:
+            st.caption(f"Показаны последние {len(bookings)} записей")
         
         if not bookings.empty:
             for idx, row in bookings.iterrows():
@@ -2907,4 +3003,14 @@ else:
                 </div>
                 """, unsafe_allow_html=True)
         else:
-            st.info("📭 История пуста")
\ No newline at end of file
+            st.info("📭 История пуста")
+
+# ============================================================================
+# ОТЛАДКА: ЗАПРОСЫ ЗА ПРОГОН
+# ============================================================================
+
+if CACHE_SETTINGS["DEBUG_QUERIES"]:
+    st.sidebar.caption(
+        f"🛠️ Запросов за прогон: {request_scope.queries} · "
+        f"повторов из памяти: {request_scope.hits} · {request_scope.elapsed * 1000:.0f} мс"
+    )
@@ -0,0 +1,292 @@
+# message_templates.py
+# Шаблоны уведомлений Telegram: каждый шаблон разбирается один раз,
+# рендер — ''.join по готовым частям с HTML-экранированием значений.
+#
+# Синтаксис полей — как у str.format: {name}, {date:date}, {bookings:each:upcoming_item}.
+# Фильтры: (пусто) — экранирование, date — дата ДД.ММ.ГГГГ, raw — без экранирования,
+# each:<шаблон> — шаблон для каждого элемента списка, if:<шаблон> — шаблон, если значение не пусто.
+
+import html
+import time
+from collections.abc import Mapping
+from datetime import datetime
+from functools import lru_cache
+from string import Formatter
+from typing import NamedTuple
+
+_MISSING = object()
+
+
+@lru_cache(maxsize=4096)
+def format_date(date_str: str, format_str: str = '%d.%m.%Y') -> str:
+    """Форматирование даты с обработкой ошибок (результат кэшируется по строке)"""
+    try:
+        return datetime.strptime(date_str, '%Y-%m-%d').strftime(format_str)
+    except Exception:
+        return date_str
+
+
+def escape(value) -> str:
+    """Экранирование для parse_mode=HTML"""
+    return html.escape('' if value is None else str(value), quote=False)
+
+
+# ============================================================================
+# КОНТЕКСТЫ
+# ============================================================================
+
+class BookingContext(NamedTuple):
+    """Данные записи для шаблонов (дата — в формате ГГГГ-ММ-ДД)"""
+    name: str
+    phone: str
+    date: str
+    time: str
+
+    @classmethod
+    def from_booking(cls, booking: dict, default_name: str = '', default_phone: str = 'Не указан'):
+        return cls(
+            booking.get('client_name') or default_name,
+            booking.get('client_phone') or default_phone,
+            booking.get('booking_date') or '',
+            booking.get('booking_time') or '',
+        )
+
+
+class ClientContext(NamedTuple):
+    """Клиент и его предстоящие записи"""
+    name: str
+    bookings: tuple = ()
+
+    @classmethod
+    def from_bookings(cls, name: str, bookings: list):
+        return cls(name or '', tuple(BookingContext.from_booking(booking) for booking in bookings))
+
+
+# ============================================================================
+# КОМПИЛЯЦИЯ И РЕНДЕР
+# ============================================================================
+
+class Template:
+    """Разобранный шаблон: литералы и поля с фильтрами"""
+
+    __slots__ = ('name', 'source', 'strict', 'registry', 'parts', 'renders', 'render_ns')
+
+    def __init__(self, name: str, source: str, registry=None, strict: bool = True):
+        self.name = name
+        self.source = source
+        self.strict = strict  # False — неизвестные поля остаются как {поле}
+        self.registry = registry
+        self.renders = 0
+        self.render_ns = 0
+        self.parts = []
+        for literal, field, spec, _ in Formatter().parse(source):
+            if literal:
+                self.parts.append(literal)
+            if field is not None:
+                placeholder = '{' + field + (':' + spec if spec else '') + '}'
+                self.parts.append((field, self._filter(spec), placeholder))
+
+    def _filter(self, spec: str):
+        """Функция (значение, контекст) -> строка для спецификации поля"""
+        if not spec:
+            return lambda value, context: escape(value)
+        if spec == 'date':
+            return lambda value, context: escape(format_date(value))
+        if spec == 'raw':
+            return lambda value, context: '' if value is None else str(value)
+        kind, _, name = spec.partition(':')
+        if kind == 'each' and name:
+            def each(value, context):
+                render = self.registry.get(name).render
+                return '\n'.join([render(item) for item in value or ()])
+            return each
+        if kind == 'if' and name:
+            return lambda value, context: self.registry.render(name, context) if value else ''
+        raise ValueError(f"Шаблон {self.name}: неизвестный фильтр '{spec}'")
+
+    def render(self, context) -> str:
+        started = time.perf_counter_ns()
+        is_mapping = isinstance(context, Mapping)
+        out = []
+        append = out.append
+        for part in self.parts:
+            if part.__class__ is str:
+                append(part)
+                continue
+            field, apply, placeholder = part
+            value = context.get(field, _MISSING) if is_mapping else getattr(context, field, _MISSING)
+            if value is _MISSING:
+                if self.strict:
+                    raise KeyError(f"Шаблон {self.name}: нет поля '{field}'")
+                append(placeholder)
+                continue
+            append(apply(value, context))
+        text = ''.join(out)
+        self.renders += 1
+        self.render_ns += time.perf_counter_ns() - started
+        return text
+
+
+class TemplateRegistry:
+    """Именованные шаблоны, скомпилированные при регистрации"""
+
+    def __init__(self, sources: dict = None):
+        self.templates = {}
+        for name, source in (sources or {}).items():
+            self.register(name, source)
+
+    def register(self, name: str, source: str) -> Template:
+        template = Template(name, source, registry=self)
+        self.templates[name] = template
+        return template
+
+    def get(self, name: str) -> Template:
+        return self.templates[name]
+
+    def render(self, name: str, context) -> str:
+        return self.templates[name].render(context)
+
+    def stats(self) -> dict:
+        """Число рендеров и среднее время (мкс) по каждому шаблону"""
+        return {
+            name: {'renders': t.renders, 'avg_us': t.render_ns / t.renders / 1000 if t.renders else 0.0}
+            for name, t in self.templates.items()
+        }
+
+
+# ============================================================================
+# ШАБЛОНЫ УВЕДОМЛЕНИЙ
+# ============================================================================
+
+NOTIFICATION_TEMPLATES = {
+    'booking_created_admin': """
+📅 <b>НОВАЯ ЗАПИСЬ НА КОНСУЛЬТАЦИЮ</b>
+
+👤 <b>Клиент:</b> {name}
+📱 <b>Телефон:</b> <code>{phone}</code>
+📅 <b>Дата:</b> {date:date}
+🕐 <b>Время:</b> {time}
+
+⏰ <i>Напоминание будет отправлено за 1 час до консультации</i>
+""",
+    'booking_created_client': """
+✅ <b>ВАША ЗАПИСЬ ПОДТВЕРЖДЕНА</b>
+
+Добрый день, {name}!
+
+📅 <b>Дата:</b> {date:date}
+🕐 <b>Время:</b> {time}
+
+Мы ждем вас на консультацию!
+
+⏰ <i>Мы напомним вам за 1 час до начала</i>
+
+Если у вас возникли вопросы, ответьте на это сообщение.
+""",
+    'booking_cancelled_admin': """
+❌ <b>ОТМЕНА ЗАПИСИ</b>
+
+👤 <b>Клиент:</b> {name}
+📱 <b>Телефон:</b> <code>{phone}</code>
+📅 <b>Дата:</b> {date:date}
+
+🚫 <i>Запись отменена клиентом</i>
+""",
+    'booking_cancelled_client': """
+❌ <b>ЗАПИСЬ ОТМЕНЕНА</b>
+
+Уважаемый(ая) {name},
+
+Ваша запись на {date:date} отменена.
+
+Если вы хотите записаться на другое время, ответьте на это сообщение.
+
+С уважением,
+Ваш психолог
+""",
+    'reminder_admin': """
+⏰ <b>НАПОМИНАНИЕ О КОНСУЛЬТАЦИИ</b>
+
+Через 1 час у вас консультация:
+
+👤 <b>Клиент:</b> {name}
+📱 <b>Телефон:</b> <code>{phone}</code>
+🕐 <b>Время:</b> {time}
+
+Подготовьтесь к встрече!
+""",
+    'reminder_client': """
+⏰ <b>НАПОМИНАНИЕ О КОНСУЛЬТАЦИИ</b>
+
+Добрый день, {name}!
+
+Через 1 час у вас консультация в {time}.
+
+Пожалуйста, подготовьтесь к встрече.
+
+Ждем вас!
+""",
+    'upcoming_item': "• {date:date} в {time}",
+    'welcome_upcoming': "\n\n📅 <b>Ваши предстоящие консультации:</b>\n{bookings:each:upcoming_item}",
+    'welcome': """
+👋 <b>ДОБРО ПОЖАЛОВАТЬ, {name}!</b>
+
+✅ <b>Вы успешно подключили уведомления!</b>
+
+Теперь вы будете получать:
+• ✅ Подтверждения новых записей
+• ⏰ Напоминания за 1 час до консультаций
+• ❌ Уведомления об отменах{bookings:if:welcome_upcoming}
+
+С уважением,
+Ваш психолог 🌿
+""",
+    'upcoming_bookings': """
+📅 <b>ВАШИ ПРЕДСТОЯЩИЕ КОНСУЛЬТАЦИИ</b>
+
+Уважаемый(ая) {name},
+
+У вас запланированы консультации:
+{bookings:each:upcoming_item}
+
+⏰ Мы напомним вам за 1 час до каждой консультации!
+""",
+    'connection_test': """
+🔔 <b>ТЕСТОВОЕ УВЕДОМЛЕНИЕ</b>
+
+Привет, {name}!
+
+Это тестовое сообщение подтверждает, что вы успешно подключили уведомления в Telegram.
+
+Теперь вы будете получать:
+✅ Подтверждения записей
+⏰ Напоминания за 1 час
+❌ Уведомления об отменах
+
+Отлично! Уведомления работают! 🎉
+""",
+    'day_blocked': """
+📅 <b>Изменение расписания</b>
+
+Здравствуйте, {name}!
+
+{date:date} прием не проводится ({reason}). Ваша запись на {time} требует переноса — выберите, пожалуйста, другое время.
+
+С уважением,
+Ваш психолог 🌿
+""",
+    'telegram_linked': """
+✅ <b>Уведомления подключены</b>
+
+Теперь вы будете получать подтверждения записей, напоминания за 1 час и уведомления об отменах.
+
+Вернитесь на сайт — подключение уже отображается в личном кабинете.
+""",
+    'telegram_link_unknown': """
+⚠️ <b>Не удалось подключить уведомления</b>
+
+Ссылка устарела или уже использована. Откройте личный кабинет на сайте и нажмите «Подключить Telegram» еще раз.
+""",
+}
+
+TEMPLATES = TemplateRegistry(NOTIFICATION_TEMPLATES)
@@ -0,0 +1,6 @@
+-- migrations/bookings_session_duration.sql
+-- Длительность, с которой создана запись (availability.py), Supabase/PostgreSQL.
+-- SQLite добавляет колонку сам (storage.SQLITE_MIGRATIONS). Без колонки
+-- занятость считается по текущей длительности из настроек.
+
+alter table bookings add column if not exists session_duration integer;
@@ -0,0 +1,10 @@
+-- migrations/client_contacts.sql
+-- Справочник Telegram chat_id клиентов (contacts.py), Supabase/PostgreSQL.
+-- SQLite создает ее сам (storage.SQLITE_SCHEMA). Без таблицы chat_id
+-- хранятся в bookings.telegram_chat_id, как раньше.
+
+create table if not exists client_contacts (
+    phone_hash text primary key,
+    telegram_chat_id text not null,
+    updated_at timestamptz
+);
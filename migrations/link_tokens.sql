@@ -0,0 +1,12 @@
+-- migrations/link_tokens.sql
+-- Одноразовые токены ссылок на бота (telegram_updates.ChatLinker), Supabase/PostgreSQL.
+-- SQLite создает ее сам (storage.SQLITE_SCHEMA). Без таблицы ссылка на бота
+-- ведет без токена, Chat ID вводится вручную.
+
+create table if not exists link_tokens (
+    token text primary key,
+    phone_hash text not null,
+    created_at timestamp not null
+);
+
+create index if not exists idx_link_tokens_created on link_tokens (created_at);
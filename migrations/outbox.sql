@@ -0,0 +1,21 @@
+-- migrations/outbox.sql
+-- Очередь уведомлений NotificationOutbox (notifications.py), Supabase/PostgreSQL.
+-- SQLite создает ее сам (storage.SQLITE_SCHEMA). Без таблицы уведомления
+-- отправляются сразу, без повторов и статусов доставки.
+
+create table if not exists outbox (
+    id bigserial primary key,
+    booking_id bigint,
+    kind text not null,
+    chat_id text not null,
+    text text not null,
+    status text default 'pending',
+    attempts int default 0,
+    next_attempt_at timestamp not null,
+    last_error text,
+    created_at timestamp,
+    sent_at timestamp
+);
+
+create index if not exists idx_outbox_status_next on outbox (status, next_attempt_at);
+create index if not exists idx_outbox_booking on outbox (booking_id);
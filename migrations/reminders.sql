@@ -0,0 +1,18 @@
+-- migrations/reminders.sql
+-- Таблица напоминаний для ReminderScheduler (reminders.py), Supabase/PostgreSQL.
+-- SQLite создает ее сам (storage.SQLITE_SCHEMA). Без таблицы приложение
+-- работает, но напоминания отключены.
+
+create table if not exists reminders (
+    id bigserial primary key,
+    booking_id bigint not null,
+    kind text not null,
+    chat_id text,
+    remind_at timestamp not null,
+    event_at timestamp not null,
+    status text default 'pending',
+    sent_at timestamp,
+    unique (booking_id, kind)
+);
+
+create index if not exists idx_reminders_status_time on reminders (status, remind_at);
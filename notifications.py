@@ -0,0 +1,222 @@
+# notifications.py
+# Outbox исходящих уведомлений: путь записи только пишет готовый текст в
+# таблицу outbox, фоновый поток отправляет его пачками. Неудачные отправки
+# повторяются с экспоненциальной задержкой, безнадежные уходят в dead letter.
+#
+# Во время сбоя Telegram (5xx, таймауты, 429) поток не перебирает всю пачку:
+# остаток пачки возвращается в очередь без траты попытки, отправка
+# приостанавливается на время задержки — нагрузка на API остается ровной.
+
+import threading
+from datetime import datetime, timedelta
+
+from broadcast import SENT as RESPONSE_SENT
+from broadcast import classify_response
+
+PENDING = 'pending'
+SENDING = 'sending'
+SENT = 'sent'
+DEAD = 'dead'
+
+STATUSES = (PENDING, SENDING, SENT, DEAD)
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _format(moment: datetime) -> str:
+    return moment.strftime(TIME_FORMAT)
+
+
+class NotificationOutbox:
+    """Таблица outbox и рабочий поток с повторами и dead letter"""
+
+    def __init__(self, db, send, batch_size: int = 20, max_attempts: int = 6,
+                 backoff: float = 5.0, max_backoff: float = 900.0, poll_interval: float = 2.0,
+                 clock=datetime.now):
+        self.db = db
+        self.send = send  # send(chat_id, text) -> requests.Response
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.paused_until = None  # сбой Telegram: отправка приостановлена до этого момента
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    # ---- жизненный цикл ----
+
+    def start(self):
+        """Возврат захваченных упавшим процессом сообщений и запуск потока"""
+        self.db.table('outbox')\
+            .update({'status': PENDING})\
+            .eq('status', SENDING)\
+            .execute()
+        self._thread = threading.Thread(target=self._run, name='outbox', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+
+    # ---- постановка ----
+
+    def enqueue(self, messages: list) -> list:
+        """Записать сообщения [{'booking_id', 'kind', 'chat_id', 'text'}] одним запросом"""
+        if not messages:
+            return []
+        now = _format(self.clock())
+        response = self.db.table('outbox').insert([{
+            'booking_id': message.get('booking_id'),
+            'kind': message['kind'],
+            'chat_id': str(message['chat_id']),
+            'text': message['text'],
+            'status': PENDING,
+            'attempts': 0,
+            'next_attempt_at': now,
+            'created_at': now,
+        } for message in messages]).execute()
+        self._wake.set()
+        return response.data or []
+
+    def retry(self, ids: list = None) -> int:
+        """Вернуть сообщения из dead letter в очередь (все или выбранные)"""
+        query = self.db.table('outbox')\
+            .update({'status': PENDING, 'attempts': 0, 'next_attempt_at': _format(self.clock()),
+                     'last_error': None})\
+            .eq('status', DEAD)
+        if ids:
+            query = query.in_('id', ids)
+        response = query.execute()
+        self._wake.set()
+        return len(response.data or [])
+
+    # ---- отправка ----
+
+    def _delay(self, attempts: int) -> float:
+        return min(self.max_backoff, self.backoff * 2 ** (attempts - 1))
+
+    def _claim(self) -> list:
+        """Захват пачки готовых к отправке сообщений"""
+        due = self.db.table('outbox')\
+            .select('id')\
+            .eq('status', PENDING)\
+            .lte('next_attempt_at', _format(self.clock()))\
+            .order('next_attempt_at')\
+            .order('id')\
+            .limit(self.batch_size)\
+            .execute()
+        ids = [row['id'] for row in due.data or []]
+        if not ids:
+            return []
+        # Условие по статусу: сообщение не захватят дважды
+        claimed = self.db.table('outbox')\
+            .update({'status': SENDING})\
+            .in_('id', ids)\
+            .eq('status', PENDING)\
+            .execute()
+        return sorted(claimed.data or [], key=lambda row: (row['next_attempt_at'], row['id']))
+
+    def _release(self, rows: list):
+        """Вернуть незатронутый остаток пачки в очередь без траты попытки"""
+        if rows:
+            self.db.table('outbox')\
+                .update({'status': PENDING})\
+                .in_('id', [row['id'] for row in rows])\
+                .eq('status', SENDING)\
+                .execute()
+
+    def drain_once(self) -> int:
+        """Отправить одну пачку; возвращает число обработанных сообщений"""
+        if self.paused_until and self.clock() < self.paused_until:
+            return 0
+        rows = self._claim()
+        for n, row in enumerate(rows):
+            try:
+                status, retry_after, error = classify_response(self.send(row['chat_id'], row['text']))
+            except Exception as e:
+                status, retry_after, error = None, None, str(e)
+
+            if status == RESPONSE_SENT:
+                # Отмечаем сразу: после падения процесса отправленное не уйдет повторно
+                self._update(row, {'status': SENT, 'sent_at': _format(self.clock())})
+                continue
+
+            attempts = row['attempts'] + 1
+            if status is not None or attempts >= self.max_attempts:
+                # 400/403 или исчерпаны попытки — в dead letter
+                self._update(row, {'status': DEAD, 'attempts': attempts, 'last_error': error})
+                continue
+
+            # Сбой Telegram: повтор позже, остаток пачки ждет окончания паузы
+            delay = retry_after if retry_after is not None else self._delay(attempts)
+            retry_at = self.clock() + timedelta(seconds=delay)
+            self._update(row, {'status': PENDING, 'attempts': attempts, 'last_error': error,
+                               'next_attempt_at': _format(retry_at)})
+            self.paused_until = retry_at
+            self._release(rows[n + 1:])
+            break
+        else:
+            self.paused_until = None
+        return len(rows)
+
+    def _update(self, row: dict, values: dict):
+        self.db.table('outbox').update(values).eq('id', row['id']).execute()
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.clear()
+            try:
+                processed = self.drain_once()
+            except Exception as e:
+                print(f"❌ Ошибка обработки outbox: {e}")
+                processed = 0
+            if processed < self.batch_size:
+                # Пачка неполная или пауза — ждем новых сообщений или следующего опроса
+                self._wake.wait(self.poll_interval)
+
+    # ---- просмотр ----
+
+    def summary(self) -> dict:
+        """Количество сообщений по статусам"""
+        counts = {}
+        for status in STATUSES:
+            response = self.db.table('outbox')\
+                .select('id', count='exact')\
+                .eq('status', status)\
+                .limit(1)\
+                .execute()
+            counts[status] = response.count or 0
+        return counts
+
+    def recent(self, status: str, limit: int = 50) -> list:
+        """Последние сообщения со статусом"""
+        response = self.db.table('outbox')\
+            .select('id, booking_id, kind, chat_id, attempts, last_error, created_at, next_attempt_at, sent_at')\
+            .eq('status', status)\
+            .order('id', desc=True)\
+            .limit(limit)\
+            .execute()
+        return response.data or []
+
+    def for_bookings(self, booking_ids: list) -> dict:
+        """Статусы доставки по записям одним запросом: {booking_id: {kind: {'status', 'attempts', 'error'}}}"""
+        if not booking_ids:
+            return {}
+        response = self.db.table('outbox')\
+            .select('booking_id, kind, status, attempts, last_error')\
+            .in_('booking_id', list(booking_ids))\
+            .order('id')\
+            .execute()
+        deliveries = {}
+        for row in response.data or []:
+            # Последнее сообщение каждого вида перекрывает предыдущие
+            deliveries.setdefault(row['booking_id'], {})[row['kind']] = {
+                'status': row['status'], 'attempts': row['attempts'], 'error': row['last_error'],
+            }
+        return deliveries
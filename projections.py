@@ -0,0 +1,63 @@
+# projections.py
+# Проекции колонок для чтения записей: каждый экран запрашивает только то,
+# что показывает, вместо select('*') (особенно без тяжелого поля notes)
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Projection:
+    """Набор колонок таблицы для конкретного экрана"""
+    name: str
+    columns: tuple
+
+    @property
+    def select(self) -> str:
+        """Строка для .select(...)"""
+        return ', '.join(self.columns)
+
+    def project(self, row: dict) -> dict:
+        """Оставить в строке только колонки проекции"""
+        return {column: row.get(column) for column in self.columns}
+
+    def without(self, *columns) -> 'Projection':
+        """Та же проекция без колонок, которых нет в базе"""
+        return Projection(self.name, tuple(column for column in self.columns if column not in columns))
+
+
+# Личный кабинет: история записей клиента
+CLIENT_HISTORY = Projection('client_history', (
+    'id', 'booking_date', 'booking_time', 'status', 'notes',
+))
+
+# Личный кабинет: профиль клиента при входе (контакты + последние записи)
+CLIENT_PROFILE = Projection('client_profile', (
+    'id', 'booking_date', 'booking_time', 'status', 'notes',
+    'client_name', 'client_email', 'client_telegram', 'created_at',
+))
+
+# Telegram: список предстоящих консультаций и напоминания
+UPCOMING_NOTIFY = Projection('upcoming_notify', (
+    'id', 'booking_date', 'booking_time', 'client_name', 'client_phone',
+))
+
+# Админка: карточка записи в списке "Записи"
+ADMIN_BOOKING_CARD = Projection('admin_booking_card', (
+    'id', 'booking_date', 'booking_time', 'status', 'session_duration', 'client_name', 'client_phone',
+    'client_email', 'client_telegram', 'notes',
+))
+
+# Админка: история записей клиента во вкладке "Клиенты"
+ADMIN_CLIENT_HISTORY = Projection('admin_client_history', (
+    'id', 'booking_date', 'booking_time', 'status', 'notes', 'created_at',
+))
+
+# Смена статуса/отмена: данные для проверки и уведомлений
+BOOKING_NOTIFY = Projection('booking_notify', (
+    'id', 'booking_date', 'booking_time', 'status', 'session_duration', 'client_name', 'client_phone',
+))
+
+# Перенос записи: старые дата/время для календаря и напоминаний
+RESCHEDULE_CHECK = Projection('reschedule_check', (
+    'booking_date', 'booking_time', 'status', 'session_duration',
+))
@@ -0,0 +1,316 @@
+# reminders.py
+# Планировщик напоминаний: одна куча и один рабочий поток вместо
+# threading.Timer на каждую запись. Состояние хранится в таблице reminders,
+# поэтому напоминания переживают перезапуск процесса.
+#
+# Ключ напоминания — (booking_id, kind): повторное планирование не создает дублей.
+# Перенос/отмена не ищут элемент в куче: актуальное время хранится в индексе
+# по ключу, устаревшие элементы пропускаются, а куча периодически сжимается.
+# Неудачная отправка повторяется с растущей задержкой, пока не началась консультация.
+
+import heapq
+import itertools
+import threading
+from datetime import datetime, timedelta
+
+from booking_events import CANCELLED as BOOKING_CANCELLED
+from booking_events import COMPLETED, CREATED, DELETED, RESCHEDULED, RESTORED
+
+HOUR_BEFORE = 'hour_before'
+
+PENDING = 'pending'
+SENDING = 'sending'
+SENT = 'sent'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+EXPIRED = 'expired'
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Максимальный сон потока: страховка от перевода системных часов
+MAX_WAIT_SECONDS = 60
+
+# Сжатие кучи, когда устаревших элементов больше, чем актуальных (+ запас)
+COMPACT_SLACK = 64
+
+# Повтор неудачной отправки: задержка растет вместе с опозданием напоминания
+RETRY_MIN_SECONDS = 30
+RETRY_MAX_SECONDS = 600
+
+
+def booking_datetime(booking_date: str, booking_time: str) -> datetime:
+    """Начало консультации"""
+    return datetime.strptime(f"{booking_date} {booking_time}", "%Y-%m-%d %H:%M")
+
+
+def _format(moment: datetime) -> str:
+    return moment.strftime(TIME_FORMAT)
+
+
+def _parse(value) -> datetime:
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    return datetime.fromisoformat(str(value)).replace(tzinfo=None)
+
+
+class ReminderScheduler:
+    """Напоминания из таблицы reminders, отправляемые одним фоновым потоком"""
+
+    def __init__(self, db, send, lead: timedelta = timedelta(hours=1), kind: str = HOUR_BEFORE,
+                 clock=datetime.now):
+        self.db = db
+        self.send = send  # send(reminder_row) -> True/False; None — отправлять нечего (запись отменена)
+        self.lead = lead
+        self.kind = kind
+        self.clock = clock
+        self._heap = []  # (remind_at, seq, key)
+        self._due = {}  # key -> remind_at; элементы кучи с другим временем устарели
+        self._keys = {}  # booking_id -> {key}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    # ---- жизненный цикл ----
+
+    def start(self):
+        """Загрузка незавершенных напоминаний (включая просроченные) и запуск потока"""
+        response = self.db.table('reminders')\
+            .select('booking_id, kind, remind_at')\
+            .in_('status', [PENDING, SENDING])\
+            .execute()
+        for row in response.data or []:
+            self._push((row['booking_id'], row['kind']), _parse(row['remind_at']))
+
+        self._thread = threading.Thread(target=self._run, name='reminders', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join()
+
+    @property
+    def pending(self) -> int:
+        """Количество актуальных напоминаний"""
+        with self._cond:
+            return len(self._due)
+
+    @property
+    def heap_size(self) -> int:
+        """Размер кучи вместе с устаревшими элементами"""
+        with self._cond:
+            return len(self._heap)
+
+    # ---- планирование ----
+
+    def _push(self, key, remind_at: datetime):
+        with self._cond:
+            if self._due.get(key) == remind_at:
+                return  # уже взведено на это время — повторы схлопываются
+            self._due[key] = remind_at
+            self._keys.setdefault(key[0], set()).add(key)
+            heapq.heappush(self._heap, (remind_at, next(self._seq), key))
+            self._compact()
+            self._cond.notify()
+
+    def _discard(self, key):
+        """Убрать ключ из индекса (элемент кучи станет устаревшим); под self._cond"""
+        self._due.pop(key, None)
+        keys = self._keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys[key[0]]
+
+    def _forget(self, booking_id):
+        with self._cond:
+            for key in list(self._keys.get(booking_id, ())):
+                self._discard(key)
+            self._compact()
+
+    def _compact(self):
+        """Пересборка кучи без устаревших элементов; амортизированно O(log n) на операцию"""
+        if len(self._heap) > 2 * len(self._due) + COMPACT_SLACK:
+            self._heap = [item for item in self._heap if self._due.get(item[2]) == item[0]]
+            heapq.heapify(self._heap)
+
+    def schedule(self, booking: dict, chat_id: str = None) -> bool:
+        """Запланировать напоминание по записи (идемпотентно)"""
+        booking_id = booking.get('id')
+        if booking_id is None or not booking.get('booking_date') or not booking.get('booking_time'):
+            return False
+
+        event_at = booking_datetime(booking['booking_date'], booking['booking_time'])
+        if self.clock() >= event_at:
+            return False
+        remind_at = event_at - self.lead
+        key = (booking_id, self.kind)
+
+        existing = self.db.table('reminders')\
+            .select('chat_id, remind_at, status')\
+            .eq('booking_id', booking_id)\
+            .eq('kind', self.kind)\
+            .execute()
+        if existing.data:
+            row = existing.data[0]
+            same_time = _parse(row['remind_at']) == remind_at
+            # Уже отправлено на это время или уже ждет с тем же chat_id — ничего не делаем
+            if same_time and row['status'] == SENT:
+                return False
+            if same_time and row['status'] == PENDING and row.get('chat_id') == chat_id:
+                self._push(key, remind_at)
+                return True
+
+        self.db.table('reminders').upsert({
+            'booking_id': booking_id,
+            'kind': self.kind,
+            'chat_id': chat_id,
+            'remind_at': _format(remind_at),
+            'event_at': _format(event_at),
+            'status': PENDING,
+            'sent_at': None,
+        }, on_conflict='booking_id,kind').execute()
+        self._push(key, remind_at)
+        return True
+
+    def move(self, booking_id, booking_date: str, booking_time: str, revive: bool = False) -> int:
+        """Перенос напоминаний записи на новое время; revive — вернуть только отмененные
+        (восстановление записи: отправленное напоминание не повторяется)"""
+        event_at = booking_datetime(booking_date, booking_time)
+        query = self.db.table('reminders')\
+            .update({'remind_at': _format(event_at - self.lead), 'event_at': _format(event_at),
+                     'status': PENDING, 'sent_at': None})\
+            .eq('booking_id', booking_id)
+        if revive:
+            query = query.eq('status', CANCELLED)
+        else:
+            query = query.neq('status', CANCELLED)
+        response = query.execute()
+        if not revive:
+            self._forget(booking_id)
+        for row in response.data or []:
+            self._push((booking_id, row['kind']), _parse(row['remind_at']))
+        return len(response.data or [])
+
+    def cancel(self, booking_id) -> int:
+        """Отмена ожидающих напоминаний записи"""
+        response = self.db.table('reminders')\
+            .update({'status': CANCELLED})\
+            .eq('booking_id', booking_id)\
+            .in_('status', [PENDING, SENDING])\
+            .execute()
+        self._forget(booking_id)
+        return len(response.data or [])
+
+    def on_booking_event(self, event):
+        """Обновление напоминаний по событию записи (см. booking_events); для CREATED —
+        запланировано ли напоминание, иначе — число затронутых напоминаний"""
+        if event.kind == CREATED:
+            if event.chat_id:
+                return self.schedule({'id': event.booking_id, 'booking_date': event.booking_date,
+                                      'booking_time': event.booking_time}, event.chat_id)
+            return False
+        if event.kind == RESCHEDULED:
+            return self.move(event.booking_id, event.booking_date, event.booking_time)
+        if event.kind == RESTORED:
+            return self.move(event.booking_id, event.booking_date, event.booking_time, revive=True)
+        if event.kind in (BOOKING_CANCELLED, COMPLETED, DELETED):
+            return self.cancel(event.booking_id)
+        return None
+
+    # ---- рабочий поток ----
+
+    def _next_due(self):
+        """Дождаться ближайшего актуального напоминания; None — при остановке"""
+        with self._cond:
+            while not self._stopped:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                remind_at, _, key = self._heap[0]
+                if self._due.get(key) != remind_at:
+                    heapq.heappop(self._heap)
+                    continue
+                delay = (remind_at - self.clock()).total_seconds()
+                if delay > 0:
+                    self._cond.wait(min(delay, MAX_WAIT_SECONDS))
+                    continue
+                heapq.heappop(self._heap)
+                self._discard(key)
+                return key, remind_at
+            return None
+
+    def _run(self):
+        while True:
+            item = self._next_due()
+            if item is None:
+                return
+            try:
+                self._fire(*item)
+            except Exception as e:
+                print(f"❌ Ошибка отправки напоминания: {e}")
+
+    def _fire(self, key, remind_at: datetime):
+        booking_id, kind = key
+
+        # Захват строки: если напоминание отменили или перенесли, обновится 0 строк
+        claimed = self.db.table('reminders')\
+            .update({'status': SENDING})\
+            .eq('booking_id', booking_id)\
+            .eq('kind', kind)\
+            .in_('status', [PENDING, SENDING])\
+            .eq('remind_at', _format(remind_at))\
+            .execute()
+        if not claimed.data:
+            return
+        reminder = claimed.data[0]
+
+        # Догоняем пропущенные при простое, но не после начала консультации
+        event_at = _parse(reminder['event_at'])
+        if self.clock() >= event_at:
+            status = EXPIRED
+        else:
+            try:
+                sent = self.send(reminder)
+            except Exception as e:
+                print(f"❌ Ошибка отправки напоминания: {e}")
+                sent = False
+            if sent is None:
+                status = CANCELLED
+            elif sent:
+                status = SENT
+            elif self._retry(key, event_at):
+                return
+            else:
+                status = FAILED
+
+        self.db.table('reminders')\
+            .update({'status': status, 'sent_at': _format(self.clock())})\
+            .eq('booking_id', booking_id)\
+            .eq('kind', kind)\
+            .eq('status', SENDING)\
+            .execute()
+
+    def _retry(self, key, event_at: datetime) -> bool:
+        """Повтор неудачной отправки до начала консультации; False — повторять поздно"""
+        now = self.clock()
+        late = (now - (event_at - self.lead)).total_seconds()
+        retry_at = now + timedelta(seconds=min(RETRY_MAX_SECONDS, max(RETRY_MIN_SECONDS, late)))
+        if retry_at >= event_at:
+            return False
+
+        booking_id, kind = key
+        response = self.db.table('reminders')\
+            .update({'status': PENDING, 'remind_at': _format(retry_at)})\
+            .eq('booking_id', booking_id)\
+            .eq('kind', kind)\
+            .eq('status', SENDING)\
+            .execute()
+        # Напоминание отменили во время отправки — повторять нечего
+        if response.data:
+            self._push(key, _parse(response.data[0]['remind_at']))
+        return True
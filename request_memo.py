@@ -0,0 +1,144 @@
+# request_memo.py
+# Мемоизация чтений на время одного прогона скрипта Streamlit: сайдбар,
+# вкладка и обработчик кнопки, вызывающие одну функцию с теми же аргументами,
+# получают один результат — страница не делает один и тот же запрос дважды.
+#
+# Область прогона живет в потоке скрипта: begin_request() в начале скрипта
+# создает новую, вне области (фоновые потоки, бенчмарки) декоратор прозрачен.
+# track_queries(db) считает execute() к хранилищу за прогон — для отладки.
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+_local = threading.local()
+_MISSING = object()
+
+# Значения, которые возвращаются из цепочки запроса как есть (не построители)
+_PLAIN = (str, bytes, int, float, bool, list, dict, tuple, type(None))
+
+
+class RequestScope:
+    """Память и счетчики одного прогона скрипта"""
+
+    def __init__(self):
+        self.values = {}  # (имя функции, args, kwargs) -> результат
+        self.queries = 0
+        self.hits = 0
+        self.misses = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+def begin_request() -> RequestScope:
+    """Новая область для текущего прогона (предыдущая отбрасывается)"""
+    _local.scope = RequestScope()
+    return _local.scope
+
+
+def end_request():
+    _local.scope = None
+
+
+def current_scope():
+    return getattr(_local, 'scope', None)
+
+
+@contextmanager
+def child_request():
+    """Своя область для части страницы, которая перерисовывается без всего скрипта
+    (st.fragment): память не наследуется, счетчики добавляются к внешней области"""
+    parent = current_scope()
+    scope = begin_request()
+    try:
+        yield scope
+    finally:
+        _local.scope = parent
+        if parent is not None:
+            parent.queries += scope.queries
+            parent.hits += scope.hits
+            parent.misses += scope.misses
+
+
+def request_memo(func):
+    """Результат func(*args, **kwargs) запоминается до конца прогона"""
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        scope = current_scope()
+        if scope is None:
+            return func(*args, **kwargs)
+        key = (name, args, tuple(sorted(kwargs.items())))
+        try:
+            value = scope.values.get(key, _MISSING)
+        except TypeError:
+            # Нехэшируемые аргументы — без мемоизации
+            return func(*args, **kwargs)
+        if value is _MISSING:
+            scope.misses += 1
+            value = scope.values[key] = func(*args, **kwargs)
+        else:
+            scope.hits += 1
+        return value
+
+    wrapper.memo_name = name
+    return wrapper
+
+
+def invalidate(*funcs):
+    """Сброс памяти прогона после изменения данных (без аргументов — целиком)"""
+    scope = current_scope()
+    if scope is None:
+        return
+    if not funcs:
+        scope.values.clear()
+        return
+    names = {func.memo_name for func in funcs}
+    for key in [key for key in scope.values if key[0] in names]:
+        del scope.values[key]
+
+
+# ============================================================================
+# СЧЕТЧИК ЗАПРОСОВ
+# ============================================================================
+
+class _Tracked:
+    """Прокси хранилища/построителя запроса: execute() учитывается в области прогона"""
+
+    __slots__ = ('_target',)
+
+    def __init__(self, target):
+        self._target = target
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if name == 'execute':
+            return functools.partial(_execute, value)
+        if callable(value):
+            return functools.partial(_call, value)
+        return _wrap(value)
+
+
+def _wrap(value):
+    return value if isinstance(value, _PLAIN) else _Tracked(value)
+
+
+def _call(method, *args, **kwargs):
+    return _wrap(method(*args, **kwargs))
+
+
+def _execute(execute, *args, **kwargs):
+    scope = current_scope()
+    if scope is not None:
+        scope.queries += 1
+    return execute(*args, **kwargs)
+
+
+def track_queries(db):
+    """Хранилище, запросы к которому считаются в текущем прогоне (None остается None)"""
+    return None if db is None else _Tracked(db)
@@ -0,0 +1,459 @@
+# storage.py
+# Хранилище данных: общий интерфейс запросов и две реализации —
+# Supabase (hosted Postgres) и локальный SQLite (bookings.db)
+#
+# Бизнес-логика работает с цепочками в стиле supabase-py:
+#   db.table('bookings').select('id').eq('phone_hash', h).order('booking_date').limit(1).execute()
+# Поддерживаемое подмножество: select/insert/upsert/update/delete, eq/neq/gt/gte/lt/lte,
+# in_/like/is_/not_.is_, order, limit, range; execute() возвращает QueryResult.
+# Пагинация по ключу — через keyset_after(query, columns, cursor).
+
+import os
+import sqlite3
+import threading
+
+
+class StorageError(Exception):
+    """Ошибка хранилища"""
+
+
+class DuplicateKeyError(StorageError):
+    """Нарушение уникальности (текст совместим с сообщениями Postgres)"""
+
+
+class QueryResult:
+    """Результат запроса: строки и (если запрошено) общее количество"""
+
+    def __init__(self, data: list, count: int = None):
+        self.data = data
+        self.count = count
+
+
+class StorageBackend:
+    """Интерфейс хранилища: точка входа — table(name)"""
+
+    name = 'base'
+
+    def table(self, name: str):
+        raise NotImplementedError
+
+
+# ============================================================================
+# SUPABASE
+# ============================================================================
+
+class SupabaseStorage(StorageBackend):
+    """Хранилище в Supabase: запросы уходят в PostgREST как есть"""
+
+    name = 'supabase'
+
+    def __init__(self, client):
+        self.client = client
+
+    def table(self, name: str):
+        return self.client.table(name)
+
+
+# ============================================================================
+# SQLITE
+# ============================================================================
+
+# Схема совпадает с bookings.db; недостающие колонки добавляются миграцией
+SQLITE_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS settings
+       (id INTEGER PRIMARY KEY CHECK (id = 1),
+        work_start TEXT DEFAULT '09:00',
+        work_end TEXT DEFAULT '18:00',
+        session_duration INTEGER DEFAULT 60,
+        break_duration INTEGER DEFAULT 15)""",
+    """CREATE TABLE IF NOT EXISTS blocked_slots
+       (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        block_date DATE NOT NULL,
+        block_time TEXT,
+        reason TEXT,
+        UNIQUE(block_date, block_time))""",
+    """CREATE TABLE IF NOT EXISTS bookings
+       (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        client_name TEXT NOT NULL,
+        client_phone TEXT,
+        client_email TEXT,
+        booking_date DATE NOT NULL,
+        booking_time TEXT NOT NULL,
+        notes TEXT,
+        status TEXT DEFAULT 'confirmed',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        client_telegram TEXT,
+        phone_hash TEXT,
+        UNIQUE(booking_date, booking_time))""",
+    """CREATE TABLE IF NOT EXISTS telegram_users
+       (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        chat_id INTEGER UNIQUE NOT NULL,
+        registered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)""",
+    """CREATE TABLE IF NOT EXISTS reminders
+       (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        booking_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        chat_id TEXT,
+        remind_at TEXT NOT NULL,
+        event_at TEXT NOT NULL,
+        status TEXT DEFAULT 'pending',
+        sent_at TEXT,
+        UNIQUE(booking_id, kind))""",
+    """CREATE TABLE IF NOT EXISTS outbox
+       (id INTEGER PRIMARY KEY AUTOINCREMENT,
+        booking_id INTEGER,
+        kind TEXT NOT NULL,
+        chat_id TEXT NOT NULL,
+        text TEXT NOT NULL,
+        status TEXT DEFAULT 'pending',
+        attempts INTEGER DEFAULT 0,
+        next_attempt_at TEXT NOT NULL,
+        last_error TEXT,
+        created_at TEXT,
+        sent_at TEXT)""",
+    """CREATE TABLE IF NOT EXISTS client_contacts
+       (phone_hash TEXT PRIMARY KEY,
+        telegram_chat_id TEXT NOT NULL,
+        updated_at TEXT)""",
+    """CREATE TABLE IF NOT EXISTS link_tokens
+       (token TEXT PRIMARY KEY,
+        phone_hash TEXT NOT NULL,
+        created_at TEXT NOT NULL)""",
+]
+
+SQLITE_MIGRATIONS = {
+    'bookings': {
+        'telegram_chat_id': 'TEXT',
+        'session_duration': 'INTEGER',
+    },
+    'settings': {
+        'info_title': 'TEXT',
+        'info_work_hours': 'TEXT',
+        'info_session_duration': 'TEXT',
+        'info_format': 'TEXT',
+        'info_contacts': 'TEXT',
+        'info_additional': 'TEXT',
+    },
+}
+
+SQLITE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_bookings_phone_hash ON bookings (phone_hash)",
+    "CREATE INDEX IF NOT EXISTS idx_bookings_status_date ON bookings (status, booking_date)",
+    "CREATE INDEX IF NOT EXISTS idx_reminders_status_time ON reminders (status, remind_at)",
+    "CREATE INDEX IF NOT EXISTS idx_outbox_status_next ON outbox (status, next_attempt_at)",
+    "CREATE INDEX IF NOT EXISTS idx_outbox_booking ON outbox (booking_id)",
+    "CREATE INDEX IF NOT EXISTS idx_link_tokens_created ON link_tokens (created_at)",
+]
+
+
+def _quote(identifier: str) -> str:
+    """Экранирование имени колонки/таблицы"""
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class _SQLiteNot:
+    """Отрицание фильтра: query.not_.is_('col', None)"""
+
+    def __init__(self, query):
+        self._query = query
+
+    def is_(self, column: str, value):
+        if value is None or value == 'null':
+            return self._query._where(f"{_quote(column)} IS NOT NULL")
+        return self._query._where(f"{_quote(column)} IS NOT ?", value)
+
+
+class SQLiteQuery:
+    """Построитель SQL-запроса с API, совместимым с supabase-py"""
+
+    def __init__(self, storage, table: str):
+        self._storage = storage
+        self._table = table
+        self._action = 'select'
+        self._columns = '*'
+        self._count = None
+        self._payload = None
+        self._on_conflict = None
+        self._conditions = []
+        self._params = []
+        self._order = []
+        self._limit = None
+        self._offset = None
+
+    # ---- действия ----
+
+    def select(self, columns: str = '*', count: str = None):
+        self._action = 'select'
+        self._columns = columns
+        self._count = count
+        return self
+
+    def insert(self, payload):
+        self._action = 'insert'
+        self._payload = payload
+        return self
+
+    def upsert(self, payload, on_conflict: str = 'id'):
+        self._action = 'upsert'
+        self._payload = payload
+        self._on_conflict = [c.strip() for c in on_conflict.split(',')]
+        return self
+
+    def update(self, payload: dict):
+        self._action = 'update'
+        self._payload = payload
+        return self
+
+    def delete(self):
+        self._action = 'delete'
+        return self
+
+    # ---- фильтры ----
+
+    def _where(self, condition: str, *params):
+        self._conditions.append(condition)
+        self._params.extend(params)
+        return self
+
+    def eq(self, column: str, value):
+        return self._where(f"{_quote(column)} = ?", value)
+
+    def neq(self, column: str, value):
+        return self._where(f"{_quote(column)} != ?", value)
+
+    def gt(self, column: str, value):
+        return self._where(f"{_quote(column)} > ?", value)
+
+    def gte(self, column: str, value):
+        return self._where(f"{_quote(column)} >= ?", value)
+
+    def lt(self, column: str, value):
+        return self._where(f"{_quote(column)} < ?", value)
+
+    def lte(self, column: str, value):
+        return self._where(f"{_quote(column)} <= ?", value)
+
+    def in_(self, column: str, values):
+        values = list(values)
+        if not values:
+            return self._where("0")
+        placeholders = ', '.join('?' for _ in values)
+        return self._where(f"{_quote(column)} IN ({placeholders})", *values)
+
+    def like(self, column: str, pattern: str):
+        return self._where(f"{_quote(column)} LIKE ?", pattern)
+
+    def is_(self, column: str, value):
+        if value is None or value == 'null':
+            return self._where(f"{_quote(column)} IS NULL")
+        return self._where(f"{_quote(column)} IS ?", value)
+
+    @property
+    def not_(self):
+        return _SQLiteNot(self)
+
+    def after(self, columns: list, values: list):
+        """Строки строго после курсора (сравнение кортежей по возрастанию)"""
+        placeholders = ', '.join('?' for _ in values)
+        return self._where(f"({', '.join(_quote(c) for c in columns)}) > ({placeholders})", *values)
+
+    def order(self, column: str, desc: bool = False):
+        self._order.append(f"{_quote(column)} {'DESC' if desc else 'ASC'}")
+        return self
+
+    def limit(self, n: int):
+        self._limit = int(n)
+        return self
+
+    def range(self, start: int, end: int):
+        self._offset = int(start)
+        self._limit = int(end) - int(start) + 1
+        return self
+
+    # ---- сборка SQL ----
+
+    def _columns_sql(self) -> str:
+        if self._columns.strip() == '*':
+            return '*'
+        return ', '.join(_quote(c.strip()) for c in self._columns.split(','))
+
+    def _where_sql(self) -> str:
+        return f" WHERE {' AND '.join(self._conditions)}" if self._conditions else ''
+
+    def _select_sql(self) -> str:
+        sql = f"SELECT {self._columns_sql()} FROM {_quote(self._table)}{self._where_sql()}"
+        if self._order:
+            sql += f" ORDER BY {', '.join(self._order)}"
+        if self._limit is not None:
+            sql += f" LIMIT {self._limit}"
+            if self._offset:
+                sql += f" OFFSET {self._offset}"
+        return sql
+
+    def execute(self) -> QueryResult:
+        return self._storage.execute(self)
+
+
+class SQLiteStorage(StorageBackend):
+    """Локальное хранилище в файле SQLite (одна практика, офлайн-тесты и бенчмарки)"""
+
+    name = 'sqlite'
+
+    def __init__(self, path: str = 'bookings.db'):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        if path != ':memory:':
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        """Создание таблиц и добавление недостающих колонок"""
+        with self._lock:
+            for statement in SQLITE_SCHEMA:
+                self._conn.execute(statement)
+
+            for table, columns in SQLITE_MIGRATIONS.items():
+                existing = {row['name'] for row in self._conn.execute(f"PRAGMA table_info({_quote(table)})")}
+                for column, column_type in columns.items():
+                    if column not in existing:
+                        self._conn.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(column)} {column_type}")
+
+            for statement in SQLITE_INDEXES:
+                self._conn.execute(statement)
+
+    def table(self, name: str) -> SQLiteQuery:
+        return SQLiteQuery(self, name)
+
+    def execute(self, query: SQLiteQuery) -> QueryResult:
+        """Выполнение собранного запроса"""
+        try:
+            with self._lock:
+                if query._action == 'select':
+                    return self._execute_select(query)
+                if query._action in ('insert', 'upsert'):
+                    return self._execute_insert(query)
+                if query._action == 'update':
+                    return self._execute_update(query)
+                if query._action == 'delete':
+                    return self._execute_delete(query)
+                raise StorageError(f"Неизвестное действие: {query._action}")
+        except sqlite3.IntegrityError as e:
+            if 'UNIQUE' in str(e):
+                raise DuplicateKeyError(f"duplicate key value violates unique constraint: {e}") from e
+            raise StorageError(str(e)) from e
+        except sqlite3.Error as e:
+            raise StorageError(str(e)) from e
+
+    def _fetch(self, sql: str, params) -> list:
+        return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def _execute_select(self, query: SQLiteQuery) -> QueryResult:
+        data = self._fetch(query._select_sql(), query._params)
+        count = None
+        if query._count:
+            sql = f"SELECT COUNT(*) FROM {_quote(query._table)}{query._where_sql()}"
+            count = self._conn.execute(sql, query._params).fetchone()[0]
+        return QueryResult(data, count)
+
+    def _execute_insert(self, query: SQLiteQuery) -> QueryResult:
+        rows = query._payload if isinstance(query._payload, list) else [query._payload]
+        inserted = []
+        self._conn.execute("BEGIN")
+        try:
+            for row in rows:
+                columns = list(row)
+                sql = (f"INSERT INTO {_quote(query._table)} ({', '.join(_quote(c) for c in columns)}) "
+                       f"VALUES ({', '.join('?' for _ in columns)})")
+                if query._action == 'upsert':
+                    # Как в PostgREST: конфликт по ключу обновляет переданные колонки
+                    updates = [c for c in columns if c not in query._on_conflict]
+                    target = ', '.join(_quote(c) for c in query._on_conflict)
+                    if updates:
+                        assignments = ', '.join(f"{_quote(c)} = excluded.{_quote(c)}" for c in updates)
+                        sql += f" ON CONFLICT ({target}) DO UPDATE SET {assignments}"
+                    else:
+                        sql += f" ON CONFLICT ({target}) DO NOTHING"
+                sql += " RETURNING *"
+                inserted.extend(self._fetch(sql, [row[c] for c in columns]))
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        return QueryResult(inserted)
+
+    def _execute_update(self, query: SQLiteQuery) -> QueryResult:
+        columns = list(query._payload)
+        assignments = ', '.join(f"{_quote(c)} = ?" for c in columns)
+        sql = f"UPDATE {_quote(query._table)} SET {assignments}{query._where_sql()} RETURNING *"
+        return QueryResult(self._fetch(sql, [query._payload[c] for c in columns] + query._params))
+
+    def _execute_delete(self, query: SQLiteQuery) -> QueryResult:
+        sql = f"DELETE FROM {_quote(query._table)}{query._where_sql()} RETURNING *"
+        return QueryResult(self._fetch(sql, query._params))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# ============================================================================
+# ПАГИНАЦИЯ ПО КЛЮЧУ
+# ============================================================================
+
+def _postgrest_value(value) -> str:
+    """Значение для фильтра PostgREST внутри or=(...)"""
+    if isinstance(value, (int, float)):
+        return str(value)
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def keyset_after(query, columns: list, cursor: list):
+    """Фильтр "после курсора" для сортировки по columns (все по возрастанию)"""
+    if hasattr(query, 'after'):
+        return query.after(columns, cursor)
+
+    # PostgREST: (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+    clauses = []
+    for i, column in enumerate(columns):
+        parts = [f"{c}.eq.{_postgrest_value(v)}" for c, v in zip(columns[:i], cursor[:i])]
+        parts.append(f"{column}.gt.{_postgrest_value(cursor[i])}")
+        clauses.append(parts[0] if len(parts) == 1 else f"and({','.join(parts)})")
+    return query.or_(','.join(clauses))
+
+
+# Значений в одном .in_(): PostgREST передает фильтр в URL (phone_hash — 64 символа)
+IN_CHUNK_SIZE = 100
+
+
+def in_chunks(values: list, size: int = IN_CHUNK_SIZE):
+    """Части списка для .in_(), чтобы URL запроса оставался ограниченной длины"""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+# ============================================================================
+# ВЫБОР ХРАНИЛИЩА
+# ============================================================================
+
+def create_storage(backend: str = None, supabase_url: str = None, supabase_key: str = None,
+                   sqlite_path: str = None) -> StorageBackend:
+    """Создание хранилища по настройкам (STORAGE_BACKEND=supabase|sqlite)"""
+    backend = (backend or os.getenv('STORAGE_BACKEND', 'supabase')).lower()
+
+    if backend == 'sqlite':
+        return SQLiteStorage(sqlite_path or os.getenv('SQLITE_PATH', 'bookings.db'))
+
+    if backend == 'supabase':
+        from supabase import create_client
+
+        supabase_url = supabase_url or os.getenv('SUPABASE_URL')
+        supabase_key = supabase_key or os.getenv('SUPABASE_KEY')
+        if not supabase_url or not supabase_key:
+            raise StorageError("SUPABASE_URL и SUPABASE_KEY не настроены в переменных окружения")
+        return SupabaseStorage(create_client(supabase_url, supabase_key))
+
+    raise StorageError(f"Неизвестное хранилище: {backend}")
@@ -0,0 +1,62 @@
+# stylesheet.py
+# Стили приложения: static/styles.css читается и минифицируется один раз на
+# процесс. Раньше ~10 КБ <style> с отступами уходили браузеру на каждом
+# прогоне скрипта (после каждого клика и st.rerun()).
+#
+# Элементы, не отправленные в очередном прогоне, Streamlit удаляет со страницы,
+# поэтому <style> через st.markdown приходится слать каждый раз. Вместо этого
+# injector() кладет <style> в <head> родительской страницы из компонента-iframe:
+# <head> Streamlit не перерисовывает, стили переживают прогоны фрагментов и
+# перерисовки. Компонент отправляется на каждом полном прогоне: флаг "уже
+# вставлено" на сервере не знает, успел ли браузер выполнить скрипт.
+
+import hashlib
+import json
+import os
+import re
+
+STYLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'styles.css')
+STYLE_ELEMENT_ID = 'app-styles'
+
+_COMMENTS = re.compile(r'/\*.*?\*/', re.S)
+_SPACES = re.compile(r'\s+')
+_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+_COLON = re.compile(r'\s*:\s*(?=[^{}]*;|[^{}]*})')  # двоеточие в объявлениях, не в селекторах
+
+
+def minify_css(css: str) -> str:
+    """Удаление комментариев, отступов и лишних пробелов"""
+    css = _COMMENTS.sub('', css)
+    css = _SPACES.sub(' ', css)
+    css = _PUNCTUATION.sub(r'\1', css)
+    css = _COLON.sub(':', css)
+    return css.replace(';}', '}').strip()
+
+
+class Stylesheet:
+    """Минифицированные стили и их версия (хэш исходника)"""
+
+    def __init__(self, path: str = STYLES_PATH):
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        self.source_size = len(source.encode())
+        self.css = minify_css(source)
+        self.version = hashlib.sha256(source.encode()).hexdigest()[:12]
+
+    def style_tag(self) -> str:
+        """<style> для st.markdown — на каждом прогоне"""
+        return f"<style>{self.css}</style>"
+
+    def injector(self) -> str:
+        """HTML компонента, ставящий стили в <head> страницы (повторный вызов заменяет текст)"""
+        css = json.dumps(self.css).replace('</', '<\\/')
+        return f"""<script>
+const doc = window.parent.document;
+let style = doc.getElementById({json.dumps(STYLE_ELEMENT_ID)});
+if (!style) {{
+    style = doc.createElement('style');
+    style.id = {json.dumps(STYLE_ELEMENT_ID)};
+    doc.head.appendChild(style);
+}}
+style.textContent = {css};
+</script>"""
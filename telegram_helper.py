@@ -2,34 +2,163 @@
 # Вспомогательный файл для отправки уведомлений из Streamlit
 
 import asyncio
+import sqlite3
+import threading
+import time
 from telegram import Bot
+from telegram.request import HTTPXRequest
 
 # Токен бота (должен совпадать с bot.py)
 BOT_TOKEN = "1781045290:AAHpvq7zsIcew9MOPtdHbV-l36rHCQOD2Mk"
 
-def get_chat_id_by_username(username):
-    """Получить chat_id по username из базы"""
-    import sqlite3
-    conn = sqlite3.connect('bookings.db')
-    c = conn.cursor()
-    
-    username_clean = username.lower().replace('@', '')
-    c.execute("SELECT chat_id FROM telegram_users WHERE username = ?", (username_clean,))
-    result = c.fetchone()
-    conn.close()
-    
-    return result[0] if result else None
+# Пул соединений общего Bot и ожидание результата синхронными обертками
+POOL_SIZE = 8
+SEND_TIMEOUT = 15
 
-async def send_telegram_message(chat_id, message):
-    """Отправить сообщение в Telegram"""
+# База с таблицей telegram_users (заполняется ботом при /start)
+DB_PATH = 'bookings.db'
+
+# Сигнатура таблицы: новые, удаленные и замененные строки, смена chat_id
+USERS_SIGNATURE = "SELECT count(*), max(rowid), total(chat_id) FROM telegram_users"
+# Полное перечитывание не реже раза в столько секунд (переименование на месте сигнатуру не меняет)
+USERS_MAX_AGE = 60
+
+class TelegramNotifier:
+    """Один фоновый цикл событий и один Bot с пулом соединений на весь процесс"""
+
+    def __init__(self, token=BOT_TOKEN, pool_size=POOL_SIZE, base_url="https://api.telegram.org/bot",
+                 connect_timeout=5.0, read_timeout=10.0):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='telegram-loop', daemon=True)
+        self.thread.start()
+
+        self.request = HTTPXRequest(
+            connection_pool_size=pool_size,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            pool_timeout=read_timeout,
+        )
+        self.bot = Bot(token=token, base_url=base_url, request=self.request)
+
+    async def _send(self, chat_id, text, **kwargs):
+        try:
+            await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+            return True
+        except Exception as e:
+            print(f"Ошибка отправки сообщения: {e}")
+            return False
+
+    def submit(self, chat_id, text, **kwargs):
+        """Потокобезопасная постановка отправки; возвращает concurrent.futures.Future[bool]"""
+        return asyncio.run_coroutine_threadsafe(self._send(chat_id, text, **kwargs), self.loop)
+
+    def close(self):
+        """Закрыть соединения и остановить цикл"""
+        asyncio.run_coroutine_threadsafe(self.request.shutdown(), self.loop).result(SEND_TIMEOUT)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+_notifier = None
+_notifier_lock = threading.Lock()
+
+def get_notifier():
+    """Общий TelegramNotifier (создается при первой отправке)"""
+    global _notifier
+    with _notifier_lock:
+        if _notifier is None:
+            _notifier = TelegramNotifier()
+        return _notifier
+
+def _send_and_wait(chat_id, message):
+    """Отправка из синхронного кода с ожиданием результата"""
     try:
-        bot = Bot(token=BOT_TOKEN)
-        await bot.send_message(chat_id=chat_id, text=message)
-        return True
+        return get_notifier().submit(chat_id, message).result(timeout=SEND_TIMEOUT)
     except Exception as e:
-        print(f"Ошибка отправки сообщения: {e}")
+        print(f"Ошибка: {e}")
         return False
 
+class TelegramUsers:
+    """username -> chat_id из telegram_users: соединение на поток (WAL) и теплая карта в памяти"""
+
+    def __init__(self, path=DB_PATH, max_age=USERS_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._chat_ids = {}
+        self._signature = None
+        self._expires_at = 0.0
+        self.reloads = 0
+
+    @staticmethod
+    def normalize(username):
+        return username.lower().replace('@', '')
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.version = None
+        return conn
+
+    def _refresh(self):
+        """Перечитать карту, если другое соединение (например, bot.py) изменило telegram_users"""
+        conn = self._connection()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        now = time.monotonic()
+        if version == self._local.version and now < self._expires_at:
+            return
+        self._local.version = version
+
+        # data_version меняет любая запись в файл базы (и в bookings) — сверяем саму таблицу
+        try:
+            signature = conn.execute(USERS_SIGNATURE).fetchone()
+        except sqlite3.OperationalError:
+            signature = None  # таблицы еще нет — ее создаст бот при первой регистрации
+        if signature == self._signature and now < self._expires_at:
+            return
+
+        rows = conn.execute("SELECT username, chat_id FROM telegram_users").fetchall() if signature else []
+        with self._lock:
+            self._chat_ids = {self.normalize(username): chat_id for username, chat_id in rows}
+            self._signature = signature
+            self._expires_at = now + self.max_age
+            self.reloads += 1
+
+    def get(self, username):
+        self._refresh()
+        return self._chat_ids.get(self.normalize(username))
+
+    def close(self):
+        """Закрыть соединение текущего потока"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+_users = None
+_users_lock = threading.Lock()
+
+def get_users():
+    """Общий справочник пользователей бота"""
+    global _users
+    with _users_lock:
+        if _users is None:
+            _users = TelegramUsers()
+        return _users
+
+def get_chat_id_by_username(username):
+    """Получить chat_id по username (из теплой карты, без открытия базы на каждый вызов)"""
+    return get_users().get(username)
+
+async def send_telegram_message(chat_id, message):
+    """Отправить сообщение в Telegram (через общий цикл и Bot)"""
+    return await asyncio.wrap_future(get_notifier().submit(chat_id, message))
+
 def notify_new_booking(username, booking_details):
     """Уведомить о новой записи"""
     if not username:
@@ -56,16 +185,8 @@ def notify_new_booking(username, booking_details):
     
     message += "\n❗️ Я пришлю напоминание за день до встречи!"
     
-    # Запускаем асинхронную отправку
-    try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(send_telegram_message(chat_id, message))
-        loop.close()
-        return result
-    except Exception as e:
-        print(f"Ошибка: {e}")
-        return False
+    # Отправка через общий фоновый цикл
+    return _send_and_wait(chat_id, message)
 
 def notify_booking_cancelled(username, booking_details):
     """Уведомить об отмене записи"""
@@ -87,12 +208,4 @@ def notify_booking_cancelled(username, booking_details):
         "Свяжитесь с консультантом для уточнения деталей."
     )
     
-    try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(send_telegram_message(chat_id, message))
-        loop.close()
-        return result
-    except Exception as e:
-        print(f"Ошибка: {e}")
-        return False
\ No newline at end of file
+    return _send_and_wait(chat_id, message)
\ No newline at end of file
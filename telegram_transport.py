@@ -0,0 +1,53 @@
+# telegram_transport.py
+# HTTP-транспорт к Bot API: одна сессия requests с пулом keep-alive
+# соединений, таймаутами и повторами вместо requests.post на каждое сообщение
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_API_URL = 'https://api.telegram.org'
+
+
+class TelegramTransport:
+    """Пул соединений к api.telegram.org (потокобезопасен для отправки)"""
+
+    def __init__(self, bot_token: str, api_url: str = DEFAULT_API_URL, pool_size: int = 10,
+                 connect_timeout: float = 3.05, read_timeout: float = 10, retries: int = 2,
+                 backoff_factor: float = 0.3, retry_rate_limited: bool = True):
+        self.bot_token = bot_token
+        self.api_url = (api_url or DEFAULT_API_URL).rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+
+        # Повторяем только то, что не привело к доставке: ошибки соединения,
+        # шлюза и 429 (с учетом Retry-After). Рассылка обрабатывает 429 сама.
+        statuses = (429, 502, 503, 504) if retry_rate_limited else (502, 503, 504)
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=retries,
+            status_forcelist=statuses,
+            allowed_methods=frozenset({'POST'}),
+            backoff_factor=backoff_factor,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry, pool_block=True)
+
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def method_url(self, method: str) -> str:
+        return f"{self.api_url}/bot{self.bot_token}/{method}"
+
+    def call(self, method: str, payload: dict) -> requests.Response:
+        """Вызов метода Bot API по общему пулу соединений"""
+        return self.session.post(self.method_url(method), json=payload, timeout=self.timeout)
+
+    def send_message(self, chat_id: str, text: str, parse_mode: str = 'HTML') -> requests.Response:
+        return self.call('sendMessage', {'chat_id': chat_id, 'text': text, 'parse_mode': parse_mode})
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,191 @@
+# telegram_updates.py
+# Прием обновлений бота: /start connect_<токен> из ссылки get_bot_link
+# привязывает chat_id к клиенту без ручного ввода Chat ID.
+#
+# Токен ссылки — случайный и одноразовый (таблица link_tokens, см.
+# migrations/link_tokens.sql): по нему нельзя подобрать чужой номер, а
+# привязка удаляет токен, поэтому пересланная ссылка второй раз не сработает.
+#
+# Long polling getUpdates с offset в отдельном потоке с циклом asyncio;
+# для webhook тот же разбор — handle_webhook(json). Обновления обрабатываются
+# пачками: токены всей пачки погашаются одним удалением по точному совпадению,
+# привязка — одним upsert в client_contacts.
+
+import asyncio
+import re
+import secrets
+import threading
+from datetime import datetime, timedelta
+
+from telegram import Bot, Update
+from telegram.request import HTTPXRequest
+
+from message_templates import TEMPLATES
+from storage import in_chunks
+
+LINK_TOKEN_BYTES = 16
+LINK_TOKEN_LENGTH = 22  # длина secrets.token_urlsafe(LINK_TOKEN_BYTES)
+LINK_TOKEN_TTL = timedelta(hours=24)
+
+# Токен в ссылке: ровно LINK_TOKEN_LENGTH символов base64url (см. get_bot_link)
+CONNECT_RE = re.compile(r'^/start(?:@\w+)?\s+connect_([A-Za-z0-9_-]{%d})\s*$' % LINK_TOKEN_LENGTH)
+
+
+def parse_connect(text: str):
+    """Токен из '/start connect_<токен>' или None"""
+    match = CONNECT_RE.match((text or '').strip())
+    return match.group(1) if match else None
+
+
+class ChatLinker:
+    """Привязка chat_id к клиентам по одноразовым токенам ссылок"""
+
+    def __init__(self, db, contacts, on_linked=None, ttl: timedelta = LINK_TOKEN_TTL,
+                 clock=datetime.now):
+        self.db = db
+        self.contacts = contacts  # contacts.ContactDirectory
+        self.on_linked = on_linked  # on_linked({phone_hash: chat_id}) — после записи
+        self.ttl = ttl
+        self.clock = clock
+
+    def _timestamp(self, moment: datetime) -> str:
+        return moment.isoformat(timespec='seconds')
+
+    def issue(self, phone_hash: str) -> str:
+        """Новый токен ссылки на бота для клиента; заодно удаляются просроченные"""
+        now = self.clock()
+        self.db.table('link_tokens')\
+            .delete()\
+            .lt('created_at', self._timestamp(now - self.ttl))\
+            .execute()
+        token = secrets.token_urlsafe(LINK_TOKEN_BYTES)
+        self.db.table('link_tokens').insert({
+            'token': token,
+            'phone_hash': phone_hash,
+            'created_at': self._timestamp(now),
+        }).execute()
+        return token
+
+    def redeem(self, tokens) -> dict:
+        """Погашение токенов: {токен: phone_hash}; неизвестные и просроченные пропускаются"""
+        cutoff = self._timestamp(self.clock() - self.ttl)
+        clients = {}
+        for chunk in in_chunks(list(set(tokens))):
+            # Удаление с возвратом строк: один токен не погасят дважды
+            response = self.db.table('link_tokens')\
+                .delete()\
+                .in_('token', chunk)\
+                .gte('created_at', cutoff)\
+                .execute()
+            clients.update({row['token']: row['phone_hash'] for row in response.data or []})
+        return clients
+
+    def __call__(self, requests: dict) -> dict:
+        """{chat_id: токен} -> {chat_id: привязан ли клиент}"""
+        clients = self.redeem(requests.values())
+        values = {clients[token]: str(chat_id) for chat_id, token in requests.items() if token in clients}
+        self.contacts.connect_many(values)
+        if values and self.on_linked:
+            self.on_linked(values)
+        return {chat_id: token in clients for chat_id, token in requests.items()}
+
+
+class UpdateReceiver:
+    """Long polling getUpdates (или webhook) с привязкой клиентов пачками"""
+
+    def __init__(self, token: str, link, base_url: str = 'https://api.telegram.org/bot',
+                 batch_size: int = 100, poll_timeout: int = 25, retry_delay: float = 5.0,
+                 connect_timeout: float = 5.0, read_timeout: float = 10.0):
+        self.link = link  # link({chat_id: токен}) -> {chat_id: привязан ли}; синхронная
+        self.batch_size = batch_size
+        self.poll_timeout = poll_timeout
+        self.retry_delay = retry_delay
+        self.bot = Bot(
+            token=token,
+            base_url=base_url,
+            request=HTTPXRequest(connection_pool_size=8, connect_timeout=connect_timeout,
+                                 read_timeout=read_timeout),
+            get_updates_request=HTTPXRequest(connection_pool_size=1, connect_timeout=connect_timeout,
+                                             read_timeout=read_timeout),
+        )
+        self.offset = None
+        self.processed = 0
+        self.linked = 0
+        self.loop = None
+        self.thread = None
+        self._stopped = asyncio.Event()
+
+    # ---- обработка ----
+
+    async def handle(self, updates: list) -> int:
+        """Обработка пачки: одна привязка на все /start connect_ и ответы параллельно"""
+        requests = {}
+        for update in updates:
+            message = update.message
+            token = parse_connect(message.text) if message else None
+            if token:
+                requests[message.chat_id] = token  # повторные /start одного чата схлопываются
+
+        if requests:
+            linked = await asyncio.get_running_loop().run_in_executor(None, self.link, requests)
+            self.linked += sum(1 for ok in linked.values() if ok)
+            await asyncio.gather(*(self._reply(chat_id, ok) for chat_id, ok in linked.items()))
+
+        self.processed += len(updates)
+        return len(requests)
+
+    async def _reply(self, chat_id, linked: bool):
+        # Без имени и других данных клиента: /start мог отправить не он
+        if linked:
+            text = TEMPLATES.render('telegram_linked', {})
+        else:
+            text = TEMPLATES.render('telegram_link_unknown', {})
+        try:
+            await self.bot.send_message(chat_id=chat_id, text=text, parse_mode='HTML')
+        except Exception as e:
+            print(f"❌ Ошибка ответа в Telegram: {e}")
+
+    async def handle_webhook(self, data: dict) -> int:
+        """Обработка тела webhook-запроса (один Update в JSON)"""
+        return await self.handle([Update.de_json(data, self.bot)])
+
+    # ---- long polling ----
+
+    async def poll_once(self) -> int:
+        """Один запрос getUpdates; offset сдвигается и при ошибке обработки (без зацикливания)"""
+        updates = await self.bot.get_updates(offset=self.offset, limit=self.batch_size,
+                                             timeout=self.poll_timeout, allowed_updates=['message'])
+        if not updates:
+            return 0
+        try:
+            await self.handle(updates)
+        except Exception as e:
+            print(f"❌ Ошибка обработки обновлений Telegram: {e}")
+        self.offset = updates[-1].update_id + 1
+        return len(updates)
+
+    async def run(self):
+        while not self._stopped.is_set():
+            try:
+                await self.poll_once()
+            except Exception as e:
+                print(f"❌ Ошибка getUpdates: {e}")
+                try:
+                    await asyncio.wait_for(self._stopped.wait(), self.retry_delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self):
+        """Запуск long polling в фоновом потоке со своим циклом событий"""
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(self.run(),),
+                                       name='telegram-updates', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout: float = None):
+        """Остановка после текущего запроса getUpdates"""
+        if self.loop:
+            self.loop.call_soon_threadsafe(self._stopped.set)
+        if self.thread:
+            self.thread.join(timeout)
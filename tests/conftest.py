@@ -0,0 +1,37 @@
+# tests/conftest.py
+# Проверки поведения (pytest); замеры времени — в benchmarks/.
+#
+#   python -m pytest -q
+
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import SQLiteStorage  # noqa: E402
+
+
+class Clock:
+    """Управляемые часы для планировщиков: clock() и сдвиг вперед"""
+
+    def __init__(self, now: datetime):
+        self.now = now
+
+    def __call__(self) -> datetime:
+        return self.now
+
+    def advance(self, delta):
+        self.now += delta
+
+
+@pytest.fixture
+def db():
+    return SQLiteStorage(':memory:')
+
+
+@pytest.fixture
+def clock():
+    return Clock(datetime(2026, 10, 20, 9, 0))
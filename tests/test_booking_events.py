@@ -0,0 +1,120 @@
+# tests/test_booking_events.py
+# Шина booking_events и ее подписчики: битовая карта календаря и напоминания
+# обновляются по событиям записи так же, как в habit_tracker.init_booking_events.
+
+import pytest
+
+from availability import CalendarIndex, DayState
+from booking_events import (
+    CANCELLED, COMPLETED, CREATED, DELETED, RESCHEDULED, RESTORED, BookingEvent, BookingEvents
+)
+from reminders import CANCELLED as REMINDER_CANCELLED
+from reminders import PENDING, ReminderScheduler
+
+SETTINGS = {'work_start': '09:00', 'work_end': '18:00', 'session_duration': 60}
+DAY = '2026-10-21'
+
+
+@pytest.fixture
+def calendar():
+    index = CalendarIndex()
+    index.load({}, '2026-10-20', '2026-11-20')
+    index.ensure_grid(SETTINGS)
+    return index
+
+
+@pytest.fixture
+def scheduler(db, clock):
+    return ReminderScheduler(db, lambda reminder: True, clock=clock)
+
+
+@pytest.fixture
+def events(calendar, scheduler):
+    bus = BookingEvents()
+    bus.subscribe(calendar.on_booking_event, name='calendar')
+    bus.subscribe(scheduler.on_booking_event, name='reminders')
+    return bus
+
+
+def busy_slots(calendar, day=DAY):
+    """Занятые слоты дня по битовой карте: ['HH:MM', ...]"""
+    bitmap = calendar._bitmaps.get(day, 0)
+    return [f"{9 + i:02d}:00" for i in range(9) if bitmap >> i & 1]
+
+
+def reminder_status(db, booking_id=1):
+    return db.table('reminders').select('status').eq('booking_id', booking_id).execute().data[0]['status']
+
+
+def test_handlers_run_in_order_and_report_results():
+    bus = BookingEvents()
+    calls = []
+    bus.subscribe(lambda event: calls.append('first') or 1, name='first')
+    bus.subscribe(lambda event: calls.append('second') or 2, name='second')
+
+    assert bus.emit(BookingEvent(CREATED, 1, DAY, '10:00')) == {'first': 1, 'second': 2}
+    assert calls == ['first', 'second']
+
+
+def test_failing_handler_does_not_stop_others():
+    bus = BookingEvents()
+    seen = []
+
+    def broken(event):
+        raise RuntimeError('index down')
+
+    bus.subscribe(broken, name='broken')
+    bus.subscribe(seen.append, name='seen')
+    event = BookingEvent(CANCELLED, 1, DAY, '10:00')
+
+    assert bus.emit(event) == {'broken': None, 'seen': None}
+    assert seen == [event]
+
+
+def test_create_reschedule_cancel_restore_cascade(db, events, calendar, scheduler):
+    handled = events.emit(BookingEvent(CREATED, 1, DAY, '10:00', session_duration=60, chat_id='chat'))
+    assert handled == {'calendar': None, 'reminders': True}
+    assert busy_slots(calendar) == ['10:00']
+    assert reminder_status(db) == PENDING
+
+    events.emit(BookingEvent(RESCHEDULED, 1, DAY, '14:00', session_duration=60, old_date=DAY, old_time='10:00'))
+    assert busy_slots(calendar) == ['14:00']
+    assert scheduler._due[(1, 'hour_before')].strftime('%H:%M') == '13:00'
+
+    events.emit(BookingEvent(CANCELLED, 1, DAY, '14:00', session_duration=60))
+    assert busy_slots(calendar) == []
+    assert reminder_status(db) == REMINDER_CANCELLED
+    assert scheduler.pending == 0
+
+    events.emit(BookingEvent(RESTORED, 1, DAY, '14:00', session_duration=60))
+    assert busy_slots(calendar) == ['14:00']
+    assert reminder_status(db) == PENDING
+    assert scheduler.pending == 1
+
+
+def test_created_without_chat_id_does_not_schedule(events, scheduler):
+    handled = events.emit(BookingEvent(CREATED, 1, DAY, '10:00'))
+    assert handled['reminders'] is False
+    assert scheduler.pending == 0
+
+
+@pytest.mark.parametrize('kind', [COMPLETED, DELETED])
+def test_completed_and_deleted_cancel_reminder(db, events, kind):
+    events.emit(BookingEvent(CREATED, 1, DAY, '10:00', chat_id='chat'))
+    events.emit(BookingEvent(kind, 1, DAY, '10:00'))
+    assert reminder_status(db) == REMINDER_CANCELLED
+
+
+def test_cancelled_booking_change_keeps_calendar(events, calendar):
+    # Перенос/удаление уже отмененной записи слот не освобождает: он и не был занят
+    events.emit(BookingEvent(CREATED, 2, DAY, '11:00'))
+    events.emit(BookingEvent(DELETED, 1, DAY, '11:00', was_active=False))
+    events.emit(BookingEvent(RESCHEDULED, 1, DAY, '15:00', old_date=DAY, old_time='11:00', was_active=False))
+    assert busy_slots(calendar) == ['11:00']
+
+
+def test_unblocking_slot_keeps_booking_at_same_time(calendar):
+    calendar.load_day(DAY, DayState(False, ((600, 120),)))  # запись 10:00-12:00 из базы
+    calendar.add(DAY, '10:00')  # блокировка того же времени
+    calendar.remove(DAY, '10:00')  # разблокировка
+    assert busy_slots(calendar) == ['10:00', '11:00']
@@ -0,0 +1,153 @@
+# tests/test_notifications.py
+# NotificationOutbox: отправка, повтор при сбое Telegram, dead letter,
+# возврат из dead letter и отметка отправленных до конца пачки.
+
+from datetime import timedelta
+
+import pytest
+
+from notifications import DEAD, PENDING, SENDING, SENT, NotificationOutbox
+
+
+class Response:
+    """Ответ Bot API в объеме, нужном classify_response"""
+
+    def __init__(self, status_code: int, description: str = None, retry_after: int = None):
+        self.status_code = status_code
+        self.headers = {}
+        self._body = {'ok': status_code == 200, 'description': description}
+        if retry_after is not None:
+            self._body['parameters'] = {'retry_after': retry_after}
+
+    def json(self):
+        return self._body
+
+
+class FakeSend:
+    """send(chat_id, text): ответы по chat_id (по умолчанию 200), журнал вызовов"""
+
+    def __init__(self, responses=None):
+        self.responses = responses or {}
+        self.calls = []
+
+    def __call__(self, chat_id, text):
+        self.calls.append(chat_id)
+        response = self.responses.get(chat_id, Response(200))
+        if isinstance(response, BaseException):
+            raise response
+        return response
+
+
+def make_outbox(db, clock, send, **kwargs):
+    return NotificationOutbox(db, send, clock=clock, backoff=5.0, max_backoff=60.0, **kwargs)
+
+
+def enqueue(outbox, *chat_ids):
+    return outbox.enqueue([{'booking_id': 1, 'kind': 'created_client', 'chat_id': chat_id,
+                            'text': f"для {chat_id}"} for chat_id in chat_ids])
+
+
+def rows(db):
+    return {row['chat_id']: row for row in db.table('outbox').select('*').order('id').execute().data}
+
+
+def test_enqueue_and_send(db, clock):
+    send = FakeSend()
+    outbox = make_outbox(db, clock, send)
+    enqueue(outbox, 'a', 'b')
+
+    assert outbox.drain_once() == 2
+    assert send.calls == ['a', 'b']
+    assert {row['status'] for row in rows(db).values()} == {SENT}
+    assert outbox.summary() == {PENDING: 0, SENDING: 0, SENT: 2, DEAD: 0}
+
+
+def test_outage_retries_with_backoff_and_pauses(db, clock):
+    send = FakeSend({'a': Response(502, 'Bad Gateway')})
+    outbox = make_outbox(db, clock, send)
+    enqueue(outbox, 'a', 'b')
+
+    assert outbox.drain_once() == 2
+    # Остаток пачки не перебирается во время сбоя и возвращается в очередь без траты попытки
+    assert send.calls == ['a']
+    a, b = rows(db)['a'], rows(db)['b']
+    assert a['status'] == PENDING and a['attempts'] == 1 and a['last_error'] == 'Bad Gateway'
+    assert a['next_attempt_at'] == (clock.now + timedelta(seconds=5)).strftime('%Y-%m-%d %H:%M:%S')
+    assert b['status'] == PENDING and b['attempts'] == 0
+
+    # Пауза: до ее конца API не трогаем
+    assert outbox.drain_once() == 0
+    assert send.calls == ['a']
+
+    send.responses.clear()
+    clock.advance(timedelta(seconds=5))
+    assert outbox.drain_once() == 2
+    assert {row['status'] for row in rows(db).values()} == {SENT}
+    assert outbox.paused_until is None
+
+
+def test_rate_limit_uses_retry_after(db, clock):
+    send = FakeSend({'a': Response(429, 'Too Many Requests', retry_after=17)})
+    outbox = make_outbox(db, clock, send)
+    enqueue(outbox, 'a')
+    outbox.drain_once()
+
+    assert outbox.paused_until == clock.now + timedelta(seconds=17)
+    assert rows(db)['a']['status'] == PENDING
+
+
+def test_blocked_chat_goes_to_dead_letter(db, clock):
+    send = FakeSend({'a': Response(403, 'Forbidden: bot was blocked by the user')})
+    outbox = make_outbox(db, clock, send)
+    enqueue(outbox, 'a', 'b')
+
+    assert outbox.drain_once() == 2
+    assert send.calls == ['a', 'b']
+    assert rows(db)['a']['status'] == DEAD and rows(db)['a']['attempts'] == 1
+    assert rows(db)['b']['status'] == SENT
+
+
+def test_exhausted_attempts_go_to_dead_letter(db, clock):
+    send = FakeSend({'a': Response(500, 'Internal Server Error')})
+    outbox = make_outbox(db, clock, send, max_attempts=3)
+    enqueue(outbox, 'a')
+
+    for _ in range(3):
+        outbox.drain_once()
+        clock.advance(timedelta(minutes=1))
+    assert send.calls == ['a'] * 3
+    assert rows(db)['a']['status'] == DEAD and rows(db)['a']['attempts'] == 3
+
+
+def test_retry_returns_dead_letter_to_queue(db, clock):
+    send = FakeSend({'a': Response(400, 'Bad Request: chat not found')})
+    outbox = make_outbox(db, clock, send)
+    enqueue(outbox, 'a')
+    outbox.drain_once()
+    dead_id = rows(db)['a']['id']
+
+    send.responses.clear()
+    assert outbox.retry([dead_id]) == 1
+    assert rows(db)['a']['attempts'] == 0 and rows(db)['a']['last_error'] is None
+    outbox.drain_once()
+    assert rows(db)['a']['status'] == SENT
+
+
+def test_sent_rows_are_marked_before_batch_ends(db, clock):
+    # Процесс падает посреди пачки: уже доставленное не должно уйти повторно
+    send = FakeSend({'b': KeyboardInterrupt()})
+    outbox = make_outbox(db, clock, send)
+    enqueue(outbox, 'a', 'b')
+
+    with pytest.raises(KeyboardInterrupt):
+        outbox.drain_once()
+    assert rows(db)['a']['status'] == SENT
+    assert rows(db)['b']['status'] == SENDING
+
+    # Перезапуск возвращает захваченные сообщения в очередь, отправленные — нет
+    send.responses.clear()
+    outbox.start()
+    outbox.stop()
+    outbox.drain_once()
+    assert send.calls.count('a') == 1
+    assert rows(db)['b']['status'] == SENT
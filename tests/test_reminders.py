@@ -0,0 +1,183 @@
+# tests/test_reminders.py
+# ReminderScheduler: захват строки, перенос, отмена, восстановление, повторы
+# неудачной отправки и догон после перезапуска.
+
+import time
+from datetime import datetime, timedelta
+
+from reminders import (
+    CANCELLED, EXPIRED, FAILED, HOUR_BEFORE, PENDING, RETRY_MIN_SECONDS, SENT, ReminderScheduler
+)
+
+BOOKING = {'id': 1, 'booking_date': '2026-10-20', 'booking_time': '11:00'}
+KEY = (1, HOUR_BEFORE)
+
+
+def reminder_row(db, booking_id=1):
+    return db.table('reminders').select('*').eq('booking_id', booking_id).execute().data[0]
+
+
+def make_scheduler(db, clock, result=True):
+    sent = []
+
+    def send(reminder):
+        sent.append(reminder['chat_id'])
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return ReminderScheduler(db, send, clock=clock), sent
+
+
+def fire(scheduler, remind_at, key=KEY):
+    """Отправка напоминания, как это делает рабочий поток: ключ снят с индекса, затем _fire"""
+    with scheduler._cond:
+        if scheduler._due.get(key) == remind_at:
+            scheduler._discard(key)
+    scheduler._fire(key, remind_at)
+
+
+def fire_due(scheduler, clock):
+    """Отправка ближайшего напоминания в момент remind_at"""
+    remind_at = scheduler._due[KEY]
+    clock.now = max(clock.now, remind_at)
+    fire(scheduler, remind_at)
+
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_schedule_is_idempotent(db, clock):
+    scheduler, _ = make_scheduler(db, clock)
+    assert scheduler.schedule(BOOKING, 'chat')
+    assert scheduler.schedule(BOOKING, 'chat')
+
+    assert db.table('reminders').select('id', count='exact').execute().count == 1
+    assert scheduler.pending == 1
+    assert scheduler._due[KEY] == datetime(2026, 10, 20, 10, 0)
+
+
+def test_schedule_skips_past_booking(db, clock):
+    scheduler, _ = make_scheduler(db, clock)
+    assert not scheduler.schedule({**BOOKING, 'booking_time': '08:00'}, 'chat')
+    assert scheduler.pending == 0
+
+
+def test_fire_claims_and_sends(db, clock):
+    scheduler, sent = make_scheduler(db, clock)
+    scheduler.schedule(BOOKING, 'chat')
+    fire_due(scheduler, clock)
+
+    assert sent == ['chat']
+    assert reminder_row(db)['status'] == SENT
+
+
+def test_fire_skips_moved_reminder(db, clock):
+    scheduler, sent = make_scheduler(db, clock)
+    scheduler.schedule(BOOKING, 'chat')
+    old_remind_at = scheduler._due[KEY]
+
+    assert scheduler.move(1, '2026-10-21', '15:00') == 1
+    clock.now = old_remind_at
+    fire(scheduler, old_remind_at)
+
+    # Строку на старое время захватить нельзя: напоминание ждет нового времени
+    assert sent == []
+    row = reminder_row(db)
+    assert row['status'] == PENDING and row['remind_at'] == '2026-10-21 14:00:00'
+    assert scheduler._due[KEY] == datetime(2026, 10, 21, 14, 0)
+
+
+def test_cancelled_reminder_is_not_sent(db, clock):
+    scheduler, sent = make_scheduler(db, clock)
+    scheduler.schedule(BOOKING, 'chat')
+    remind_at = scheduler._due[KEY]
+
+    assert scheduler.cancel(1) == 1
+    assert scheduler.pending == 0
+    clock.now = remind_at
+    fire(scheduler, remind_at)
+
+    assert sent == []
+    assert reminder_row(db)['status'] == CANCELLED
+
+
+def test_revive_keeps_sent_reminder(db, clock):
+    scheduler, sent = make_scheduler(db, clock)
+    scheduler.schedule(BOOKING, 'chat')
+    scheduler.schedule({**BOOKING, 'id': 2, 'booking_time': '12:00'}, 'chat')
+    fire_due(scheduler, clock)
+    scheduler.cancel(2)
+
+    # Восстановление: отправленное напоминание не повторяется, отмененное возвращается
+    assert scheduler.move(1, '2026-10-20', '11:00', revive=True) == 0
+    assert scheduler.move(2, '2026-10-20', '12:00', revive=True) == 1
+    assert reminder_row(db, 1)['status'] == SENT
+    assert reminder_row(db, 2)['status'] == PENDING
+    assert (2, HOUR_BEFORE) in scheduler._due and KEY not in scheduler._due
+
+
+def test_failed_send_is_retried_until_event(db, clock):
+    scheduler, sent = make_scheduler(db, clock, result=False)
+    scheduler.schedule(BOOKING, 'chat')
+    fire_due(scheduler, clock)
+
+    row = reminder_row(db)
+    retry_at = datetime(2026, 10, 20, 10, 0) + timedelta(seconds=RETRY_MIN_SECONDS)
+    assert row['status'] == PENDING and row['remind_at'] == retry_at.strftime('%Y-%m-%d %H:%M:%S')
+    assert scheduler._due[KEY] == retry_at
+
+    # Задержка растет вместе с опозданием напоминания
+    clock.now = datetime(2026, 10, 20, 10, 5)
+    fire(scheduler, retry_at)
+    assert scheduler._due[KEY] == datetime(2026, 10, 20, 10, 10)
+
+    # Следующая попытка пришлась бы на начало консультации — напоминание не отправлено
+    clock.now = datetime(2026, 10, 20, 10, 55)
+    fire(scheduler, scheduler._due[KEY])
+    assert reminder_row(db)['status'] == FAILED
+    assert scheduler.pending == 0
+    assert len(sent) == 3
+
+
+def test_send_error_is_retried(db, clock):
+    scheduler, sent = make_scheduler(db, clock, result=ConnectionError('timeout'))
+    scheduler.schedule(BOOKING, 'chat')
+    fire_due(scheduler, clock)
+
+    assert sent == ['chat']
+    assert reminder_row(db)['status'] == PENDING
+    assert scheduler.pending == 1
+
+
+def test_reminder_of_cancelled_booking_is_cancelled(db, clock):
+    scheduler, _ = make_scheduler(db, clock, result=None)
+    scheduler.schedule(BOOKING, 'chat')
+    fire_due(scheduler, clock)
+
+    assert reminder_row(db)['status'] == CANCELLED
+    assert scheduler.pending == 0
+
+
+def test_restart_catches_up_overdue_and_expires_past(db, clock):
+    first, _ = make_scheduler(db, clock)
+    first.schedule(BOOKING, 'chat')  # процесс упал, не успев отправить
+    db.table('reminders').insert({
+        'booking_id': 2, 'kind': HOUR_BEFORE, 'chat_id': 'chat', 'status': PENDING,
+        'remind_at': '2026-10-20 09:30:00', 'event_at': '2026-10-20 10:30:00',
+    }).execute()
+
+    clock.now = datetime(2026, 10, 20, 10, 45)
+    restarted, sent = make_scheduler(db, clock)
+    restarted.start()
+    try:
+        assert wait_for(lambda: reminder_row(db, 1)['status'] == SENT and reminder_row(db, 2)['status'] == EXPIRED)
+    finally:
+        restarted.stop()
+    assert sent == ['chat']